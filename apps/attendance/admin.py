@@ -2,7 +2,7 @@
 Admin configuration for attendance app
 """
 from django.contrib import admin
-from .models import Attendance
+from .models import Attendance, AttendanceDailyRollup, AttendanceHourlyOccupancy, OccupancyCounter
 
 
 @admin.register(Attendance)
@@ -12,3 +12,24 @@ class AttendanceAdmin(admin.ModelAdmin):
     search_fields = ['member__user__username', 'member__user__first_name', 'member__user__last_name']
     readonly_fields = ['created_at', 'duration_minutes']
     date_hierarchy = 'date'
+
+
+@admin.register(AttendanceDailyRollup)
+class AttendanceDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ['date', 'visits', 'unique_members', 'total_minutes', 'updated_at']
+    readonly_fields = ['date', 'visits', 'unique_members', 'total_minutes', 'updated_at']
+    date_hierarchy = 'date'
+
+
+@admin.register(AttendanceHourlyOccupancy)
+class AttendanceHourlyOccupancyAdmin(admin.ModelAdmin):
+    list_display = ['date', 'hour', 'weekday', 'peak_headcount', 'check_ins']
+    list_filter = ['weekday', 'hour']
+    readonly_fields = ['date', 'hour', 'weekday', 'peak_headcount', 'check_ins']
+    date_hierarchy = 'date'
+
+
+@admin.register(OccupancyCounter)
+class OccupancyCounterAdmin(admin.ModelAdmin):
+    list_display = ['current', 'updated_at']
+    readonly_fields = ['updated_at']
@@ -0,0 +1,84 @@
+"""
+Check-in and check-out for 2moreFitness
+Check-in locks the member row before looking for an open session, so a
+double-tapped check-in waits for the first and then sees it; the
+one-open-session-per-day constraint backs this up on every backend.
+Check-out locks the attendance row it closes. SQLite rejects contended
+writes instead of queueing, so both retry the whole transaction when locked
+"""
+from datetime import date, datetime
+
+from django.db import IntegrityError, transaction
+
+from apps.core.locking import retry_when_locked
+from apps.members.models import Member
+from .models import Attendance
+from . import live
+
+# Outcomes
+CHECKED_IN = 'checked_in'
+ALREADY_CHECKED_IN = 'already_checked_in'
+CHECKED_OUT = 'checked_out'
+ALREADY_CHECKED_OUT = 'already_checked_out'
+NOT_CHECKED_IN = 'not_checked_in'
+
+
+def _open_session(member_id, today):
+    return Attendance.objects.filter(member_id=member_id, date=today, check_out__isnull=True).first()
+
+
+def _lock_member(member_id):
+    """Lock the member row for the rest of the transaction"""
+    return Member.objects.select_for_update().get(pk=member_id)
+
+
+@retry_when_locked
+def check_in(member, check_in_time=None, notes=''):
+    """Open today's session for a member, returns (outcome, attendance)"""
+    today = date.today()
+    with transaction.atomic():
+        _lock_member(member.id)
+        existing = _open_session(member.id, today)
+        if existing:
+            return ALREADY_CHECKED_IN, existing
+        try:
+            with transaction.atomic():
+                attendance = Attendance.objects.create(
+                    member=member,
+                    date=today,
+                    check_in=check_in_time or datetime.now().time(),
+                    notes=notes,
+                )
+        except IntegrityError:
+            # Another check-in won the race on a backend without row locks
+            return ALREADY_CHECKED_IN, _open_session(member.id, today)
+        live.record_check_in()
+        return CHECKED_IN, attendance
+
+
+def _close(attendance, check_out_time):
+    attendance.check_out = check_out_time or datetime.now().time()
+    attendance.save()
+    live.record_check_out()
+    return attendance
+
+
+@retry_when_locked
+def check_out(member, check_out_time=None):
+    """Close the member's open session of today, returns (outcome, attendance)"""
+    with transaction.atomic():
+        _lock_member(member.id)
+        attendance = _open_session(member.id, date.today())
+        if attendance is None:
+            return NOT_CHECKED_IN, None
+        return CHECKED_OUT, _close(attendance, check_out_time)
+
+
+@retry_when_locked
+def check_out_attendance(attendance_id, check_out_time=None):
+    """Close one attendance record by id (front desk), returns (outcome, attendance)"""
+    with transaction.atomic():
+        attendance = Attendance.objects.select_for_update().get(id=attendance_id)
+        if attendance.check_out:
+            return ALREADY_CHECKED_OUT, attendance
+        return CHECKED_OUT, _close(attendance, check_out_time)
@@ -0,0 +1,78 @@
+"""
+Live occupancy counter for 2moreFitness
+Check-in and check-out adjust a single OccupancyCounter row with F()
+expressions so "how many are inside right now" is a primary key lookup
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.core import metrics
+from .models import Attendance, OccupancyCounter
+
+COUNTER_ID = 1
+
+
+def _counter():
+    return OccupancyCounter.objects.filter(pk=COUNTER_ID)
+
+
+def open_sessions_count(today=None):
+    """Ground truth: today's attendance rows without a check-out"""
+    return Attendance.objects.filter(
+        date=today or date.today(),
+        check_out__isnull=True
+    ).count()
+
+
+def record_check_in():
+    """Atomically add one person to the live headcount"""
+    updated = _counter().update(current=F('current') + 1, updated_at=timezone.now())
+    if not updated:
+        reconcile()
+    # Only count check-ins that commit; a rolled-back or retried one never happened
+    transaction.on_commit(lambda: metrics.inc('gym_check_ins_total'))
+
+
+def record_check_out():
+    """Atomically remove one person from the live headcount, never below zero"""
+    updated = _counter().filter(current__gt=0).update(
+        current=F('current') - 1,
+        updated_at=timezone.now()
+    )
+    if not updated and not _counter().exists():
+        reconcile()
+
+
+def reconcile(today=None):
+    """Reset the counter to the real number of open sessions, return (old, new)"""
+    actual = open_sessions_count(today)
+    counter, created = OccupancyCounter.objects.get_or_create(
+        pk=COUNTER_ID,
+        defaults={'current': actual}
+    )
+    previous = None if created else counter.current
+    if not created and counter.current != actual:
+        counter.current = actual
+        counter.save(update_fields=['current', 'updated_at'])
+    return previous, actual
+
+
+def snapshot():
+    """Current headcount and how full the gym is"""
+    counter = _counter().values('current', 'updated_at').first()
+    if counter is None:
+        reconcile()
+        counter = _counter().values('current', 'updated_at').first()
+
+    capacity = getattr(settings, 'GYM_CAPACITY', 100)
+    headcount = counter['current']
+    return {
+        'headcount': headcount,
+        'capacity': capacity,
+        'capacity_percentage': int(headcount / capacity * 100) if capacity else 0,
+        'updated_at': counter['updated_at'].isoformat() if counter['updated_at'] else None,
+    }
@@ -0,0 +1,41 @@
+"""
+Rebuild AttendanceDailyRollup and AttendanceHourlyOccupancy rows from the attendance table
+Usage: python manage.py backfill_attendance_rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.attendance import rollups, occupancy
+
+
+class Command(BaseCommand):
+    help = 'Backfill daily attendance rollups and hourly occupancy histograms'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last date to rebuild (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start_date = self._parse(options['start'], '--start')
+        end_date = self._parse(options['end'], '--end')
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start must not be after --end.')
+
+        written = rollups.backfill(start_date, end_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} daily rollup(s).'))
+
+        days = occupancy.backfill(start_date, end_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt hourly occupancy for {days} day(s).'))
+
+    def _parse(self, value, flag):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2026-02-30
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'{flag} must be a date in YYYY-MM-DD format.')
+        return parsed
@@ -0,0 +1,23 @@
+"""
+Correct drift in the live occupancy counter
+Usage: python manage.py reconcile_occupancy
+Run it from a scheduler (e.g. every few minutes and just after midnight)
+"""
+from django.core.management.base import BaseCommand
+
+from apps.attendance import live
+
+
+class Command(BaseCommand):
+    help = "Reset the live occupancy counter to today's open check-ins"
+
+    def handle(self, *args, **options):
+        previous, actual = live.reconcile()
+        if previous is None:
+            self.stdout.write(self.style.SUCCESS(f'Created occupancy counter at {actual}.'))
+        elif previous != actual:
+            self.stdout.write(self.style.WARNING(
+                f'Occupancy counter drifted by {previous - actual:+d}; reset from {previous} to {actual}.'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Occupancy counter is correct ({actual}).'))
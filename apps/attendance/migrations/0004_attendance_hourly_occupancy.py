@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_attendance_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceHourlyOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField(help_text='0-23')),
+                ('weekday', models.PositiveSmallIntegerField(help_text='0=Monday ... 6=Sunday')),
+                ('peak_headcount', models.IntegerField(default=0)),
+                ('check_ins', models.IntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'attendance_hourly_occupancy',
+                'ordering': ['-date', 'hour'],
+                'unique_together': {('date', 'hour')},
+            },
+        ),
+    ]
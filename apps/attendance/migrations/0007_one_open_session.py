@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:15
+
+from django.db import migrations, models
+from django.db.models import Count, F
+
+
+def close_duplicate_open_sessions(apps, schema_editor):
+    """Keep each member's latest open session per day; close the others at their check-in"""
+    Attendance = apps.get_model('attendance', 'Attendance')
+    duplicates = (
+        Attendance.objects.filter(check_out__isnull=True)
+        .values('member_id', 'date').annotate(open_sessions=Count('id'))
+        .filter(open_sessions__gt=1)
+    )
+    for row in list(duplicates):
+        sessions = Attendance.objects.filter(
+            member_id=row['member_id'], date=row['date'], check_out__isnull=True
+        ).order_by('-check_in', '-id')
+        stale = list(sessions.values_list('id', flat=True)[1:])
+        Attendance.objects.filter(id__in=stale).update(check_out=F('check_in'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_attendance_keyset_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_sessions, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='attendance',
+            constraint=models.UniqueConstraint(condition=models.Q(('check_out__isnull', True)), fields=('member', 'date'), name='attendance_one_open_session'),
+        ),
+    ]
@@ -18,6 +18,18 @@ class Attendance(models.Model):
         db_table = 'attendance'
         ordering = ['-date', '-check_in']
         unique_together = ['member', 'date', 'check_in']
+        indexes = [
+            # Serves date range filters and keyset paging on (-date, -check_in, id)
+            models.Index(fields=['-date', '-check_in', 'id'], name='attendance_keyset_idx'),
+        ]
+        constraints = [
+            # A member has at most one session without a check-out per day
+            models.UniqueConstraint(
+                fields=['member', 'date'],
+                condition=models.Q(check_out__isnull=True),
+                name='attendance_one_open_session',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.member} - {self.date} at {self.check_in}"
@@ -40,3 +52,48 @@ class Attendance(models.Model):
         if duration:
             return int(duration.total_seconds() / 60)
         return None
+
+
+class AttendanceDailyRollup(models.Model):
+    """Precomputed attendance totals for one day"""
+    date = models.DateField(unique=True)
+    visits = models.IntegerField(default=0)
+    unique_members = models.IntegerField(default=0)
+    total_minutes = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'attendance_daily_rollups'
+        ordering = ['-date']
+    
+    def __str__(self):
+        return f"{self.date}: {self.visits} visits"
+
+
+class AttendanceHourlyOccupancy(models.Model):
+    """Peak concurrent headcount and check-ins for one hour of one day"""
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField(help_text="0-23")
+    weekday = models.PositiveSmallIntegerField(help_text="0=Monday ... 6=Sunday")
+    peak_headcount = models.IntegerField(default=0)
+    check_ins = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'attendance_hourly_occupancy'
+        ordering = ['-date', 'hour']
+        unique_together = ['date', 'hour']
+    
+    def __str__(self):
+        return f"{self.date} {self.hour:02d}:00 - peak {self.peak_headcount}"
+
+
+class OccupancyCounter(models.Model):
+    """Live count of members currently checked in (single row)"""
+    current = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'occupancy_counter'
+    
+    def __str__(self):
+        return f"{self.current} in the gym"
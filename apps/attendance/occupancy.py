@@ -0,0 +1,193 @@
+"""
+Hourly occupancy engine for 2moreFitness
+Turns check-in/check-out intervals into a per-hour concurrent headcount with
+a sweep line, and stores one AttendanceHourlyOccupancy row per busy hour so
+peak hours and the weekday x hour heatmap never scan the attendance table
+"""
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Avg, Max, Sum
+from django.utils.dateparse import parse_date
+
+from .models import Attendance, AttendanceHourlyOccupancy
+
+MINUTES_PER_DAY = 24 * 60
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+def _minute_of_day(value):
+    return value.hour * 60 + value.minute
+
+
+def _open_session_minutes():
+    return getattr(settings, 'OCCUPANCY_OPEN_SESSION_MINUTES', 90)
+
+
+def session_interval(check_in, check_out):
+    """(start, end) minutes since midnight, clamped to the same day"""
+    start = _minute_of_day(check_in)
+    if check_out:
+        end = _minute_of_day(check_out)
+    else:
+        # Still checked in (or never checked out) - assume a typical session
+        end = start + _open_session_minutes()
+    end = min(max(end, start + 1), MINUTES_PER_DAY)
+    return start, end
+
+
+def sweep_hourly_peaks(intervals):
+    """
+    Peak concurrent headcount per hour bucket for [start, end) minute intervals
+    Sorting the +1/-1 events is O(n log n); each segment only touches the hours it spans
+    """
+    events = []
+    for start, end in intervals:
+        events.append((start, 1))
+        events.append((end, -1))
+    # Departures sort before arrivals at the same minute
+    events.sort()
+
+    peaks = [0] * 24
+    current = 0
+    previous = 0
+    for minute, delta in events:
+        if current and minute > previous:
+            # `current` people were present for [previous, minute)
+            for hour in range(previous // 60, (minute - 1) // 60 + 1):
+                if current > peaks[hour]:
+                    peaks[hour] = current
+        current += delta
+        previous = minute
+    return peaks
+
+
+def _hourly_rows(day, sessions):
+    intervals = [session_interval(check_in, check_out) for check_in, check_out in sessions]
+    peaks = sweep_hourly_peaks(intervals)
+    check_ins = [0] * 24
+    for start, _ in intervals:
+        check_ins[start // 60] += 1
+    return [
+        AttendanceHourlyOccupancy(
+            date=day,
+            hour=hour,
+            weekday=day.weekday(),
+            peak_headcount=peaks[hour],
+            check_ins=check_ins[hour],
+        )
+        for hour in range(24)
+        if peaks[hour] or check_ins[hour]
+    ]
+
+
+def refresh_day(day):
+    """Recompute the hourly histogram for one date"""
+    if isinstance(day, str):
+        day = parse_date(day)
+    sessions = Attendance.objects.filter(date=day).values_list('check_in', 'check_out')
+    rows = _hourly_rows(day, sessions)
+    with transaction.atomic():
+        AttendanceHourlyOccupancy.objects.filter(date=day).delete()
+        AttendanceHourlyOccupancy.objects.bulk_create(rows)
+    return rows
+
+
+def backfill(start_date=None, end_date=None, batch_size=1000):
+    """
+    Rebuild histograms for a date range in one pass over attendance, streamed
+    in date order so only one day's sessions and one batch of rows are in memory
+    """
+    records = Attendance.objects.all()
+    stale = AttendanceHourlyOccupancy.objects.all()
+    if start_date:
+        records = records.filter(date__gte=start_date)
+        stale = stale.filter(date__gte=start_date)
+    if end_date:
+        records = records.filter(date__lte=end_date)
+        stale = stale.filter(date__lte=end_date)
+
+    rows = records.order_by('date').values_list('date', 'check_in', 'check_out')
+    days = 0
+    hourly = []
+    with transaction.atomic():
+        stale.delete()
+        for day, sessions in groupby(rows.iterator(chunk_size=batch_size), key=itemgetter(0)):
+            hourly.extend(_hourly_rows(day, [(check_in, check_out) for _, check_in, check_out in sessions]))
+            days += 1
+            if len(hourly) >= batch_size:
+                AttendanceHourlyOccupancy.objects.bulk_create(hourly, batch_size=batch_size)
+                hourly = []
+        AttendanceHourlyOccupancy.objects.bulk_create(hourly, batch_size=batch_size)
+    return days
+
+
+def format_hour(hour):
+    """15 -> '3-4 PM'"""
+    start = hour % 12 or 12
+    end = (hour + 1) % 12 or 12
+    suffix = 'AM' if (hour + 1) % 24 < 12 else 'PM'
+    return f'{start}-{end} {suffix}'
+
+
+def peak_hour(start_date, end_date):
+    """Busiest hour of day in the range, or None when there is no data"""
+    busiest = (
+        AttendanceHourlyOccupancy.objects.filter(date__gte=start_date, date__lte=end_date)
+        .values('hour')
+        .annotate(
+            avg_headcount=Avg('peak_headcount'),
+            max_headcount=Max('peak_headcount'),
+            check_ins=Sum('check_ins'),
+        )
+        .order_by('-avg_headcount', '-check_ins', 'hour')
+        .first()
+    )
+    if busiest is None:
+        return None
+    busiest['label'] = format_hour(busiest['hour'])
+    return busiest
+
+
+def weekday_hour_heatmap(start_date, end_date):
+    """
+    Average peak headcount for every weekday x hour cell
+    Returns {'hours': [...], 'rows': [{'day': 'Monday', 'cells': [...]}], 'max': n}
+    where each cell is {'hour': h, 'value': avg, 'level': 0-4}
+    """
+    counts = (
+        AttendanceHourlyOccupancy.objects.filter(date__gte=start_date, date__lte=end_date)
+        .values('weekday', 'hour')
+        .annotate(total=Sum('peak_headcount'))
+    )
+    grid = [[0.0] * 24 for _ in WEEKDAYS]
+    for row in counts:
+        grid[row['weekday']][row['hour']] = row['total']
+
+    # Average over how many of each weekday fall in the range
+    occurrences = [0] * 7
+    for offset in range((end_date - start_date).days + 1):
+        occurrences[(start_date.weekday() + offset) % 7] += 1
+    for weekday, cells in enumerate(grid):
+        if occurrences[weekday]:
+            grid[weekday] = [round(total / occurrences[weekday], 1) for total in cells]
+
+    peak = max(max(cells) for cells in grid)
+
+    def level(value):
+        # 0-4 intensity bucket for the template
+        return 0 if not peak else min(4, int(value / peak * 4 + 0.999))
+
+    return {
+        'hours': list(range(24)),
+        'rows': [
+            {
+                'day': WEEKDAYS[i],
+                'cells': [{'hour': h, 'value': v, 'level': level(v)} for h, v in enumerate(grid[i])],
+            }
+            for i in range(7)
+        ],
+        'max': peak,
+    }
@@ -0,0 +1,177 @@
+"""
+Daily attendance rollups for 2moreFitness
+Keeps one AttendanceDailyRollup row per date so reports read O(days) rows
+instead of counting Attendance once per day. Saves and deletes adjust the
+day's row by deltas under its row lock, so concurrent check-ins queue on
+that one row instead of each recounting the whole day
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils.dateparse import parse_date, parse_time
+
+from .models import Attendance, AttendanceDailyRollup
+
+
+def _session_minutes(day, check_in, check_out):
+    """Minutes between check-in and check-out, 0 while still checked in"""
+    if not check_out:
+        return 0
+    delta = datetime.combine(day, check_out) - datetime.combine(day, check_in)
+    return max(int(delta.total_seconds() / 60), 0)
+
+
+def _lock_day(day):
+    """The day's rollup row, created if missing and locked until the transaction ends"""
+    AttendanceDailyRollup.objects.bulk_create([AttendanceDailyRollup(date=day)], ignore_conflicts=True)
+    return AttendanceDailyRollup.objects.select_for_update().get(date=day)
+
+
+def _visit(values):
+    """(date, member_id, check_in, check_out) with strings parsed"""
+    day, member_id, check_in, check_out = values
+    if isinstance(day, str):
+        day = parse_date(day)
+    if isinstance(check_in, str):
+        check_in = parse_time(check_in)
+    if isinstance(check_out, str):
+        check_out = parse_time(check_out)
+    return day, member_id, check_in, check_out
+
+
+def record_change(previous, current, attendance_id):
+    """
+    Move one attendance record's contribution from `previous` to `current`,
+    each a (date, member_id, check_in, check_out) tuple or None (created /
+    deleted). Call inside a transaction: the affected days stay locked until
+    it commits, and members are counted once the lock is held so a
+    concurrent visit by the same member is never counted twice
+    """
+    changes = []
+    if previous:
+        changes.append((-1, _visit(previous)))
+    if current:
+        changes.append((1, _visit(current)))
+
+    # Lock in date order so two transactions touching the same days cannot deadlock
+    rollups = {day: _lock_day(day) for day in sorted({visit[0] for _, visit in changes})}
+    for sign, (day, member_id, check_in, check_out) in changes:
+        rollup = rollups[day]
+        seen_elsewhere = (
+            Attendance.objects.filter(date=day, member_id=member_id)
+            .exclude(pk=attendance_id).exists()
+        )
+        rollup.visits += sign
+        rollup.unique_members += 0 if seen_elsewhere else sign
+        rollup.total_minutes += sign * _session_minutes(day, check_in, check_out)
+
+    for rollup in rollups.values():
+        if rollup.visits <= 0:
+            rollup.delete()
+        else:
+            rollup.save(update_fields=['visits', 'unique_members', 'total_minutes', 'updated_at'])
+
+
+def refresh_day(day):
+    """Recompute the rollup row for a single date (repairs drift; signals use record_change)"""
+    if isinstance(day, str):
+        day = parse_date(day)
+    with transaction.atomic():
+        # Counting after the lock sees every visit committed before it
+        rollup = _lock_day(day)
+        records = Attendance.objects.filter(date=day)
+        totals = records.aggregate(
+            visits=Count('id'),
+            unique_members=Count('member', distinct=True),
+        )
+        if not totals['visits']:
+            rollup.delete()
+            return None
+
+        rollup.visits = totals['visits']
+        rollup.unique_members = totals['unique_members']
+        rollup.total_minutes = sum(
+            _session_minutes(day, check_in, check_out)
+            for check_in, check_out in records.values_list('check_in', 'check_out')
+        )
+        rollup.save(update_fields=['visits', 'unique_members', 'total_minutes', 'updated_at'])
+    return rollup
+
+
+def backfill(start_date=None, end_date=None, batch_size=1000):
+    """Rebuild rollups for a date range with grouped queries, return rows written"""
+    records = Attendance.objects.all()
+    if start_date:
+        records = records.filter(date__gte=start_date)
+    if end_date:
+        records = records.filter(date__lte=end_date)
+
+    minutes = defaultdict(int)
+    rows = records.order_by().values_list('date', 'check_in', 'check_out')
+    for day, check_in, check_out in rows.iterator(chunk_size=batch_size):
+        minutes[day] += _session_minutes(day, check_in, check_out)
+
+    daily = (
+        records.order_by()
+        .values('date')
+        .annotate(visits=Count('id'), unique_members=Count('member', distinct=True))
+    )
+    rollups = [
+        AttendanceDailyRollup(
+            date=row['date'],
+            visits=row['visits'],
+            unique_members=row['unique_members'],
+            total_minutes=minutes[row['date']],
+        )
+        for row in daily
+    ]
+
+    # Days that no longer have attendance lose their rollup row
+    stale = AttendanceDailyRollup.objects.exclude(date__in=[r.date for r in rollups])
+    if start_date:
+        stale = stale.filter(date__gte=start_date)
+    if end_date:
+        stale = stale.filter(date__lte=end_date)
+    stale.delete()
+
+    AttendanceDailyRollup.objects.bulk_create(
+        rollups,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=['date'],
+        update_fields=['visits', 'unique_members', 'total_minutes', 'updated_at'],
+    )
+    return len(rollups)
+
+
+def daily_stats(start_date, end_date):
+    """One entry per date in the range, zero-filled for days without visits"""
+    rollups = {
+        r.date: r for r in AttendanceDailyRollup.objects.filter(
+            date__gte=start_date,
+            date__lte=end_date,
+        )
+    }
+    stats = []
+    current_date = start_date
+    while current_date <= end_date:
+        rollup = rollups.get(current_date)
+        stats.append({
+            'date': current_date,
+            'visits': rollup.visits if rollup else 0,
+            'unique_members': rollup.unique_members if rollup else 0,
+            'total_minutes': rollup.total_minutes if rollup else 0,
+        })
+        current_date += timedelta(days=1)
+    return stats
+
+
+def visits_between(start_date, end_date):
+    """Total visits in an inclusive date range"""
+    total = AttendanceDailyRollup.objects.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+    ).aggregate(total=Sum('visits'))['total']
+    return total or 0
@@ -0,0 +1,47 @@
+"""
+Signals for attendance app
+"""
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .models import Attendance
+from . import rollups, occupancy
+
+VISIT_FIELDS = ('date', 'member_id', 'check_in', 'check_out')
+
+
+def _visit(instance):
+    return tuple(getattr(instance, field) for field in VISIT_FIELDS)
+
+
+@receiver(pre_save, sender=Attendance)
+def remember_attendance_visit(sender, instance, **kwargs):
+    """Remember the stored visit so the rollup can move its contribution"""
+    instance._previous_visit = None
+    if instance.pk:
+        instance._previous_visit = (
+            Attendance.objects.filter(pk=instance.pk)
+            .values_list(*VISIT_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Attendance)
+def update_rollup_on_save(sender, instance, **kwargs):
+    """Keep the daily rollup and hourly occupancy in step with saved attendance"""
+    previous = getattr(instance, '_previous_visit', None)
+    with transaction.atomic():
+        # The rollup rows stay locked until commit, which also serializes
+        # the occupancy rebuilds of those days
+        rollups.record_change(previous, _visit(instance), instance.pk)
+        occupancy.refresh_day(instance.date)
+        if previous and str(previous[0]) != str(instance.date):
+            occupancy.refresh_day(previous[0])
+
+
+@receiver(post_delete, sender=Attendance)
+def update_rollup_on_delete(sender, instance, **kwargs):
+    """Keep the daily rollup and hourly occupancy in step with deleted attendance"""
+    with transaction.atomic():
+        rollups.record_change(_visit(instance), None, instance.pk)
+        occupancy.refresh_day(instance.date)
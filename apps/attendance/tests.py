@@ -0,0 +1,174 @@
+"""
+Tests for the attendance app
+"""
+import io
+import threading
+from datetime import date, time, timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from apps.members.models import Member
+from . import checkins, live, occupancy, rollups
+from .models import Attendance, AttendanceDailyRollup, AttendanceHourlyOccupancy
+
+
+def make_member(username):
+    member, _ = Member.objects.get_or_create(user=User.objects.create_user(username))
+    return member
+
+
+class DailyRollupTests(TestCase):
+    """Signal-driven deltas must match a full recount of the day"""
+
+    def setUp(self):
+        self.today = date.today()
+        self.yesterday = self.today - timedelta(days=1)
+        self.ana = make_member('ana')
+        self.ben = make_member('ben')
+
+    def assertMatchesRecount(self, day):
+        stored = AttendanceDailyRollup.objects.filter(date=day).values(
+            'visits', 'unique_members', 'total_minutes').first()
+        rollups.refresh_day(day)
+        recounted = AttendanceDailyRollup.objects.filter(date=day).values(
+            'visits', 'unique_members', 'total_minutes').first()
+        self.assertEqual(stored, recounted)
+
+    def test_create_check_out_move_and_delete(self):
+        first = Attendance.objects.create(member=self.ana, date=self.today, check_in=time(6, 0))
+        Attendance.objects.create(member=self.ana, date=self.today, check_in=time(18, 0), check_out=time(19, 15))
+        Attendance.objects.create(member=self.ben, date=self.today, check_in=time(7, 0))
+        rollup = AttendanceDailyRollup.objects.get(date=self.today)
+        self.assertEqual((rollup.visits, rollup.unique_members, rollup.total_minutes), (3, 2, 75))
+
+        first.check_out = time(7, 30)
+        first.save()
+        self.assertMatchesRecount(self.today)
+
+        first.date = self.yesterday
+        first.save()
+        self.assertMatchesRecount(self.today)
+        self.assertMatchesRecount(self.yesterday)
+
+        first.delete()
+        self.assertFalse(AttendanceDailyRollup.objects.filter(date=self.yesterday).exists())
+        self.assertMatchesRecount(self.today)
+
+    def test_same_member_counted_once(self):
+        Attendance.objects.create(member=self.ben, date=self.today, check_in=time(6, 0), check_out=time(7, 0))
+        second = Attendance.objects.create(member=self.ben, date=self.today, check_in=time(17, 0))
+        self.assertEqual(AttendanceDailyRollup.objects.get(date=self.today).unique_members, 1)
+        second.delete()
+        rollup = AttendanceDailyRollup.objects.get(date=self.today)
+        self.assertEqual((rollup.visits, rollup.unique_members, rollup.total_minutes), (1, 1, 60))
+
+
+class OccupancyBackfillTests(TestCase):
+    """The streamed range rebuild must equal rebuilding each day on its own"""
+
+    def test_backfill_matches_refresh_day(self):
+        members = [make_member(f'member{n}') for n in range(4)]
+        start = date.today() - timedelta(days=5)
+        for offset in range(5):
+            for n, member in enumerate(members):
+                Attendance.objects.create(
+                    member=member,
+                    date=start + timedelta(days=offset),
+                    check_in=time(6 + n + offset % 3, 10 * n),
+                    check_out=time(8 + n, 0) if n % 2 else None,
+                )
+
+        def snapshot():
+            return list(AttendanceHourlyOccupancy.objects.order_by('date', 'hour').values_list(
+                'date', 'hour', 'peak_headcount', 'check_ins'))
+
+        expected = snapshot()
+        AttendanceHourlyOccupancy.objects.all().delete()
+        days = occupancy.backfill(start, date.today(), batch_size=7)
+        self.assertEqual(days, 5)
+        self.assertEqual(snapshot(), expected)
+
+
+class ConcurrentCheckInTests(TransactionTestCase):
+    """A double-tapped check-in must leave one open session and one counted visit"""
+
+    def test_one_open_session_per_member(self):
+        member = make_member('rush')
+        workers = 8
+        barrier = threading.Barrier(workers)
+        outcomes = []
+        errors = []
+
+        def tap():
+            try:
+                barrier.wait()
+                outcomes.append(checkins.check_in(member)[0])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=tap) for _ in range(workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(outcomes), sorted([checkins.CHECKED_IN] + [checkins.ALREADY_CHECKED_IN] * (workers - 1)))
+        self.assertEqual(Attendance.objects.filter(member=member, check_out__isnull=True).count(), 1)
+        self.assertEqual(AttendanceDailyRollup.objects.get(date=date.today()).visits, 1)
+        self.assertEqual(live.snapshot()['headcount'], 1)
+
+        self.assertEqual(checkins.check_out(member)[0], checkins.CHECKED_OUT)
+        self.assertEqual(checkins.check_out(member)[0], checkins.NOT_CHECKED_IN)
+        self.assertEqual(live.snapshot()['headcount'], 0)
+
+
+class OccupancyReconcileTests(TestCase):
+    """The daily reconcile drops yesterday's unclosed sessions from the headcount"""
+
+    def test_reconcile_occupancy_after_midnight(self):
+        member = make_member('stayer')
+        checkins.check_in(member)
+        self.assertEqual(live.snapshot()['headcount'], 1)
+
+        # Never checked out; the next day starts with nobody inside
+        Attendance.objects.filter(member=member).update(date=date.today() - timedelta(days=1))
+        call_command('reconcile_occupancy', stdout=io.StringIO())
+        self.assertEqual(live.snapshot()['headcount'], 0)
+
+
+class CheckInMetricTests(TestCase):
+    """gym_check_ins_total counts committed check-ins only"""
+
+    def test_counted_on_commit(self):
+        member = make_member('counted')
+        with mock.patch.object(live.metrics, 'inc') as inc:
+            with self.captureOnCommitCallbacks(execute=True):
+                checkins.check_in(member)
+                inc.assert_not_called()
+        inc.assert_called_once_with('gym_check_ins_total')
+
+    def test_rolled_back_check_in_not_counted(self):
+        with mock.patch.object(live.metrics, 'inc') as inc:
+            with self.captureOnCommitCallbacks(execute=True):
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        live.record_check_in()
+                        raise RuntimeError('rolled back')
+        inc.assert_not_called()
+
+
+class BackfillCommandOptionTests(TestCase):
+    """Impossible dates on the command line are a CommandError, not a traceback"""
+
+    def test_impossible_dates(self):
+        with self.assertRaisesMessage(CommandError, '--start must be a date in YYYY-MM-DD format.'):
+            call_command('backfill_attendance_rollups', '--start', '2026-02-30')
+        with self.assertRaisesMessage(CommandError, '--end must be a date in YYYY-MM-DD format.'):
+            call_command('backfill_attendance_rollups', '--end', '2026-13-01')
@@ -9,4 +9,5 @@ urlpatterns = [
     path('check-out/', views.check_out, name='check_out'),
     path('history/', views.attendance_history, name='attendance_history'),
     path('report/', views.attendance_report, name='attendance_report'),
+    path('occupancy/', views.live_occupancy, name='live_occupancy'),
 ]
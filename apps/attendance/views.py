@@ -5,8 +5,10 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Count, Q
+from django.http import JsonResponse
 from datetime import datetime, timedelta
 from .models import Attendance
+from . import rollups, live, checkins
 from apps.members.models import Member
 
 
@@ -15,26 +17,12 @@ def check_in(request):
     """Member check-in"""
     try:
         member = Member.objects.get(user=request.user)
+        outcome, _ = checkins.check_in(member)
         
-        # Check if already checked in today
-        today = datetime.now().date()
-        existing = Attendance.objects.filter(
-            member=member,
-            date=today,
-            check_out__isnull=True
-        ).first()
-        
-        if existing:
+        if outcome == checkins.ALREADY_CHECKED_IN:
             messages.warning(request, 'You are already checked in!')
             return redirect('member_dashboard')
         
-        # Create attendance record
-        Attendance.objects.create(
-            member=member,
-            date=today,
-            check_in=datetime.now().time()
-        )
-        
         messages.success(request, 'Check-in successful! Have a great workout!')
         return redirect('member_dashboard')
     
@@ -48,23 +36,12 @@ def check_out(request):
     """Member check-out"""
     try:
         member = Member.objects.get(user=request.user)
+        outcome, attendance = checkins.check_out(member)
         
-        # Find today's active check-in
-        today = datetime.now().date()
-        attendance = Attendance.objects.filter(
-            member=member,
-            date=today,
-            check_out__isnull=True
-        ).first()
-        
-        if not attendance:
+        if outcome == checkins.NOT_CHECKED_IN:
             messages.warning(request, 'No active check-in found for today.')
             return redirect('member_dashboard')
         
-        # Update check-out time
-        attendance.check_out = datetime.now().time()
-        attendance.save()
-        
         messages.success(request, f'Check-out successful! You worked out for {attendance.duration_minutes} minutes.')
         return redirect('member_dashboard')
     
@@ -130,20 +107,10 @@ def attendance_report(request):
     ).select_related('member__user')
     
     # Calculate statistics
-    total_visits = records.count()
+    daily_stats = rollups.daily_stats(start_date, end_date)
+    total_visits = sum(day['visits'] for day in daily_stats)
     unique_members = records.values('member').distinct().count()
     
-    # Daily breakdown
-    daily_stats = []
-    current_date = start_date
-    while current_date <= end_date:
-        day_visits = records.filter(date=current_date).count()
-        daily_stats.append({
-            'date': current_date,
-            'visits': day_visits
-        })
-        current_date += timedelta(days=1)
-    
     # Top members
     top_members = (
         records.values('member__user__first_name', 'member__user__last_name')
@@ -161,3 +128,11 @@ def attendance_report(request):
     }
     
     return render(request, 'attendance/attendance_report.html', context)
+
+
+def live_occupancy(request):
+    """Current headcount and capacity percentage as JSON (admins only)"""
+    if not request.session.get('is_admin', False) and not request.user.is_staff:
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    return JsonResponse(live.snapshot())
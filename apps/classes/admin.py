@@ -1,8 +1,31 @@
 from django.contrib import admin
-from .models import GymClass  # or Class depending on your model name
+from .models import GymClass, ClassWaitlist, ClassBooking, ClassOccurrence  # or Class depending on your model name
 
 @admin.register(GymClass)  # or @admin.register(Class)
 class GymClassAdmin(admin.ModelAdmin):
     list_display = ['name', 'trainer', 'day_of_week', 'time', 'is_active']
     list_filter = ['difficulty', 'is_active', 'day_of_week']
-    search_fields = ['name', 'description']
\ No newline at end of file
+    search_fields = ['name', 'description']
+
+
+@admin.register(ClassWaitlist)
+class ClassWaitlistAdmin(admin.ModelAdmin):
+    list_display = ['gym_class', 'member', 'created_at']
+    list_filter = ['gym_class']
+    search_fields = ['member__user__username', 'gym_class__name']
+
+
+@admin.register(ClassBooking)
+class ClassBookingAdmin(admin.ModelAdmin):
+    list_display = ['gym_class', 'member', 'date', 'status', 'created_at']
+    list_filter = ['status', 'date']
+    search_fields = ['member__user__username', 'gym_class__name']
+    date_hierarchy = 'date'
+
+
+@admin.register(ClassOccurrence)
+class ClassOccurrenceAdmin(admin.ModelAdmin):
+    list_display = ['gym_class', 'date', 'starts_at', 'ends_at']
+    list_filter = ['date']
+    search_fields = ['gym_class__name']
+    date_hierarchy = 'date'
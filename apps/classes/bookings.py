@@ -0,0 +1,83 @@
+"""
+Class booking reports for 2moreFitness
+Everything here filters ClassBooking on its (class, date) / (member, date)
+indexes instead of walking the enrolled_classes M2M
+"""
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from apps.attendance.models import Attendance
+from .models import ClassBooking
+
+
+def settle_bookings(session_date):
+    """
+    Close out a past session date: bookings whose member checked in that day
+    become 'attended', the rest become 'no_show'. Returns (attended, no_show)
+    """
+    now = timezone.now()
+    pending = ClassBooking.objects.filter(date=session_date, status='booked')
+    checked_in = Attendance.objects.filter(date=session_date).values('member_id')
+
+    attended = pending.filter(member_id__in=checked_in).update(status='attended', updated_at=now)
+    no_show = pending.exclude(member_id__in=checked_in).update(status='no_show', updated_at=now)
+    return attended, no_show
+
+
+def session_load(gym_class, start_date, end_date):
+    """Booked spots per occurrence date for one class"""
+    return list(
+        ClassBooking.objects.filter(
+            gym_class=gym_class,
+            date__gte=start_date,
+            date__lte=end_date,
+            status__in=ClassBooking.ACTIVE_STATUSES,
+        )
+        .values('date')
+        .annotate(booked=Count('id'))
+        .order_by('date')
+    )
+
+
+def _rate(part, whole):
+    return round(part / whole * 100, 1) if whole else 0
+
+
+def booking_report(start_date, end_date, gym_class=None, member=None):
+    """
+    Booked vs attended vs no-show per class for a date range
+    Returns a list of dicts ordered by class name, each with rates in percent
+    """
+    bookings = ClassBooking.objects.filter(date__gte=start_date, date__lte=end_date)
+    if gym_class is not None:
+        bookings = bookings.filter(gym_class=gym_class)
+    if member is not None:
+        bookings = bookings.filter(member=member)
+
+    rows = (
+        bookings.values('gym_class_id', 'gym_class__name')
+        .annotate(
+            booked=Count('id', filter=~Q(status='cancelled')),
+            attended=Count('id', filter=Q(status='attended')),
+            no_show=Count('id', filter=Q(status='no_show')),
+            cancelled=Count('id', filter=Q(status='cancelled')),
+            sessions=Count('date', distinct=True),
+        )
+        .order_by('gym_class__name')
+    )
+
+    report = []
+    for row in rows:
+        settled = row['attended'] + row['no_show']
+        report.append({
+            'class_id': row['gym_class_id'],
+            'class_name': row['gym_class__name'],
+            'sessions': row['sessions'],
+            'booked': row['booked'],
+            'attended': row['attended'],
+            'no_show': row['no_show'],
+            'cancelled': row['cancelled'],
+            'attendance_rate': _rate(row['attended'], settled),
+            'no_show_rate': _rate(row['no_show'], settled),
+        })
+    return report
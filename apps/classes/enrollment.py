@@ -0,0 +1,182 @@
+"""
+Class enrollment engine for 2moreFitness
+Every enroll/unenroll/booking locks the one GymClass row it touches, so bursts
+of requests for the same class queue up while other classes stay unaffected
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import metrics
+from apps.core.locking import retry_when_locked
+from apps.members.models import Member
+from .models import GymClass, ClassWaitlist, ClassBooking
+
+# Enrollment outcomes
+ENROLLED = 'enrolled'
+ALREADY_ENROLLED = 'already_enrolled'
+WAITLISTED = 'waitlisted'
+ALREADY_WAITLISTED = 'already_waitlisted'
+FULL = 'full'
+UNENROLLED = 'unenrolled'
+LEFT_WAITLIST = 'left_waitlist'
+NOT_ENROLLED = 'not_enrolled'
+
+# Session booking outcomes
+BOOKED = 'booked'
+ALREADY_BOOKED = 'already_booked'
+SESSION_FULL = 'session_full'
+WRONG_DAY = 'wrong_day'
+CANCELLED = 'cancelled'
+NOT_BOOKED = 'not_booked'
+
+Enrollment = Member.enrolled_classes.through
+
+
+def _lock_class(class_id, **filters):
+    """Lock the class row for the rest of the transaction"""
+    return GymClass.objects.select_for_update().get(id=class_id, **filters)
+
+
+def _enrolled_count(gym_class):
+    return Enrollment.objects.filter(gymclass_id=gym_class.id).count()
+
+
+def _waitlist_enabled():
+    return getattr(settings, 'CLASS_WAITLIST_ENABLED', True)
+
+
+@retry_when_locked
+def enroll(member, class_id):
+    """
+    Enroll a member if there is room, otherwise waitlist (or reject)
+    Returns (outcome, gym_class)
+    """
+    with transaction.atomic():
+        gym_class = _lock_class(class_id, is_active=True)
+
+        if Enrollment.objects.filter(gymclass_id=gym_class.id, member_id=member.id).exists():
+            return ALREADY_ENROLLED, gym_class
+
+        if _enrolled_count(gym_class) < gym_class.max_capacity:
+            Enrollment.objects.create(gymclass_id=gym_class.id, member_id=member.id)
+            ClassWaitlist.objects.filter(gym_class=gym_class, member=member).delete()
+            transaction.on_commit(lambda: metrics.inc('gym_class_enrollments_total', outcome=ENROLLED))
+            return ENROLLED, gym_class
+
+        if not _waitlist_enabled():
+            return FULL, gym_class
+
+        _, created = ClassWaitlist.objects.get_or_create(gym_class=gym_class, member=member)
+        if created:
+            transaction.on_commit(lambda: metrics.inc('gym_class_enrollments_total', outcome=WAITLISTED))
+        return (WAITLISTED if created else ALREADY_WAITLISTED), gym_class
+
+
+@retry_when_locked
+def unenroll(member, class_id):
+    """
+    Drop a member from a class (or its waitlist) and promote whoever is next
+    Returns (outcome, gym_class, promoted_members)
+    """
+    with transaction.atomic():
+        gym_class = _lock_class(class_id)
+
+        removed, _ = Enrollment.objects.filter(gymclass_id=gym_class.id, member_id=member.id).delete()
+        if removed:
+            return UNENROLLED, gym_class, _promote(gym_class)
+
+        left, _ = ClassWaitlist.objects.filter(gym_class=gym_class, member=member).delete()
+        return (LEFT_WAITLIST if left else NOT_ENROLLED), gym_class, []
+
+
+@retry_when_locked
+def promote_waitlist(class_id):
+    """Fill any open spots from the waitlist, e.g. after capacity is raised"""
+    with transaction.atomic():
+        return _promote(_lock_class(class_id))
+
+
+def _promote(gym_class):
+    """Move waitlisted members into open spots; caller holds the class lock"""
+    open_spots = gym_class.max_capacity - _enrolled_count(gym_class)
+    if open_spots <= 0:
+        return []
+
+    entries = list(
+        ClassWaitlist.objects.filter(gym_class=gym_class)
+        .select_related('member__user')
+        .order_by('created_at', 'id')[:open_spots]
+    )
+    if not entries:
+        return []
+
+    Enrollment.objects.bulk_create(
+        [Enrollment(gymclass_id=gym_class.id, member_id=entry.member_id) for entry in entries],
+        ignore_conflicts=True,
+    )
+    ClassWaitlist.objects.filter(id__in=[entry.id for entry in entries]).delete()
+    transaction.on_commit(lambda: metrics.inc('gym_class_enrollments_total', len(entries), outcome='promoted'))
+    return [entry.member for entry in entries]
+
+
+@retry_when_locked
+def book_session(member, class_id, session_date):
+    """
+    Book a member into one dated occurrence of a class
+    Capacity is checked per occurrence with an index lookup on (class, date)
+    Returns (outcome, gym_class, booking)
+    """
+    with transaction.atomic():
+        gym_class = _lock_class(class_id, is_active=True)
+
+        if session_date < date.today() or session_date.strftime('%A').lower() != gym_class.day_of_week:
+            return WRONG_DAY, gym_class, None
+
+        booking = ClassBooking.objects.filter(
+            gym_class=gym_class, member=member, date=session_date
+        ).first()
+        if booking and booking.status in ClassBooking.ACTIVE_STATUSES:
+            return ALREADY_BOOKED, gym_class, booking
+
+        booked = ClassBooking.objects.filter(
+            gym_class=gym_class,
+            date=session_date,
+            status__in=ClassBooking.ACTIVE_STATUSES,
+        ).count()
+        if booked >= gym_class.max_capacity:
+            return SESSION_FULL, gym_class, booking
+
+        if booking:
+            booking.status = 'booked'
+            booking.save(update_fields=['status', 'updated_at'])
+        else:
+            booking = ClassBooking.objects.create(gym_class=gym_class, member=member, date=session_date)
+        return BOOKED, gym_class, booking
+
+
+@retry_when_locked
+def cancel_session(member, class_id, session_date):
+    """Release a member's spot in a dated occurrence, returns (outcome, gym_class)"""
+    with transaction.atomic():
+        gym_class = _lock_class(class_id)
+        cancelled = ClassBooking.objects.filter(
+            gym_class=gym_class,
+            member=member,
+            date=session_date,
+            status='booked',
+        ).update(status='cancelled', updated_at=timezone.now())
+        return (CANCELLED if cancelled else NOT_BOOKED), gym_class
+
+
+def waitlist_position(member, gym_class):
+    """1-based place in the waitlist, or None if not waiting"""
+    entry = ClassWaitlist.objects.filter(gym_class=gym_class, member=member).first()
+    if entry is None:
+        return None
+    return ClassWaitlist.objects.filter(
+        gym_class=gym_class,
+        created_at__lte=entry.created_at,
+    ).exclude(created_at=entry.created_at, id__gt=entry.id).count()
@@ -0,0 +1,32 @@
+"""
+Roll the class occurrence calendar forward
+Usage: python manage.py generate_class_occurrences [--resync]
+Run daily so the calendar always covers CLASS_CALENDAR_WEEKS ahead
+"""
+from django.core.management.base import BaseCommand
+
+from apps.classes import schedule
+from apps.classes.models import GymClass
+
+
+class Command(BaseCommand):
+    help = 'Materialize dated class occurrences for the rolling calendar horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--resync',
+            action='store_true',
+            help='Also rebuild future occurrences of every class (after bulk schedule edits)',
+        )
+
+    def handle(self, *args, **options):
+        if options['resync']:
+            for gym_class in GymClass.objects.all():
+                schedule.sync_class(gym_class)
+            self.stdout.write('Resynced future occurrences for all classes.')
+
+        created, pruned = schedule.extend_horizon()
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {created} occurrence(s), pruned {pruned} old occurrence(s) '
+            f'({schedule.horizon_weeks()}-week horizon).'
+        ))
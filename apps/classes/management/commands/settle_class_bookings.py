@@ -0,0 +1,38 @@
+"""
+Mark past class bookings as attended or no-show from attendance check-ins
+Usage: python manage.py settle_class_bookings [--days 7]
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.classes.bookings import settle_bookings
+from apps.classes.models import ClassBooking
+
+
+class Command(BaseCommand):
+    help = 'Settle booked class sessions from past days into attended / no-show'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='How many past days to settle')
+
+    def handle(self, *args, **options):
+        today = date.today()
+        start_date = today - timedelta(days=options['days'])
+        session_dates = (
+            ClassBooking.objects.filter(date__gte=start_date, date__lt=today, status='booked')
+            .values_list('date', flat=True)
+            .distinct()
+            .order_by('date')
+        )
+
+        total_attended = total_no_show = 0
+        for session_date in session_dates:
+            attended, no_show = settle_bookings(session_date)
+            total_attended += attended
+            total_no_show += no_show
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Settled {total_attended + total_no_show} booking(s): '
+            f'{total_attended} attended, {total_no_show} no-show.'
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_auto_20260208_1316'),
+        ('classes', '0003_fix_description_blank'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassWaitlist',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('gym_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='classes.gymclass')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='members.member')),
+            ],
+            options={
+                'db_table': 'class_waitlist',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['gym_class', 'created_at'], name='waitlist_class_created_idx')],
+                'unique_together': {('gym_class', 'member')},
+            },
+        ),
+    ]
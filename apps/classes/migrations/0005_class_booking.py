@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_auto_20260208_1316'),
+        ('classes', '0004_class_waitlist'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassBooking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('status', models.CharField(choices=[('booked', 'Booked'), ('attended', 'Attended'), ('no_show', 'No Show'), ('cancelled', 'Cancelled')], default='booked', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gym_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='classes.gymclass')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='class_bookings', to='members.member')),
+            ],
+            options={
+                'db_table': 'class_bookings',
+                'ordering': ['date', 'gym_class'],
+                'indexes': [models.Index(fields=['gym_class', 'date'], name='booking_class_date_idx'), models.Index(fields=['member', 'date'], name='booking_member_date_idx')],
+                'unique_together': {('gym_class', 'member', 'date')},
+            },
+        ),
+    ]
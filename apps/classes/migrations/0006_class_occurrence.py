@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('classes', '0005_class_booking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassOccurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('gym_class', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occurrences', to='classes.gymclass')),
+            ],
+            options={
+                'db_table': 'class_occurrences',
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['starts_at'], name='occurrence_starts_at_idx'), models.Index(fields=['date', 'starts_at'], name='occurrence_date_starts_idx')],
+                'unique_together': {('gym_class', 'date')},
+            },
+        ),
+    ]
@@ -5,6 +5,34 @@ from django.db import models
 from apps.trainers.models import Trainer
 
 
+WEEKDAY_ORDER = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+class GymClassQuerySet(models.QuerySet):
+    """Query helpers for gym classes"""
+    
+    def in_week_order(self):
+        """Order Monday to Sunday, then by start time (day_of_week sorts alphabetically)"""
+        weekday = models.Case(
+            *[models.When(day_of_week=day, then=models.Value(i)) for i, day in enumerate(WEEKDAY_ORDER)],
+            output_field=models.IntegerField(),
+        )
+        return self.annotate(weekday_number=weekday).order_by('weekday_number', 'time', 'id')
+    
+    def with_enrollment(self):
+        """Annotate enrolled count, spots available and is_full in SQL"""
+        return self.annotate(
+            annotated_enrolled_count=models.Count('enrolled_members', distinct=True),
+        ).annotate(
+            annotated_spots_available=models.F('max_capacity') - models.F('annotated_enrolled_count'),
+            annotated_is_full=models.Case(
+                models.When(annotated_enrolled_count__gte=models.F('max_capacity'), then=models.Value(True)),
+                default=models.Value(False),
+                output_field=models.BooleanField(),
+            ),
+        )
+
+
 class GymClass(models.Model):
     """Gym class/session"""
     DIFFICULTY_CHOICES = [
@@ -35,6 +63,8 @@ class GymClass(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = GymClassQuerySet.as_manager()
+    
     class Meta:
         db_table = 'gym_classes'
         ordering = ['day_of_week', 'time']
@@ -46,17 +76,92 @@ class GymClass(models.Model):
     
     @property
     def enrolled_count(self):
-        """Get number of enrolled members"""
+        """Get number of enrolled members (uses with_enrollment() annotation if present)"""
+        if hasattr(self, 'annotated_enrolled_count'):
+            return self.annotated_enrolled_count
         return self.enrolled_members.count()
     
     @property
     def spots_available(self):
         """Get number of available spots"""
+        if hasattr(self, 'annotated_spots_available'):
+            return self.annotated_spots_available
         return self.max_capacity - self.enrolled_count
     
     @property
     def is_full(self):
         """Check if class is full"""
+        if hasattr(self, 'annotated_is_full'):
+            return self.annotated_is_full
         return self.enrolled_count >= self.max_capacity
     
-    # REMOVED duplicate available_spots property - gamitin na lang ang spots_available
\ No newline at end of file
+    # REMOVED duplicate available_spots property - gamitin na lang ang spots_available
+
+class ClassWaitlist(models.Model):
+    """Members waiting for a spot in a full class (first come, first served)"""
+    gym_class = models.ForeignKey(GymClass, on_delete=models.CASCADE, related_name='waitlist_entries')
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='waitlist_entries')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'class_waitlist'
+        ordering = ['created_at', 'id']
+        unique_together = ['gym_class', 'member']
+        indexes = [
+            models.Index(fields=['gym_class', 'created_at'], name='waitlist_class_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member} waiting for {self.gym_class.name}"
+
+
+class ClassBooking(models.Model):
+    """A member's spot in one dated occurrence of a class"""
+    STATUS_CHOICES = [
+        ('booked', 'Booked'),
+        ('attended', 'Attended'),
+        ('no_show', 'No Show'),
+        ('cancelled', 'Cancelled'),
+    ]
+    
+    # Statuses that hold a spot in the session
+    ACTIVE_STATUSES = ['booked', 'attended']
+    
+    gym_class = models.ForeignKey(GymClass, on_delete=models.CASCADE, related_name='bookings')
+    member = models.ForeignKey('members.Member', on_delete=models.CASCADE, related_name='class_bookings')
+    date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='booked')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'class_bookings'
+        ordering = ['date', 'gym_class']
+        unique_together = ['gym_class', 'member', 'date']
+        indexes = [
+            models.Index(fields=['gym_class', 'date'], name='booking_class_date_idx'),
+            models.Index(fields=['member', 'date'], name='booking_member_date_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.member} - {self.gym_class.name} on {self.date} ({self.status})"
+
+
+class ClassOccurrence(models.Model):
+    """A concrete dated session of a weekly class, materialized ahead of time"""
+    gym_class = models.ForeignKey(GymClass, on_delete=models.CASCADE, related_name='occurrences')
+    date = models.DateField()
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'class_occurrences'
+        ordering = ['starts_at']
+        unique_together = ['gym_class', 'date']
+        indexes = [
+            models.Index(fields=['starts_at'], name='occurrence_starts_at_idx'),
+            models.Index(fields=['date', 'starts_at'], name='occurrence_date_starts_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.gym_class.name} on {self.date}"
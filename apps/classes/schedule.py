@@ -0,0 +1,126 @@
+"""
+Class occurrence calendar for 2moreFitness
+Materializes every weekly GymClass into dated ClassOccurrence rows for a
+rolling horizon (CLASS_CALENDAR_WEEKS) so schedules are one indexed range
+query on starts_at, already in chronological order
+"""
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .models import GymClass, ClassOccurrence, WEEKDAY_ORDER
+
+
+def horizon_weeks():
+    return getattr(settings, 'CLASS_CALENDAR_WEEKS', 4)
+
+
+def _occurrence_dates(gym_class, start_date, end_date):
+    """Dates in [start_date, end_date) that fall on the class's weekday"""
+    weekday = WEEKDAY_ORDER.index(gym_class.day_of_week)
+    first = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+    current = first
+    while current < end_date:
+        yield current
+        current += timedelta(days=7)
+
+
+def _build(gym_class, session_date):
+    start_time = gym_class.time
+    if isinstance(start_time, str):
+        start_time = parse_time(start_time)
+    starts_at = timezone.make_aware(datetime.combine(session_date, start_time))
+    return ClassOccurrence(
+        gym_class=gym_class,
+        date=session_date,
+        starts_at=starts_at,
+        ends_at=starts_at + timedelta(minutes=gym_class.duration),
+    )
+
+
+def _planned(classes, start_date, end_date):
+    return [
+        _build(gym_class, session_date)
+        for gym_class in classes
+        for session_date in _occurrence_dates(gym_class, start_date, end_date)
+    ]
+
+
+def sync_class(gym_class, today=None):
+    """
+    Bring one class's future occurrences in line with its current schedule
+    Past occurrences are left alone so history keeps its original times
+    """
+    today = today or date.today()
+    end_date = today + timedelta(weeks=horizon_weeks())
+    future = ClassOccurrence.objects.filter(gym_class=gym_class, date__gte=today)
+
+    with transaction.atomic():
+        if not gym_class.is_active:
+            future.delete()
+            return 0
+
+        planned = {o.date: o for o in _planned([gym_class], today, end_date)}
+        existing = {o.date: o for o in future}
+
+        # Dropped dates (day moved or beyond the horizon)
+        stale = [o.id for d, o in existing.items() if d not in planned]
+        if stale:
+            ClassOccurrence.objects.filter(id__in=stale).delete()
+
+        # Time or duration changed
+        moved = [
+            existing[d] for d, o in planned.items()
+            if d in existing and (existing[d].starts_at != o.starts_at or existing[d].ends_at != o.ends_at)
+        ]
+        for occurrence in moved:
+            occurrence.starts_at = planned[occurrence.date].starts_at
+            occurrence.ends_at = planned[occurrence.date].ends_at
+        if moved:
+            ClassOccurrence.objects.bulk_update(moved, ['starts_at', 'ends_at'])
+
+        new = [o for d, o in planned.items() if d not in existing]
+        ClassOccurrence.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+def extend_horizon(today=None, batch_size=1000):
+    """
+    Roll the calendar forward for every active class: add occurrences that
+    entered the horizon and prune past ones older than the horizon length.
+    Returns (created, pruned)
+    """
+    today = today or date.today()
+    end_date = today + timedelta(weeks=horizon_weeks())
+    classes = GymClass.objects.filter(is_active=True)
+
+    existing = set(
+        ClassOccurrence.objects.filter(date__gte=today, date__lt=end_date)
+        .values_list('gym_class_id', 'date')
+    )
+    new = [
+        o for o in _planned(classes, today, end_date)
+        if (o.gym_class_id, o.date) not in existing
+    ]
+    ClassOccurrence.objects.bulk_create(new, batch_size=batch_size, ignore_conflicts=True)
+    pruned, _ = ClassOccurrence.objects.filter(
+        date__lt=today - timedelta(weeks=horizon_weeks())
+    ).delete()
+    return len(new), pruned
+
+
+def upcoming(start=None, end=None, classes=None):
+    """Occurrences in [start, end) in chronological order, with class and trainer joined"""
+    start = start or timezone.now()
+    end = end or start + timedelta(weeks=1)
+    occurrences = ClassOccurrence.objects.filter(
+        starts_at__gte=start,
+        starts_at__lt=end,
+        gym_class__is_active=True,
+    )
+    if classes is not None:
+        occurrences = occurrences.filter(gym_class__in=classes)
+    return occurrences.select_related('gym_class__trainer__user').order_by('starts_at')
@@ -0,0 +1,15 @@
+"""
+Signals for classes app
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import GymClass
+from . import schedule
+
+
+@receiver(post_save, sender=GymClass)
+def sync_class_occurrences(sender, instance, raw=False, **kwargs):
+    """Regenerate a class's future occurrences when its schedule changes"""
+    if raw:
+        return
+    schedule.sync_class(instance)
@@ -0,0 +1,124 @@
+"""
+Tests for the classes app
+"""
+import threading
+from collections import Counter
+from datetime import time
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from apps.core.tests import admin_client
+from apps.members.models import Member
+from . import enrollment
+from .models import GymClass, ClassWaitlist
+
+WORKERS = 12
+
+
+class ConcurrentEnrollmentTests(TransactionTestCase):
+    """Many threads enrolling in one class must never push it over capacity"""
+
+    def setUp(self):
+        self.gym_class = GymClass.objects.create(
+            name='Spin', duration=45, max_capacity=5, day_of_week='monday', time=time(6, 0),
+        )
+        self.members = []
+        for n in range(WORKERS):
+            member, _ = Member.objects.get_or_create(user=User.objects.create_user(f'rider{n}'))
+            self.members.append(member)
+
+    def test_capacity_holds_under_concurrency(self):
+        barrier = threading.Barrier(WORKERS)
+        outcomes = Counter()
+        errors = []
+        lock = threading.Lock()
+
+        def enroll(member):
+            try:
+                barrier.wait()
+                outcome, _ = enrollment.enroll(member, self.gym_class.id)
+                with lock:
+                    outcomes[outcome] += 1
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=enroll, args=(member,)) for member in self.members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        enrolled = enrollment.Enrollment.objects.filter(gymclass_id=self.gym_class.id).count()
+        waitlisted = ClassWaitlist.objects.filter(gym_class=self.gym_class).count()
+        self.assertLessEqual(enrolled, self.gym_class.max_capacity)
+        self.assertEqual(enrolled, self.gym_class.max_capacity)
+        self.assertEqual(waitlisted, WORKERS - enrolled)
+        self.assertEqual(outcomes, {enrollment.ENROLLED: enrolled, enrollment.WAITLISTED: waitlisted})
+
+
+class ClassScheduleViewTests(TestCase):
+    """The schedule page renders the coming week's sessions from one query"""
+
+    def test_schedule_renders_upcoming_sessions(self):
+        for day in ('monday', 'wednesday', 'friday'):
+            GymClass.objects.create(name=f'Yoga {day}', duration=60, max_capacity=10, day_of_week=day, time=time(7, 0))
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('class_schedule'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['occurrences']), 3)
+        self.assertContains(response, 'Yoga friday')
+
+
+class ClassEnrollmentQueryTests(TestCase):
+    """Class lists annotated with_enrollment cost the same queries at any size"""
+
+    # Session, the stats aggregate, the trainer filter and the page
+    QUERIES = 4
+
+    def setUp(self):
+        cache.clear()
+        self.members = [
+            Member.objects.get_or_create(user=User.objects.create_user(f'rider{n}'))[0] for n in range(4)
+        ]
+        admin_client(self.client)
+        # The first request also refreshes the session's expiry and fills the count cache
+        self.client.get(reverse('admin_class_list'))
+
+    def add_classes(self, count):
+        start = GymClass.objects.count()
+        for n in range(start, start + count):
+            gym_class = GymClass.objects.create(
+                name=f'Spin {n}', duration=45, max_capacity=3, day_of_week='monday', time=time(6, 0),
+            )
+            gym_class.enrolled_members.add(*self.members[:n % 5])
+
+    def assert_list_queries(self):
+        with self.assertNumQueries(self.QUERIES):
+            response = self.client.get(reverse('admin_class_list'))
+            # Render-time reads come from the annotation, not a COUNT per class
+            rows = [(c.enrolled_count, c.spots_available, c.is_full) for c in response.context['classes']]
+        return rows
+
+    def test_queries_do_not_grow_with_classes(self):
+        self.add_classes(3)
+        self.assertEqual(self.assert_list_queries(), [(0, 3, False), (1, 2, False), (2, 1, False)])
+
+        self.add_classes(20)
+        rows = self.assert_list_queries()
+        self.assertEqual(len(rows), 9)
+        self.assertIn((4, -1, True), rows)
+
+    def test_properties_fall_back_without_annotation(self):
+        self.add_classes(5)
+        gym_class = GymClass.objects.get(name='Spin 4')
+        self.assertEqual((gym_class.enrolled_count, gym_class.spots_available, gym_class.is_full), (4, -1, True))
+
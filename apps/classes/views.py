@@ -2,7 +2,8 @@ from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.paginator import Paginator
-from .models import GymClass
+from .models import GymClass, WEEKDAY_ORDER
+from . import schedule
 from apps.members.models import Member
 
 # ============================================
@@ -10,7 +11,7 @@ from apps.members.models import Member
 # ============================================
 def class_list(request):
     """Public class list for landing page"""
-    classes = GymClass.objects.filter(is_active=True)[:6]
+    classes = GymClass.objects.filter(is_active=True).select_related('trainer__user').with_enrollment()[:6]
     return render(request, 'classes/class_list.html', {'classes': classes})
 
 
@@ -20,7 +21,7 @@ def class_list(request):
 @login_required
 def member_class_list(request):
     """Member class list with filters and enrollment"""
-    classes = GymClass.objects.filter(is_active=True).order_by('day_of_week', 'time')
+    classes = GymClass.objects.filter(is_active=True).in_week_order()
     
     # Apply filters
     category = request.GET.get('category')
@@ -32,13 +33,8 @@ def member_class_list(request):
         classes = classes.filter(difficulty=difficulty)
     
     day = request.GET.get('day')
-    if day:
-        day_map = {
-            'monday': 0, 'tuesday': 1, 'wednesday': 2, 
-            'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6
-        }
-        if day in day_map:
-            classes = classes.filter(day_of_week=day_map[day])
+    if day in WEEKDAY_ORDER:
+        classes = classes.filter(day_of_week=day)
     
     duration = request.GET.get('duration')
     if duration:
@@ -48,6 +44,8 @@ def member_class_list(request):
     if search:
         classes = classes.filter(name__icontains=search) | classes.filter(description__icontains=search)
     
+    classes = classes.select_related('trainer__user').with_enrollment()
+    
     # Pagination
     paginator = Paginator(classes, 9)
     page_number = request.GET.get('page')
@@ -66,11 +64,6 @@ def member_class_list(request):
         except Member.DoesNotExist:
             pass
     
-    # Calculate spots available
-    for class_obj in page_obj:
-        enrolled_count = class_obj.enrolled_members.count()
-        class_obj.spots_available = class_obj.max_capacity - enrolled_count
-    
     context = {
         'classes': page_obj,
         'enrolled_class_ids': enrolled_class_ids,
@@ -84,7 +77,11 @@ def member_class_list(request):
 # ============================================
 def class_detail(request, class_id):
     """Class detail view"""
-    class_obj = get_object_or_404(GymClass, id=class_id, is_active=True)
+    class_obj = get_object_or_404(
+        GymClass.objects.select_related('trainer__user').with_enrollment(),
+        id=class_id,
+        is_active=True
+    )
     
     # Check if user is enrolled
     is_enrolled = False
@@ -98,8 +95,8 @@ def class_detail(request, class_id):
     context = {
         'class': class_obj,
         'is_enrolled': is_enrolled,
-        'enrolled_count': class_obj.enrolled_members.count(),
-        'spots_available': class_obj.max_capacity - class_obj.enrolled_members.count(),
+        'enrolled_count': class_obj.enrolled_count,
+        'spots_available': class_obj.spots_available,
     }
     return render(request, 'classes/class_detail.html', context)
 
@@ -108,6 +105,6 @@ def class_detail(request, class_id):
 # CLASS SCHEDULE
 # ============================================
 def class_schedule(request):
-    """Class schedule view"""
-    classes = GymClass.objects.filter(is_active=True).order_by('day_of_week', 'time')
-    return render(request, 'classes/class_schedule.html', {'classes': classes})
\ No newline at end of file
+    """Class schedule view - the next week of dated sessions in time order"""
+    occurrences = list(schedule.upcoming())
+    return render(request, 'classes/class_schedule.html', {'occurrences': occurrences})
\ No newline at end of file
@@ -0,0 +1,237 @@
+"""
+View benchmarks for 2moreFitness
+Runs the Django test client against the major admin, member, trainer and
+public pages on a generated dataset (see generate_load_data), measures
+latency percentiles and SQL query counts per view, and compares them with
+the budget file checked in at benchmarks/view_budgets.json. Query budgets
+are exact ceilings, so an N+1 shows up as soon as a page runs more queries
+than it did when the budget was recorded; latency budgets get a tolerance
+because they depend on the machine
+"""
+import json
+import time
+from datetime import date
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from apps.members.models import Member
+from apps.trainers.models import Trainer
+from .instrumentation import RequestStats, _percentile
+from .loadgen import LoadDataOptions, generate
+from .models import UserProfile
+
+DEFAULT_BUDGET_FILE = settings.BASE_DIR / 'benchmarks' / 'view_budgets.json'
+DEFAULT_TOLERANCE = 0.5
+# Headroom written into the budget file by --update
+LATENCY_HEADROOM = 1.5
+
+# (url name, who is logged in, query string)
+VIEWS = [
+    ('index', None, ''),
+    ('admin_dashboard', 'admin', ''),
+    ('admin_member_list', 'admin', ''),
+    ('admin_class_list', 'admin', ''),
+    ('admin_attendance_report', 'admin', ''),
+    ('attendance_report', 'admin', '?days=30'),
+    ('member_dashboard', 'member', ''),
+    ('member_class_list', 'member', ''),
+    ('trainer_dashboard', 'trainer', ''),
+]
+
+
+class BenchmarkError(Exception):
+    """The dataset or budget file is not usable"""
+
+
+# ============================================
+# CLIENTS
+# ============================================
+def _admin_user(prefix):
+    """A user with the admin role, created once per dataset"""
+    user, created = User.objects.get_or_create(
+        username=f'{prefix}_benchadmin',
+        defaults={'email': f'{prefix}_benchadmin@example.com', 'first_name': 'Benchmark', 'last_name': 'Admin'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    UserProfile.objects.update_or_create(user=user, defaults={'role': 'admin'})
+    return user
+
+
+def _busiest_member(prefix):
+    """The active member with the most class enrollments, the heaviest member pages"""
+    return (
+        Member.objects.filter(user__username__startswith=prefix, is_active=True, memberships__status='active')
+        .annotate(class_count=Count('enrolled_classes', distinct=True))
+        .order_by('-class_count', 'id').select_related('user').first()
+    )
+
+
+def _busiest_trainer(prefix):
+    return (
+        Trainer.objects.filter(user__username__startswith=prefix)
+        .annotate(class_count=Count('classes'))
+        .order_by('-class_count', 'id').select_related('user').first()
+    )
+
+
+def _client(user=None, admin=False):
+    client = Client()
+    if user is not None:
+        client.force_login(user)
+    if admin:
+        # What login_view stores for the static administrator
+        session = client.session
+        session['is_admin'] = True
+        session['is_member'] = False
+        session['user_type'] = 'admin'
+        session.save()
+    return client
+
+
+def clients(prefix):
+    """{role: logged-in test client} for every role the benchmarked views need"""
+    member = _busiest_member(prefix)
+    trainer = _busiest_trainer(prefix)
+    if member is None or trainer is None:
+        raise BenchmarkError(
+            f'No generated data with prefix "{prefix}"; run generate_load_data first or pass --generate.'
+        )
+    return {
+        None: _client(),
+        'admin': _client(_admin_user(prefix), admin=True),
+        'member': _client(member.user),
+        'trainer': _client(trainer.user),
+    }
+
+
+def ensure_dataset(prefix, members):
+    """Generate a dataset of `members` members unless one with this prefix exists"""
+    if User.objects.filter(username__startswith=prefix).exists():
+        return False
+    generate(LoadDataOptions(members=members, prefix=prefix), log=lambda message: None)
+    return True
+
+
+# ============================================
+# MEASURING
+# ============================================
+def _request(client, url):
+    stats = RequestStats()
+    started = time.perf_counter()
+    with connections['default'].execute_wrapper(stats):
+        response = client.get(url)
+    return response.status_code, (time.perf_counter() - started) * 1000, stats.queries
+
+
+def measure_view(client, url, runs, warmup):
+    """
+    One cold request (caches cleared) plus `warmup` unmeasured and `runs`
+    measured ones. Query counts are the maximum over every request, cold
+    included, so cached pages cannot hide an N+1
+    """
+    cache.clear()
+    status, cold_ms, cold_queries = _request(client, url)
+    if status != 200:
+        raise BenchmarkError(f'GET {url} returned {status}.')
+    for _ in range(warmup):
+        _request(client, url)
+
+    timings, queries = [], [cold_queries]
+    for _ in range(runs):
+        _, elapsed, count = _request(client, url)
+        timings.append(elapsed)
+        queries.append(count)
+    timings.sort()
+    return {
+        'url': url,
+        'cold_ms': round(cold_ms, 1),
+        'p50_ms': round(_percentile(timings, 50), 1),
+        'p95_ms': round(_percentile(timings, 95), 1),
+        'p99_ms': round(_percentile(timings, 99), 1),
+        'max_queries': max(queries),
+    }
+
+
+def run_benchmarks(prefix='load', runs=20, warmup=2, only=None):
+    """{view name: measurements} for every benchmarked view"""
+    setup_test_environment()
+    try:
+        logged_in = clients(prefix)
+        results = {}
+        for name, role, query in VIEWS:
+            if only and name not in only:
+                continue
+            results[name] = measure_view(logged_in[role], reverse(name) + query, runs, warmup)
+        return results
+    finally:
+        teardown_test_environment()
+
+
+# ============================================
+# BUDGETS
+# ============================================
+def load_budgets(path=DEFAULT_BUDGET_FILE):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise BenchmarkError(f'Budget file {path} does not exist; create it with --update.')
+    except ValueError as e:
+        raise BenchmarkError(f'Budget file {path} is not valid JSON: {e}')
+
+
+def compare(results, budgets, tolerance=None):
+    """Human-readable regressions; empty when every view is within budget"""
+    tolerance = budgets.get('latency_tolerance', DEFAULT_TOLERANCE) if tolerance is None else tolerance
+    views = budgets.get('views', {})
+    regressions = []
+    for name, result in results.items():
+        budget = views.get(name)
+        if budget is None:
+            regressions.append(f'{name}: no budget recorded')
+            continue
+        if result['max_queries'] > budget['max_queries']:
+            regressions.append(
+                f"{name}: {result['max_queries']} queries, budget {budget['max_queries']}"
+            )
+        allowed = budget['p95_ms'] * (1 + tolerance)
+        if result['p95_ms'] > allowed:
+            regressions.append(
+                f"{name}: p95 {result['p95_ms']} ms, budget {budget['p95_ms']} ms (+{tolerance:.0%})"
+            )
+    return regressions
+
+
+def write_budgets(results, path=DEFAULT_BUDGET_FILE, dataset=None):
+    """Record current query counts exactly and latencies with headroom"""
+    existing = {}
+    try:
+        existing = load_budgets(path)
+    except BenchmarkError:
+        pass
+    views = dict(existing.get('views', {}))
+    for name, result in results.items():
+        views[name] = {
+            'max_queries': result['max_queries'],
+            'p95_ms': round(max(result['p95_ms'] * LATENCY_HEADROOM, 5.0), 1),
+        }
+    budgets = {
+        'recorded': date.today().isoformat(),
+        'dataset': dataset or existing.get('dataset', ''),
+        'latency_tolerance': existing.get('latency_tolerance', DEFAULT_TOLERANCE),
+        'views': dict(sorted(views.items())),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(budgets, f, indent=2)
+        f.write('\n')
+    return budgets
@@ -0,0 +1,133 @@
+"""
+Dashboard statistics service for 2moreFitness
+Builds the admin dashboard KPIs with one aggregate query per table and
+caches the snapshot for a short TTL (DASHBOARD_CACHE_TTL)
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.utils.timesince import timesince
+
+from apps.members.models import Member, Membership
+from apps.trainers.models import Trainer
+from apps.classes.models import ClassOccurrence
+from apps.attendance.models import Attendance, AttendanceDailyRollup
+from apps.attendance import occupancy
+from . import metrics
+
+DASHBOARD_CACHE_KEY = 'core:dashboard_stats:{day}'
+
+
+def _cache_key(today):
+    return DASHBOARD_CACHE_KEY.format(day=today.isoformat())
+
+
+def _display_name(member):
+    return member.user.get_full_name() or member.user.username
+
+
+def compute_dashboard_stats(today=None):
+    """Compute the dashboard snapshot straight from the database"""
+    today = today or date.today()
+    first_day = today.replace(day=1)
+
+    # MEMBER STATISTICS - one query
+    member_stats = Member.objects.aggregate(
+        total=Count('id'),
+        new_this_month=Count('id', filter=Q(created_at__date__gte=first_day)),
+    )
+
+    # MEMBERSHIP STATISTICS - one query on the (status, end_date) index
+    membership_stats = Membership.objects.filter(status='active').aggregate(
+        active=Count('id'),
+        expiring_soon=Count('id', filter=Q(end_date__lte=today + timedelta(days=7))),
+    )
+
+    total_trainers = Trainer.objects.count()
+    today_attendance = AttendanceDailyRollup.objects.filter(
+        date=today
+    ).values_list('visits', flat=True).first() or 0
+    classes_today = ClassOccurrence.objects.filter(
+        date=today,
+        gym_class__is_active=True,
+    ).count()
+
+    # PEAK HOUR AND HEATMAP - from the hourly occupancy histogram
+    lookback_start = today - timedelta(days=getattr(settings, 'OCCUPANCY_LOOKBACK_DAYS', 28) - 1)
+    busiest = occupancy.peak_hour(lookback_start, today)
+    occupancy_heatmap = occupancy.weekday_hour_heatmap(lookback_start, today)
+
+    # RECENT MEMBERS - the first three double as activity feed entries
+    recent_members = list(
+        Member.objects.select_related('user').order_by('-created_at')[:5]
+    )
+    recent_attendance = Attendance.objects.select_related(
+        'member__user'
+    ).order_by('-date', '-check_in')[:3]
+    recent_memberships = Membership.objects.filter(
+        status='active'
+    ).select_related('member__user', 'plan').order_by('-start_date')[:3]
+
+    # RECENT ACTIVITIES
+    recent_activities = []
+
+    for member in recent_members[:3]:
+        time_ago = timesince(member.created_at).split(',')[0]
+        recent_activities.append({
+            'icon': 'user-plus',
+            'title': 'New member registered',
+            'description': f'{_display_name(member)} joined',
+            'time': f'{time_ago} ago'
+        })
+
+    for attendance in recent_attendance:
+        time_ago = timesince(attendance.date).split(',')[0]
+        recent_activities.append({
+            'icon': 'clipboard-check',
+            'title': 'Member check-in',
+            'description': f'{_display_name(attendance.member)} checked in',
+            'time': f'{time_ago} ago'
+        })
+
+    for membership in recent_memberships:
+        time_ago = timesince(membership.start_date).split(',')[0]
+        recent_activities.append({
+            'icon': 'crown',
+            'title': 'Membership purchased',
+            'description': f'{_display_name(membership.member)} bought {membership.plan.name}',
+            'time': f'{time_ago} ago'
+        })
+
+    return {
+        'total_members': member_stats['total'],
+        'new_members_this_month': member_stats['new_this_month'],
+        'active_memberships': membership_stats['active'],
+        'expiring_soon': membership_stats['expiring_soon'],
+        'total_trainers': total_trainers,
+        'today_attendance': today_attendance,
+        'classes_today': classes_today,
+        'peak_hour': busiest['label'] if busiest else None,
+        'peak_headcount': busiest['max_headcount'] if busiest else 0,
+        'occupancy_heatmap': occupancy_heatmap,
+        'recent_members': recent_members,
+        'recent_activities': recent_activities,
+    }
+
+
+def get_dashboard_stats(today=None):
+    """Return the cached dashboard snapshot, rebuilding it when stale"""
+    today = today or date.today()
+    key = _cache_key(today)
+    stats = cache.get(key)
+    metrics.cache_lookup('dashboard', stats is not None)
+    if stats is None:
+        stats = compute_dashboard_stats(today)
+        cache.set(key, stats, getattr(settings, 'DASHBOARD_CACHE_TTL', 30))
+    return stats
+
+
+def invalidate_dashboard_stats(today=None):
+    """Drop the cached snapshot so the next dashboard view recomputes it"""
+    cache.delete(_cache_key(today or date.today()))
@@ -0,0 +1,198 @@
+"""
+Per-request instrumentation for 2moreFitness
+RequestInstrumentationMiddleware wraps every database connection with
+connection.execute_wrapper (works with DEBUG off) and, together with the
+timed template backend, records for each request the resolved view, SQL
+query count, DB time, template render time and wall time. Requests over
+REQUEST_SLOW_MS or REQUEST_MAX_QUERIES are logged with their most repeated
+SQL, and recent samples per view are kept in process memory for the
+p50/p95/p99 report
+"""
+import logging
+import math
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import DjangoTemplates
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+UNRESOLVED = '<unresolved>'
+PERCENTILES = (50, 95, 99)
+
+_state = threading.local()
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=_sample_size()))
+_started_at = time.time()
+
+
+def _sample_size():
+    return getattr(settings, 'REQUEST_STATS_SAMPLE_SIZE', 1000)
+
+
+class RequestStats:
+    """What one request cost; filled in by the DB wrapper and template backend"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.statements[sql] += 1
+
+    def duplicates(self, limit=3):
+        """The most repeated statements, [(count, sql), ...]"""
+        return [(count, sql) for sql, count in self.statements.most_common(limit) if count > 1]
+
+
+def current():
+    """Stats of the request being handled on this thread, or None"""
+    return getattr(_state, 'stats', None)
+
+
+class _TimedTemplate:
+    """Backend template proxy that adds its render time to the current request"""
+
+    def __init__(self, template):
+        self._template = template
+
+    def __getattr__(self, name):
+        return getattr(self._template, name)
+
+    def render(self, context=None, request=None):
+        stats = current()
+        if stats is None:
+            return self._template.render(context, request)
+        stats.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return self._template.render(context, request)
+        finally:
+            stats.template_depth -= 1
+            # Nested renders are already inside the outer one's time
+            if stats.template_depth == 0:
+                stats.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend whose templates report their render time"""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
+
+
+def record(view_name, wall_time, stats):
+    with _lock:
+        _samples[view_name].append((wall_time, stats.queries, stats.db_time, stats.template_time))
+
+
+def reset():
+    global _started_at
+    with _lock:
+        _samples.clear()
+        _started_at = time.time()
+
+
+def _percentile(ordered, pct):
+    if not ordered:
+        return 0
+    # Nearest-rank
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _distribution(values, scale=1):
+    ordered = sorted(values)
+    return {f'p{pct}': round(_percentile(ordered, pct) * scale, 2) for pct in PERCENTILES}
+
+
+def view_stats():
+    """p50/p95/p99 of wall, DB and template time (ms) and query count per view"""
+    with _lock:
+        samples = {view: list(rows) for view, rows in _samples.items()}
+    views = []
+    for view, rows in samples.items():
+        wall, queries, db, template = zip(*rows)
+        views.append({
+            'view': view,
+            'requests': len(rows),
+            'wall_ms': _distribution(wall, 1000),
+            'db_ms': _distribution(db, 1000),
+            'template_ms': _distribution(template, 1000),
+            'queries': _distribution(queries),
+        })
+    views.sort(key=lambda row: row['wall_ms']['p95'], reverse=True)
+    return {'since': _started_at, 'sample_size': _sample_size(), 'views': views}
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Goes right after WhiteNoiseMiddleware so static files are not measured
+    but session and auth queries are
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_INSTRUMENTATION', True)
+        self.slow_ms = getattr(settings, 'REQUEST_SLOW_MS', 500)
+        self.max_queries = getattr(settings, 'REQUEST_MAX_QUERIES', 50)
+
+    def __call__(self, request):
+        if not self.enabled:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        previous, _state.stats = current(), stats
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _state.stats = previous
+        wall_time = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view_name = match.view_name if match else UNRESOLVED
+        request.stats = stats
+        record(view_name, wall_time, stats)
+        metrics.observe_request(view_name, request.method, response.status_code, wall_time, stats)
+        response['Server-Timing'] = (
+            f'db;dur={stats.db_time * 1000:.1f}, '
+            f'tpl;dur={stats.template_time * 1000:.1f}, '
+            f'total;dur={wall_time * 1000:.1f}'
+        )
+
+        if wall_time * 1000 > self.slow_ms or stats.queries > self.max_queries:
+            self._log(request, view_name, wall_time, stats)
+        return response
+
+    def _log(self, request, view_name, wall_time, stats):
+        duplicates = ''.join(
+            f'\n  {count}x {sql[:300]}' for count, sql in stats.duplicates()
+        )
+        logger.warning(
+            '%s %s (%s): %.0f ms, %d queries, %.0f ms DB, %.0f ms templates%s',
+            request.method, request.path, view_name, wall_time * 1000,
+            stats.queries, stats.db_time * 1000, stats.template_time * 1000,
+            duplicates,
+        )
@@ -0,0 +1,373 @@
+"""
+Synthetic load data for 2moreFitness benchmarks
+Builds members, trainers, classes, enrollments, waitlists, years of
+membership history and attendance with bulk_create in batches. One seeded
+random.Random drives everything, so the same options always produce the same
+data. Distributions are shaped after a real gym: morning and evening
+check-in peaks, log-normal visit lengths, quiet Sundays, a few very regular
+members, a long tail of popular classes, and members churning between terms.
+bulk_create sends no signals, so the derived tables (rollups, occupancy,
+live counter, class calendar, revenue) are rebuilt once at the end
+"""
+import math
+import random
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from apps.attendance import live, occupancy, rollups
+from apps.attendance.models import Attendance
+from apps.classes import schedule
+from apps.classes.models import GymClass, ClassWaitlist
+from apps.members import revenue
+from apps.members.models import Member, Membership
+from apps.trainers.models import Trainer
+from .dashboard import invalidate_dashboard_stats
+from .models import UserProfile, MembershipPlan
+
+DEFAULT_PASSWORD = 'loadtest123'
+
+FIRST_NAMES = [
+    'Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Grace', 'Paolo', 'Kristine', 'Miguel', 'Andrea',
+    'Carlo', 'Bea', 'Rafael', 'Nicole', 'Gabriel', 'Patricia', 'Daniel', 'Camille', 'Joshua', 'Angela',
+]
+LAST_NAMES = [
+    'Santos', 'Reyes', 'Cruz', 'Bautista', 'Garcia', 'Mendoza', 'Torres', 'Flores', 'Villanueva', 'Ramos',
+    'Aquino', 'Castillo', 'Rivera', 'Dela Cruz', 'Navarro', 'Domingo', 'Soriano', 'Lim', 'Tan', 'Gonzales',
+]
+CLASS_NAMES = [
+    'Spin', 'HIIT', 'Yoga', 'Pilates', 'Boxing', 'CrossFit', 'Zumba', 'Body Pump', 'Core Blast',
+    'Mobility', 'Kettlebell', 'Bootcamp', 'Muay Thai', 'Circuit', 'Stretch',
+]
+SPECIALIZATIONS = ['Strength Training', 'Yoga', 'CrossFit', 'Boxing', 'Pilates', 'Cardio', 'Mobility']
+
+# Plans the generator makes sure exist: (name, duration, price, share of sign-ups)
+PLANS = [
+    ('Load Monthly', 'monthly', Decimal('2500.00'), 55),
+    ('Load Quarterly', 'quarterly', Decimal('6500.00'), 25),
+    ('Load Semi-Annual', 'semi_annual', Decimal('12000.00'), 10),
+    ('Load Annual', 'annual', Decimal('20000.00'), 10),
+]
+
+# Relative traffic per weekday, Monday first
+WEEKDAY_TRAFFIC = [1.0, 0.95, 0.9, 0.9, 0.8, 0.6, 0.4]
+# Check-in time mixture: (share, mean hour, std dev in hours)
+CHECK_IN_PEAKS = [(0.35, 6.5, 1.0), (0.20, 12.0, 1.0), (0.45, 18.25, 1.4)]
+CLASS_SLOTS = ['06:00', '07:00', '08:00', '12:00', '12:30', '17:30', '18:00', '18:30', '19:30', '20:00']
+CLASS_DAYS = [day for day, _ in GymClass.DAY_CHOICES]
+CLASS_DAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.7, 0.4]
+RENEWAL_RATE = 0.8
+
+
+class LoadDataOptions:
+    """Volumes and knobs for one generator run"""
+
+    def __init__(self, members=1000, trainers=None, classes=None, attendance=None, years=2,
+                 seed=42, batch_size=5000, prefix='load', password=DEFAULT_PASSWORD, today=None):
+        self.members = members
+        self.trainers = trainers if trainers is not None else max(5, members // 500)
+        self.classes = classes if classes is not None else max(10, members // 50)
+        self.attendance = attendance if attendance is not None else members * 50
+        self.years = years
+        self.seed = seed
+        self.batch_size = batch_size
+        self.prefix = prefix
+        self.password = password
+        self.today = today or date.today()
+
+
+def _batches(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _ids_by(model, field, values):
+    """{field value: pk} for rows just bulk-created (works on every backend)"""
+    return dict(model.objects.filter(**{f'{field}__in': values}).values_list(field, 'id'))
+
+
+class LoadGenerator:
+    def __init__(self, options, log=print):
+        self.options = options
+        self.log = log
+        self.rng = random.Random(options.seed)
+        self.today = options.today
+        self.first_day = self.today - timedelta(days=365 * options.years)
+        self.counts = {}
+
+    # ===== USERS =====
+    def _create_users(self, usernames, role):
+        """User + UserProfile rows for one batch, returns {username: user_id}"""
+        rng = self.rng
+        users = [
+            User(
+                username=username,
+                email=f'{username}@example.com',
+                password=self.password_hash,
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+            )
+            for username in usernames
+        ]
+        User.objects.bulk_create(users)
+        ids = _ids_by(User, 'username', usernames)
+        UserProfile.objects.bulk_create([
+            UserProfile(user_id=ids[username], role=role, phone=f'09{rng.randrange(10 ** 9):09d}')
+            for username in usernames
+        ])
+        return ids
+
+    def _plans(self):
+        plans = []
+        for name, duration, price, share in PLANS:
+            plan, _ = MembershipPlan.objects.get_or_create(
+                name=name,
+                defaults={
+                    'description': 'Generated for load testing',
+                    'duration': duration,
+                    'price': price,
+                    'features': 'Full gym access',
+                },
+            )
+            plans.append((plan, share))
+        return plans
+
+    def create_trainers(self):
+        usernames = [f'{self.options.prefix}_trainer{n:05d}' for n in range(self.options.trainers)]
+        ids = self._create_users(usernames, 'trainer')
+        Trainer.objects.bulk_create([
+            Trainer(
+                user_id=ids[username],
+                specialization=self.rng.choice(SPECIALIZATIONS),
+                bio='Generated trainer',
+                certifications='Certified Personal Trainer',
+                years_of_experience=self.rng.randint(1, 15),
+            )
+            for username in usernames
+        ])
+        self.trainer_ids = list(Trainer.objects.filter(user_id__in=ids.values()).values_list('id', flat=True))
+        self.counts['trainers'] = len(self.trainer_ids)
+
+    def create_members(self):
+        """Members with a join date each; 1 in 10 has since gone inactive"""
+        rng = self.rng
+        span = (self.today - self.first_day).days
+        self.members = []  # (member_id, join_date)
+        usernames = [f'{self.options.prefix}{n:07d}' for n in range(self.options.members)]
+        for batch in _batches(usernames, self.options.batch_size):
+            with transaction.atomic():
+                ids = self._create_users(batch, 'member')
+                Member.objects.bulk_create([
+                    Member(
+                        user_id=ids[username],
+                        gender=rng.choice('MFMFO'),
+                        is_active=rng.random() > 0.1,
+                    )
+                    for username in batch
+                ])
+            member_ids = _ids_by(Member, 'user_id', list(ids.values()))
+            for username in batch:
+                # More recent sign-ups than old ones
+                joined = self.today - timedelta(days=int(span * rng.random() ** 1.5))
+                self.members.append((member_ids[ids[username]], joined))
+        self.counts['members'] = len(self.members)
+
+    # ===== CLASSES =====
+    def create_classes(self):
+        """Classes with a long-tail popularity weight each"""
+        rng = self.rng
+        classes = []
+        for n in range(self.options.classes):
+            classes.append(GymClass(
+                name=f'{rng.choice(CLASS_NAMES)} {n + 1}',
+                description='Generated class',
+                trainer_id=rng.choice(self.trainer_ids) if self.trainer_ids else None,
+                difficulty=rng.choices(['beginner', 'intermediate', 'advanced'], [5, 3, 2])[0],
+                duration=rng.choice([30, 45, 60, 60, 90]),
+                max_capacity=rng.choice([10, 15, 20, 20, 25, 30]),
+                day_of_week=rng.choices(CLASS_DAYS, CLASS_DAY_WEIGHTS)[0],
+                time=rng.choice(CLASS_SLOTS),
+                is_active=rng.random() > 0.05,
+            ))
+        GymClass.objects.bulk_create(classes, batch_size=self.options.batch_size)
+        self.classes = list(
+            GymClass.objects.filter(description='Generated class', is_active=True)
+            .order_by('id').values_list('id', 'max_capacity')
+        )
+        self.counts['classes'] = len(classes)
+
+    def create_enrollments(self):
+        """Zipf-like class popularity; full classes collect a waitlist"""
+        rng = self.rng
+        if not self.classes:
+            return
+        popularity = [1 / (rank + 1) ** 0.8 for rank in range(len(self.classes))]
+        rng.shuffle(popularity)
+        cumulative = list(accumulate(popularity))
+        seats = {class_id: capacity for class_id, capacity in self.classes}
+        class_ids = [class_id for class_id, _ in self.classes]
+
+        Enrollment = Member.enrolled_classes.through
+        enrollments, waitlist = [], []
+        for member_id, _ in self.members:
+            wanted = min(int(rng.expovariate(1 / 1.2)), 5)
+            for class_id in set(rng.choices(class_ids, cum_weights=cumulative, k=wanted)):
+                if seats[class_id] > 0:
+                    seats[class_id] -= 1
+                    enrollments.append(Enrollment(gymclass_id=class_id, member_id=member_id))
+                elif rng.random() < 0.3:
+                    waitlist.append(ClassWaitlist(gym_class_id=class_id, member_id=member_id))
+        Enrollment.objects.bulk_create(enrollments, batch_size=self.options.batch_size, ignore_conflicts=True)
+        ClassWaitlist.objects.bulk_create(waitlist, batch_size=self.options.batch_size, ignore_conflicts=True)
+        self.counts['enrollments'] = len(enrollments)
+        self.counts['waitlist'] = len(waitlist)
+
+    # ===== MEMBERSHIPS =====
+    def _terms(self, member_id, joined, plans, weights):
+        """Back-to-back terms from the join date until the member churns"""
+        rng = self.rng
+        plan = rng.choices(plans, weights)[0]
+        start_date = joined
+        term = 0
+        while start_date <= self.today:
+            end_date = plan.term_end(start_date)
+            if end_date < self.today:
+                status, payment_status = 'expired', 'paid' if rng.random() > 0.02 else 'failed'
+            else:
+                paid = rng.random() > 0.08
+                status, payment_status = ('active', 'paid') if paid else ('pending', 'pending')
+            yield Membership(
+                member_id=member_id,
+                plan=plan,
+                start_date=start_date,
+                end_date=end_date,
+                status=status,
+                payment_status=payment_status,
+                payment_amount=plan.price,
+                payment_date=start_date if payment_status == 'paid' else None,
+                payment_reference=f'{self.options.prefix.upper()}-{member_id}-{term}',
+            )
+            if rng.random() > RENEWAL_RATE:
+                return
+            term += 1
+            start_date = end_date + timedelta(days=1)
+            if rng.random() < 0.1:
+                plan = rng.choices(plans, weights)[0]
+
+    def create_memberships(self):
+        plan_shares = self._plans()
+        plans = [plan for plan, _ in plan_shares]
+        weights = [share for _, share in plan_shares]
+        batch, total = [], 0
+        for member_id, joined in self.members:
+            batch.extend(self._terms(member_id, joined, plans, weights))
+            if len(batch) >= self.options.batch_size:
+                Membership.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        Membership.objects.bulk_create(batch)
+        self.counts['memberships'] = total + len(batch)
+
+    # ===== ATTENDANCE =====
+    def _check_in_minute(self):
+        rng = self.rng
+        share = rng.random()
+        for weight, mean, deviation in CHECK_IN_PEAKS:
+            share -= weight
+            if share <= 0:
+                break
+        while True:
+            hour = rng.gauss(mean, deviation)
+            # Opening hours are 05:00-22:00
+            if 5.0 <= hour < 22.0:
+                return int(hour * 60)
+
+    def _visit_date(self, joined):
+        """A day between joining and today, thinned out by weekday traffic"""
+        rng = self.rng
+        span = (self.today - joined).days
+        while True:
+            day = joined + timedelta(days=rng.randint(0, span))
+            if rng.random() < WEEKDAY_TRAFFIC[day.weekday()]:
+                return day
+
+    def create_attendance(self):
+        """Regulars visit far more often than the rest (log-normal activity)"""
+        rng = self.rng
+        if not self.members:
+            return
+        now = datetime.now()
+        activity = list(accumulate(rng.lognormvariate(0, 1) for _ in self.members))
+        remaining = self.options.attendance
+        created = 0
+        while remaining > 0:
+            size = min(self.options.batch_size, remaining)
+            rows = []
+            for member_id, joined in rng.choices(self.members, cum_weights=activity, k=size):
+                day = self._visit_date(joined)
+                minute = self._check_in_minute()
+                check_in = datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute, seconds=rng.randrange(60))
+                if check_in > now:
+                    check_in = now - timedelta(minutes=rng.randint(1, 600))
+                    day = check_in.date()
+                stay = min(max(rng.lognormvariate(math.log(70), 0.35), 20), 180)
+                check_out = check_in + timedelta(minutes=stay)
+                if check_out > now:
+                    check_out = None  # still inside
+                elif check_out.date() != day:
+                    check_out = datetime.combine(day, datetime.max.time())
+                rows.append(Attendance(
+                    member_id=member_id,
+                    date=day,
+                    check_in=check_in.time().replace(microsecond=0),
+                    check_out=check_out.time().replace(microsecond=0) if check_out else None,
+                ))
+            Attendance.objects.bulk_create(rows, ignore_conflicts=True)
+            created += len(rows)
+            remaining -= size
+            if created % (self.options.batch_size * 20) == 0:
+                self.log(f'  attendance: {created}/{self.options.attendance}')
+        self.counts['attendance'] = created
+
+    # ===== DERIVED DATA =====
+    def refresh_derived(self):
+        first = self.first_day
+        rollups.backfill(first, self.today)
+        occupancy.backfill(first, self.today)
+        live.reconcile()
+        schedule.extend_horizon()
+        revenue.backfill(first, self.today)
+        invalidate_dashboard_stats()
+
+    def run(self):
+        if User.objects.filter(username__startswith=self.options.prefix).exists():
+            raise ValueError(f'Users starting with "{self.options.prefix}" already exist; pick another prefix.')
+
+        # One hash for everyone: hashing each password would dominate the run
+        self.password_hash = make_password(self.options.password)
+        steps = [
+            ('trainers', self.create_trainers),
+            ('members', self.create_members),
+            ('classes', self.create_classes),
+            ('enrollments', self.create_enrollments),
+            ('memberships', self.create_memberships),
+            ('attendance', self.create_attendance),
+            ('derived tables', self.refresh_derived),
+        ]
+        timings = {}
+        for name, step in steps:
+            started = time.perf_counter()
+            step()
+            timings[name] = round(time.perf_counter() - started, 2)
+            self.log(f'{name}: {self.counts.get(name, "done")} in {timings[name]}s')
+        return {'counts': self.counts, 'seconds': timings}
+
+
+def generate(options, log=print):
+    """Fill the database according to `options`, returns counts and timings"""
+    return LoadGenerator(options, log).run()
@@ -0,0 +1,392 @@
+"""
+Morning-rush load test for 2moreFitness
+Simulates N members arriving at once: each checks in, enrolls in one of a
+few popular classes, sometimes double-taps check-in, and checks out, while
+the front desk quick-checks-in other members from the admin attendance page.
+Requests go through the WSGI app in-process (one test client per simulated
+user) or over HTTP to a running server such as a local gunicorn, from a
+thread pool. The report has throughput, latency percentiles per operation,
+lock waits, and the integrity checks the hot paths must keep: one open
+attendance per member, no class over capacity, and a live counter that
+matches the open sessions
+"""
+import http.cookiejar
+import queue
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.db import connections
+from django.db.models import Count, F
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from apps.attendance import live
+from apps.attendance.models import Attendance
+from apps.classes.models import GymClass
+from apps.members.models import Member
+from .instrumentation import _percentile
+from .loadgen import DEFAULT_PASSWORD
+from .models import UserProfile
+
+LOCK_MESSAGES = ('locked', 'deadlock', 'could not serialize', 'lock timeout')
+# BEGIN IMMEDIATE is where the SQLite backend waits for the write lock
+WRITE_PREFIXES = ('INSERT', 'UPDATE', 'DELETE', 'BEGIN IMMEDIATE')
+# Status recorded for a request that failed on a database lock, not a bug
+LOCKED = 'locked'
+
+
+class LoadTestError(Exception):
+    """The dataset or target server is not usable"""
+
+
+def _is_lock_error(exc):
+    return any(message in str(exc).lower() for message in LOCK_MESSAGES)
+
+
+# ============================================
+# LOCK PROBE
+# ============================================
+class LockProbe:
+    """
+    execute_wrapper hook, in-process runs only: times row-locking and write
+    statements (where requests queue behind each other's locks) and counts
+    statements that failed because of a lock, including ones later retried
+    """
+
+    def __init__(self, threshold_ms):
+        self.threshold = threshold_ms / 1000
+        self.lock = threading.Lock()
+        self.statements = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+        self.errors = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        locking = 'FOR UPDATE' in sql or sql.lstrip().upper().startswith(WRITE_PREFIXES)
+        if not locking:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except Exception as e:
+            if _is_lock_error(e):
+                with self.lock:
+                    self.errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.statements += 1
+                if elapsed > self.threshold:
+                    self.waits += 1
+                    self.wait_time += elapsed
+                    self.max_wait = max(self.max_wait, elapsed)
+
+    def as_dict(self):
+        return {
+            'locking_statements': self.statements,
+            'slow_locking_statements': self.waits,
+            'wait_ms_total': round(self.wait_time * 1000, 1),
+            'wait_ms_max': round(self.max_wait * 1000, 1),
+            'lock_errors': self.errors,
+        }
+
+
+# ============================================
+# SESSIONS
+# ============================================
+class InProcessSession:
+    """A simulated user driving the WSGI app through the test client"""
+
+    def __init__(self, user=None, admin=False, probe=None):
+        self.client = Client(raise_request_exception=False)
+        self.probe = probe
+        if user is not None:
+            self.client.force_login(user)
+        if admin:
+            # What login_view stores for the static administrator
+            session = self.client.session
+            session['is_admin'] = True
+            session['is_member'] = False
+            session['user_type'] = 'admin'
+            session.save()
+
+    def request(self, method, path, data=None):
+        with connections['default'].execute_wrapper(self.probe):
+            if method == 'POST':
+                response = self.client.post(path, data or {})
+            else:
+                response = self.client.get(path)
+        # A 500 caused by lock contention is the database's limit, not an application bug
+        if response.status_code >= 500 and response.exc_info and _is_lock_error(response.exc_info[1]):
+            return LOCKED
+        return response.status_code
+
+
+class HttpSession:
+    """A simulated user talking to a running server, cookies and CSRF included"""
+
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies),
+            _NoRedirect(),
+        )
+
+    def _csrf_token(self):
+        for cookie in self.cookies:
+            if cookie.name == 'csrftoken':
+                return cookie.value
+        return ''
+
+    def request(self, method, path, data=None):
+        url = self.base_url + path
+        body = None
+        headers = {'Referer': url}
+        if method == 'POST':
+            if not self._csrf_token():
+                self.request('GET', reverse('login'))
+            body = urllib.parse.urlencode(dict(data or {}, csrfmiddlewaretoken=self._csrf_token())).encode()
+            headers['X-CSRFToken'] = self._csrf_token()
+        try:
+            with self.opener.open(urllib.request.Request(url, body, headers, method=method), timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+    def login(self, username, password):
+        status = self.request('POST', reverse('login'), {'username': username, 'password': password})
+        if status != 302:
+            raise LoadTestError(f'Login as {username} failed with HTTP {status}.')
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Report the 302 itself, like the test client does"""
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+# ============================================
+# SCENARIO
+# ============================================
+class LoadTestOptions:
+    def __init__(self, members=50, concurrency=16, hot_classes=3, double_tap=0.2, front_desk=0.3,
+                 base_url=None, prefix='load', password=DEFAULT_PASSWORD, seed=42, lock_threshold_ms=10):
+        self.members = members
+        self.concurrency = concurrency
+        self.hot_classes = hot_classes
+        self.double_tap = double_tap
+        self.front_desk = front_desk
+        self.base_url = base_url
+        self.prefix = prefix
+        self.password = password
+        self.seed = seed
+        self.lock_threshold_ms = lock_threshold_ms
+
+
+class LoadTest:
+    def __init__(self, options):
+        self.options = options
+        self.rng = random.Random(options.seed)
+        self.probe = LockProbe(options.lock_threshold_ms) if not options.base_url else None
+        self.lock = threading.Lock()
+        self.desks = queue.Queue()
+        self.samples = defaultdict(list)  # operation -> [latency seconds]
+        self.statuses = defaultdict(Counter)  # operation -> {status: count}
+
+    def _pick(self):
+        """Members who have not checked in today, the hot classes, and the desk's members"""
+        today = date.today()
+        open_today = Attendance.objects.filter(date=today, check_out__isnull=True).values('member_id')
+        candidates = list(
+            Member.objects.filter(user__username__startswith=self.options.prefix, is_active=True)
+            .exclude(id__in=open_today).select_related('user').order_by('id')[:self.options.members * 2]
+        )
+        if len(candidates) < 2:
+            raise LoadTestError(
+                f'Not enough members with prefix "{self.options.prefix}"; run generate_load_data first.'
+            )
+        self.rng.shuffle(candidates)
+        desk_count = int(len(candidates) / 2 * self.options.front_desk)
+        self.members = candidates[:self.options.members]
+        self.desk_members = candidates[self.options.members:self.options.members + desk_count]
+
+        # Classes with a few seats left, so the burst has to fight over them;
+        # once every class is full the burst exercises the waitlist instead
+        classes = GymClass.objects.filter(is_active=True).with_enrollment()
+        self.classes = list(
+            classes.filter(annotated_spots_available__gt=0)
+            .order_by('annotated_spots_available', 'id').values_list('id', flat=True)[:self.options.hot_classes]
+        ) or list(classes.order_by('id').values_list('id', flat=True)[:self.options.hot_classes])
+
+    def _session(self, user=None, admin=False):
+        if not self.options.base_url:
+            return InProcessSession(user, admin, self.probe)
+        session = HttpSession(self.options.base_url)
+        if admin:
+            from django.conf import settings
+            session.login(
+                getattr(settings, 'STATIC_ADMIN_USERNAME', 'gymadmin'),
+                getattr(settings, 'STATIC_ADMIN_PASSWORD', 'admin123'),
+            )
+        else:
+            session.login(user.username, self.options.password)
+        return session
+
+    def _call(self, session, operation, method, path, data=None):
+        started = time.perf_counter()
+        try:
+            status = session.request(method, path, data)
+        except Exception as e:
+            status = type(e).__name__
+        elapsed = time.perf_counter() - started
+        with self.lock:
+            self.samples[operation].append(elapsed)
+            self.statuses[operation][status] += 1
+
+    def _member_visit(self, session):
+        rng = random.Random(self.rng.random())
+        self._call(session, 'check_in', 'GET', reverse('check_in'))
+        if rng.random() < self.options.double_tap:
+            self._call(session, 'check_in', 'GET', reverse('check_in'))
+        if self.classes:
+            class_id = rng.choice(self.classes)
+            self._call(session, 'enroll_class', 'GET', reverse('enroll_class', args=[class_id]))
+        self._call(session, 'check_out', 'GET', reverse('check_out'))
+
+    def _desk_check_in(self, member):
+        # Borrow a front-desk terminal; a test client is not thread-safe
+        session = self.desks.get()
+        try:
+            self._call(
+                session, 'quick_check_in', 'POST', reverse('admin_attendance_report'),
+                {'action': 'quick_check_in', 'member_id': member.id},
+            )
+        finally:
+            self.desks.put(session)
+
+    def run(self):
+        self._pick()
+        sessions = [self._session(member.user) for member in self.members]
+        if self.desk_members:
+            desk_user = _desk_user(self.options.prefix)
+            for _ in range(min(self.options.concurrency, len(self.desk_members))):
+                self.desks.put(self._session(desk_user, admin=True))
+        before = integrity()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.options.concurrency) as pool:
+            futures = [pool.submit(self._member_visit, session) for session in sessions]
+            # The desk checks people in while the rush is on, twice for some
+            for member in self.desk_members:
+                futures.append(pool.submit(self._desk_check_in, member))
+                if self.rng.random() < self.options.double_tap:
+                    futures.append(pool.submit(self._desk_check_in, member))
+            for future in futures:
+                future.result()
+        wall_time = time.perf_counter() - started
+
+        after = integrity()
+        return self._report(wall_time, before, after)
+
+    def _report(self, wall_time, before, after):
+        operations = {}
+        total = 0
+        for operation, latencies in sorted(self.samples.items()):
+            ordered = sorted(latencies)
+            total += len(ordered)
+            operations[operation] = {
+                'requests': len(ordered),
+                'throughput': round(len(ordered) / wall_time, 1) if wall_time else 0,
+                'p50_ms': round(_percentile(ordered, 50) * 1000, 1),
+                'p95_ms': round(_percentile(ordered, 95) * 1000, 1),
+                'p99_ms': round(_percentile(ordered, 99) * 1000, 1),
+                'max_ms': round(ordered[-1] * 1000, 1),
+                'statuses': {str(status): count for status, count in sorted(self.statuses[operation].items(), key=str)},
+                'lock_failures': self.statuses[operation][LOCKED],
+                'errors': sum(
+                    count for status, count in self.statuses[operation].items()
+                    if status != LOCKED and (not isinstance(status, int) or status >= 500)
+                ),
+            }
+        violations = {
+            'double_check_ins': max(0, after['double_check_ins'] - before['double_check_ins']),
+            'overbooked_classes': max(0, after['overbooked_classes'] - before['overbooked_classes']),
+            'live_counter_drift': max(0, after['live_counter_drift'] - before['live_counter_drift']),
+        }
+        return {
+            'mode': self.options.base_url or 'in-process',
+            'database': None if self.options.base_url else connections['default'].vendor,
+            'members': len(self.members),
+            'desk_check_ins': len(self.desk_members),
+            'hot_classes': self.classes,
+            'concurrency': self.options.concurrency,
+            'seconds': round(wall_time, 2),
+            'requests': total,
+            'throughput': round(total / wall_time, 1) if wall_time else 0,
+            'operations': operations,
+            'locks': self.probe.as_dict() if self.probe else None,
+            'integrity': violations,
+            'violations': sum(violations.values()),
+        }
+
+
+def _desk_user(prefix):
+    """Admin-role user behind the front desk's in-process session"""
+    user, created = User.objects.get_or_create(
+        username=f'{prefix}_frontdesk',
+        defaults={'email': f'{prefix}_frontdesk@example.com', 'first_name': 'Front', 'last_name': 'Desk'},
+    )
+    if created:
+        user.set_unusable_password()
+        user.save(update_fields=['password'])
+    UserProfile.objects.update_or_create(user=user, defaults={'role': 'admin'})
+    return user
+
+
+# ============================================
+# INTEGRITY
+# ============================================
+def integrity(today=None):
+    """Counts of states the check-in and enrollment paths must never produce"""
+    today = today or date.today()
+    double_check_ins = (
+        Attendance.objects.filter(date=today, check_out__isnull=True)
+        .values('member_id').annotate(open_sessions=Count('id'))
+        .filter(open_sessions__gt=1).count()
+    )
+    overbooked = (
+        GymClass.objects.with_enrollment()
+        .filter(annotated_enrolled_count__gt=F('max_capacity')).count()
+    )
+    return {
+        'double_check_ins': double_check_ins,
+        'overbooked_classes': overbooked,
+        'live_counter_drift': abs(live.snapshot()['headcount'] - live.open_sessions_count(today)),
+    }
+
+
+def run_load_test(options):
+    """Run the scenario once and return the report"""
+    in_process = not options.base_url
+    if in_process:
+        setup_test_environment()
+    try:
+        return LoadTest(options).run()
+    finally:
+        if in_process:
+            teardown_test_environment()
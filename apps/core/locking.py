@@ -0,0 +1,30 @@
+"""
+Write-contention helpers for 2moreFitness
+SQLite ignores SELECT ... FOR UPDATE. The apps.core.sqlite backend makes
+writers wait for the database lock, but a wait past SQLITE_TIMEOUT or a
+shared-cache database (the test database) still fails with 'database is
+locked'; PostgreSQL queues on the row lock and never needs the retry
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection, OperationalError
+
+
+def retry_when_locked(func):
+    """Retry the whole transaction with a short backoff when SQLite reports a lock"""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        attempts = getattr(settings, 'DB_LOCK_RETRIES', 20)
+        for attempt in range(attempts):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                locked = connection.vendor == 'sqlite' and 'locked' in str(e)
+                # Inside an outer transaction the caller's work is lost too; let it fail
+                if not locked or attempt == attempts - 1 or connection.in_atomic_block:
+                    raise
+                time.sleep(random.uniform(0.005, 0.02) * (attempt + 1))
+    return wrapper
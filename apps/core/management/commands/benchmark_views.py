@@ -0,0 +1,82 @@
+"""
+Benchmark the major views on generated data and fail on query or latency regressions
+Usage: python manage.py benchmark_views [--runs 20] [--warmup 2] [--view NAME ...] [--budget PATH]
+       [--tolerance 0.5] [--generate MEMBERS] [--prefix load] [--update] [--json]
+Run generate_load_data first (or pass --generate). Exits non-zero when a view
+runs more queries than its budget or its p95 exceeds the budget by more than
+the tolerance; --update records the current numbers as the new budget
+"""
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Measure latency percentiles and query counts of the major views against a budget file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=20, help='Measured requests per view')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests per view after the cold one')
+        parser.add_argument('--view', action='append', dest='views', help='Only benchmark this view (repeatable)')
+        parser.add_argument('--budget', default=str(benchmarks.DEFAULT_BUDGET_FILE), help='Budget JSON file')
+        parser.add_argument('--tolerance', type=float, help='Allowed p95 overshoot, e.g. 0.5 for +50%%')
+        parser.add_argument('--generate', type=int, metavar='MEMBERS', help='Generate a dataset of this size if none exists')
+        parser.add_argument('--prefix', default='load', help='Username prefix of the generated data')
+        parser.add_argument('--update', action='store_true', help='Write the measurements to the budget file')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError('--runs must be at least 1.')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup must not be negative.')
+        known = {name for name, _, _ in benchmarks.VIEWS}
+        unknown = set(options['views'] or []) - known
+        if unknown:
+            raise CommandError(f"Unknown view(s): {', '.join(sorted(unknown))}. Choose from {', '.join(sorted(known))}.")
+        budget_path = Path(options['budget'])
+
+        try:
+            if options['generate'] and benchmarks.ensure_dataset(options['prefix'], options['generate']):
+                self.stdout.write(f"Generated a dataset of {options['generate']} members.")
+            results = benchmarks.run_benchmarks(
+                prefix=options['prefix'],
+                runs=options['runs'],
+                warmup=options['warmup'],
+                only=options['views'],
+            )
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self._table(results)
+
+        if options['update']:
+            dataset = f"{options['generate']} members" if options['generate'] else None
+            benchmarks.write_budgets(results, budget_path, dataset=dataset)
+            self.stdout.write(self.style.SUCCESS(f'Budgets written to {budget_path}.'))
+            return
+
+        try:
+            budgets = benchmarks.load_budgets(budget_path)
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(str(e))
+        regressions = benchmarks.compare(results, budgets, options['tolerance'])
+        if regressions:
+            for regression in regressions:
+                self.stderr.write(regression)
+            raise CommandError(f'{len(regressions)} view budget(s) exceeded.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(results)} view(s) within budget.'))
+
+    def _table(self, results):
+        self.stdout.write(f"{'view':<26}{'queries':>8}{'cold':>9}{'p50':>9}{'p95':>9}{'p99':>9}  (ms)")
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26}{result['max_queries']:>8}{result['cold_ms']:>9}"
+                f"{result['p50_ms']:>9}{result['p95_ms']:>9}{result['p99_ms']:>9}"
+            )
@@ -0,0 +1,68 @@
+"""
+Fill the database with synthetic members, classes, memberships and attendance for load testing
+Usage: python manage.py generate_load_data [--members 100000] [--attendance 5000000] [--classes 2000]
+       [--years 3] [--seed 42] [--batch-size 5000] [--prefix load] [--date YYYY-MM-DD]
+The same options and seed always produce the same data. Every generated user
+gets the password "loadtest123" unless --password is given
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.core.loadgen import LoadDataOptions, generate
+
+
+class Command(BaseCommand):
+    help = 'Generate deterministic synthetic data for benchmarks and load tests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=1000, help='Members to create')
+        parser.add_argument('--trainers', type=int, help='Trainers to create (default: members / 500)')
+        parser.add_argument('--classes', type=int, help='Classes to create (default: members / 50)')
+        parser.add_argument('--attendance', type=int, help='Attendance rows to create (default: 50 per member)')
+        parser.add_argument('--years', type=int, default=2, help='Years of history to spread the data over')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT batch')
+        parser.add_argument('--prefix', default='load', help='Username prefix of generated users')
+        parser.add_argument('--password', help='Password of every generated user')
+        parser.add_argument('--date', help='Treat this date as today (YYYY-MM-DD)')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                # Well-formed but impossible, e.g. 2026-02-30
+                today = None
+            if today is None:
+                raise CommandError('--date must be a date in YYYY-MM-DD format.')
+        for name in ('members', 'years', 'batch_size'):
+            if options[name] < 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be at least 1.')
+        for name in ('trainers', 'classes', 'attendance'):
+            if options[name] is not None and options[name] < 0:
+                raise CommandError(f'--{name} must not be negative.')
+
+        load_options = LoadDataOptions(
+            members=options['members'],
+            trainers=options['trainers'],
+            classes=options['classes'],
+            attendance=options['attendance'],
+            years=options['years'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            prefix=options['prefix'],
+            today=today,
+            **({'password': options['password']} if options['password'] else {}),
+        )
+        try:
+            result = generate(load_options, log=self.stdout.write)
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        counts = result['counts']
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {counts.get('members', 0)} member(s), {counts.get('trainers', 0)} trainer(s), "
+            f"{counts.get('classes', 0)} class(es), {counts.get('memberships', 0)} membership(s) and "
+            f"{counts.get('attendance', 0)} attendance row(s) in {sum(result['seconds'].values()):.1f}s."
+        ))
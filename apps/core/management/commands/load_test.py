@@ -0,0 +1,97 @@
+"""
+Simulate a morning rush on check-in, quick check-in and class enrollment
+Usage: python manage.py load_test [--members 50] [--concurrency 16] [--hot-classes 3]
+       [--double-tap 0.2] [--front-desk 0.3] [--url http://127.0.0.1:8000] [--prefix load] [--json]
+Runs in-process through the WSGI app unless --url points at a running server
+(e.g. gunicorn gym_project.wsgi:application -w 4 --threads 4). Needs data from
+generate_load_data; exits non-zero when an integrity check fails
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core.loadtest import LoadTestError, LoadTestOptions, run_load_test
+
+
+class Command(BaseCommand):
+    help = 'Load-test the check-in and enrollment hot paths with concurrent simulated members'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--members', type=int, default=50, help='Members arriving in the burst')
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight at once')
+        parser.add_argument('--hot-classes', type=int, default=3, help='Nearly full classes everyone enrolls in')
+        parser.add_argument('--double-tap', type=float, default=0.2, help='Share of check-ins sent twice')
+        parser.add_argument('--front-desk', type=float, default=0.3, help='Quick check-ins by the desk, per member')
+        parser.add_argument('--url', help='Base URL of a running server (default: in-process)')
+        parser.add_argument('--prefix', default='load', help='Username prefix of the generated data')
+        parser.add_argument('--password', help='Password of the generated members (HTTP mode)')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+        parser.add_argument('--lock-threshold-ms', type=float, default=10, help='Locking statements slower than this count as lock waits')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON')
+
+    def handle(self, *args, **options):
+        if options['members'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--members and --concurrency must be at least 1.')
+        for name in ('double_tap', 'front_desk'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f'--{name.replace("_", "-")} must be between 0 and 1.')
+
+        load_options = LoadTestOptions(
+            members=options['members'],
+            concurrency=options['concurrency'],
+            hot_classes=options['hot_classes'],
+            double_tap=options['double_tap'],
+            front_desk=options['front_desk'],
+            base_url=options['url'],
+            prefix=options['prefix'],
+            seed=options['seed'],
+            lock_threshold_ms=options['lock_threshold_ms'],
+            **({'password': options['password']} if options['password'] else {}),
+        )
+        try:
+            report = run_load_test(load_options)
+        except LoadTestError as e:
+            raise CommandError(str(e))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+        else:
+            self._print(report)
+
+        if report['violations']:
+            raise CommandError(f"{report['violations']} integrity violation(s): {report['integrity']}")
+
+    def _print(self, report):
+        self.stdout.write(
+            f"{report['mode']}: {report['members']} member(s), {report['desk_check_ins']} desk check-in(s), "
+            f"{report['concurrency']} concurrent, hot classes {report['hot_classes']}"
+        )
+        self.stdout.write(
+            f"{report['requests']} request(s) in {report['seconds']}s = {report['throughput']} req/s"
+        )
+        if report['database'] == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite runs one write transaction at a time; set DATABASE_URL to PostgreSQL '
+                'for numbers that reflect production.'
+            ))
+        self.stdout.write(f"{'operation':<16}{'requests':>9}{'req/s':>8}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'locked':>8}{'errors':>8}  statuses")
+        for name, row in report['operations'].items():
+            statuses = ', '.join(f'{status}x{count}' for status, count in row['statuses'].items())
+            self.stdout.write(
+                f"{name:<16}{row['requests']:>9}{row['throughput']:>8}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+                f"{row['p99_ms']:>9}{row['max_ms']:>9}{row['lock_failures']:>8}{row['errors']:>8}  {statuses}"
+            )
+        if report['locks']:
+            locks = report['locks']
+            self.stdout.write(
+                f"Locks: {locks['slow_locking_statements']}/{locks['locking_statements']} locking statement(s) "
+                f"waited over the threshold, {locks['wait_ms_total']} ms total, {locks['wait_ms_max']} ms max, "
+                f"{locks['lock_errors']} lock error(s)"
+            )
+        integrity = report['integrity']
+        line = (
+            f"Integrity: {integrity['double_check_ins']} double check-in(s), "
+            f"{integrity['overbooked_classes']} overbooked class(es), "
+            f"live counter off by {integrity['live_counter_drift']}"
+        )
+        self.stdout.write(self.style.ERROR(line) if report['violations'] else self.style.SUCCESS(line))
@@ -0,0 +1,284 @@
+"""
+Prometheus metrics for 2moreFitness
+A small dependency-free implementation of the text exposition format.
+Counters and histograms live in process memory; with METRICS_MULTIPROCESS_DIR
+set (gunicorn with several workers) every process writes its values to its
+own mmap'd file in that directory and a scrape sums all the files, so the
+numbers do not depend on which worker answers. Gym gauges (occupancy,
+check-ins in the last minute) are read from the database at scrape time
+
+The directory must be emptied before the server starts, e.g.
+rm -rf "$METRICS_MULTIPROCESS_DIR"/* && gunicorn gym_project.wsgi:application
+"""
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+
+from django.conf import settings
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+METRICS = {
+    'gym_http_request_duration_seconds': ('histogram', 'Request wall time by view.'),
+    'gym_http_requests_total': ('counter', 'Requests by view, method and status code.'),
+    'gym_db_queries_total': ('counter', 'SQL queries run while handling requests, by view.'),
+    'gym_db_query_seconds_total': ('counter', 'Time spent in SQL queries while handling requests, by view.'),
+    'gym_cache_requests_total': ('counter', 'Cache lookups by cache and result (hit or miss).'),
+    'gym_cache_hit_ratio': ('gauge', 'Share of cache lookups that were hits since the server started.'),
+    'gym_check_ins_total': ('counter', 'Member check-ins.'),
+    'gym_class_enrollments_total': ('counter', 'Class enrollments by outcome.'),
+    'gym_registrations_total': ('counter', 'Member accounts created, by source.'),
+    'gym_occupancy_current': ('gauge', 'Members checked in right now.'),
+    'gym_occupancy_capacity': ('gauge', 'Configured gym capacity.'),
+    'gym_check_ins_last_minute': ('gauge', 'Check-ins recorded in the last 60 seconds.'),
+}
+
+_lock = threading.Lock()
+_store = None
+_store_pid = None
+
+
+# ============================================
+# VALUE STORES
+# ============================================
+class _MemoryStore:
+    """Values of this process in a dict"""
+
+    def __init__(self):
+        self.values = {}
+
+    def inc(self, key, amount):
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def items(self):
+        return list(self.values.items())
+
+
+class _MmapStore:
+    """
+    Values of this process in an mmap'd file: an 8-byte used-size header,
+    then entries of [4-byte key length][key, padded to 8 bytes][8-byte double]
+    """
+    INITIAL_SIZE = 64 * 1024
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = {}
+        self.file = open(path, 'a+b')
+        if os.fstat(self.file.fileno()).st_size < self.INITIAL_SIZE:
+            self.file.truncate(self.INITIAL_SIZE)
+        self.capacity = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), self.capacity)
+        self.used = struct.unpack_from('Q', self.map, 0)[0] or 8
+        for key, _, offset in _entries(self.map, self.used):
+            self.offsets[key] = offset
+
+    def _add(self, key):
+        encoded = key.encode('utf-8')
+        padded = encoded + b' ' * (-(4 + len(encoded)) % 8)
+        entry = struct.pack('i', len(encoded)) + padded + struct.pack('d', 0.0)
+        while self.used + len(entry) > self.capacity:
+            self.capacity *= 2
+            self.map.close()
+            self.file.truncate(self.capacity)
+            self.map = mmap.mmap(self.file.fileno(), self.capacity)
+        self.map[self.used:self.used + len(entry)] = entry
+        offset = self.used + 4 + len(padded)
+        self.used += len(entry)
+        struct.pack_into('Q', self.map, 0, self.used)
+        self.offsets[key] = offset
+        return offset
+
+    def inc(self, key, amount):
+        offset = self.offsets.get(key) or self._add(key)
+        value = struct.unpack_from('d', self.map, offset)[0]
+        struct.pack_into('d', self.map, offset, value + amount)
+
+    def items(self):
+        return [(key, value) for key, value, _ in _entries(self.map, self.used)]
+
+
+def _entries(buffer, used):
+    """Yield (key, value, value_offset) from an mmap'd store"""
+    position = 8
+    while position < used:
+        length = struct.unpack_from('i', buffer, position)[0]
+        key = bytes(buffer[position + 4:position + 4 + length]).decode('utf-8')
+        position += 4 + length + (-(4 + length) % 8)
+        yield key, struct.unpack_from('d', buffer, position)[0], position
+        position += 8
+
+
+def _read_file(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < 8:
+        return []
+    used = min(struct.unpack_from('Q', data, 0)[0], len(data))
+    return [(key, value) for key, value, _ in _entries(data, used)]
+
+
+def _multiprocess_dir():
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', '')
+
+
+def _get_store():
+    """This process's store, reopened after a fork so workers never share one"""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store is None or _store_pid != pid:
+        directory = _multiprocess_dir()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            _store = _MmapStore(os.path.join(directory, f'metrics_{pid}.db'))
+        else:
+            _store = _MemoryStore()
+        _store_pid = pid
+    return _store
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], separators=(',', ':'))
+
+
+def _enabled():
+    return getattr(settings, 'METRICS_ENABLED', True)
+
+
+# ============================================
+# RECORDING
+# ============================================
+def inc(name, amount=1, **labels):
+    """Add to a counter"""
+    if not _enabled():
+        return
+    with _lock:
+        _get_store().inc(_key(name, labels), amount)
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS, **labels):
+    """Record one histogram observation"""
+    if not _enabled():
+        return
+    with _lock:
+        store = _get_store()
+        for bound in buckets:
+            if value <= bound:
+                store.inc(_key(name + '_bucket', dict(labels, le=repr(bound))), 1)
+        store.inc(_key(name + '_bucket', dict(labels, le='+Inf')), 1)
+        store.inc(_key(name + '_count', labels), 1)
+        store.inc(_key(name + '_sum', labels), value)
+
+
+def cache_lookup(cache_name, hit):
+    inc('gym_cache_requests_total', cache=cache_name, result='hit' if hit else 'miss')
+
+
+def observe_request(view_name, method, status_code, wall_time, stats):
+    """Called by the request instrumentation middleware once per request"""
+    observe('gym_http_request_duration_seconds', wall_time, view=view_name)
+    inc('gym_http_requests_total', view=view_name, method=method, status=str(status_code))
+    inc('gym_db_queries_total', stats.queries, view=view_name)
+    inc('gym_db_query_seconds_total', stats.db_time, view=view_name)
+
+
+# ============================================
+# EXPOSITION
+# ============================================
+def collect():
+    """{(name, labels tuple): value} for this process, or summed over all worker files"""
+    directory = _multiprocess_dir()
+    if directory:
+        with _lock:
+            _get_store()  # make sure this worker's file exists
+        rows = []
+        for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+            rows.extend(_read_file(path))
+    else:
+        with _lock:
+            rows = _get_store().items()
+
+    values = {}
+    for key, value in rows:
+        name, labels = json.loads(key)
+        sample = (name, tuple(tuple(pair) for pair in labels))
+        values[sample] = values.get(sample, 0.0) + value
+    return values
+
+
+def _gym_gauges(values):
+    """Occupancy and recent check-ins, read from the database at scrape time"""
+    from datetime import datetime, timedelta
+    from apps.attendance import live
+    from apps.attendance.models import Attendance
+
+    now = datetime.now()
+    minute_ago = now - timedelta(minutes=1)
+    recent = Attendance.objects.filter(date=now.date(), check_in__gt=minute_ago.time())
+    if minute_ago.date() != now.date():
+        recent = Attendance.objects.filter(date=now.date())
+
+    values[('gym_occupancy_current', ())] = live.snapshot()['headcount']
+    values[('gym_occupancy_capacity', ())] = getattr(settings, 'GYM_CAPACITY', 100)
+    values[('gym_check_ins_last_minute', ())] = recent.count()
+
+    lookups = {}
+    for (name, labels), value in list(values.items()):
+        if name == 'gym_cache_requests_total':
+            labels = dict(labels)
+            hits, total = lookups.get(labels['cache'], (0.0, 0.0))
+            lookups[labels['cache']] = (hits + (value if labels['result'] == 'hit' else 0), total + value)
+    for cache_name, (hits, total) in lookups.items():
+        values[('gym_cache_hit_ratio', (('cache', cache_name),))] = hits / total if total else 0.0
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _family(sample_name):
+    for suffix in ('_bucket', '_count', '_sum'):
+        if sample_name.endswith(suffix) and sample_name[:-len(suffix)] in METRICS:
+            return sample_name[:-len(suffix)]
+    return sample_name
+
+
+def _sort_key(item):
+    (name, labels), _ = item
+    labels = dict(labels)
+    # Buckets in numeric order, +Inf last
+    bound = labels.pop('le', None)
+    bound = float('inf') if bound == '+Inf' else float(bound) if bound else 0.0
+    return name, sorted(labels.items()), bound
+
+
+def render():
+    """The whole exposition as text"""
+    values = collect()
+    _gym_gauges(values)
+
+    families = {}
+    for sample, value in sorted(values.items(), key=_sort_key):
+        families.setdefault(_family(sample[0]), []).append((sample, value))
+
+    lines = []
+    for family in sorted(families):
+        kind, help_text = METRICS.get(family, ('untyped', ''))
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for (name, labels), value in families[family]:
+            label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels)
+            lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if label_text else f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -1,6 +1,8 @@
 """
 Core models for 2moreFitness Gym Management System
 """
+from datetime import timedelta
+
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -53,6 +55,21 @@ class MembershipPlan(models.Model):
         ('annual', 'Annual'),
     ]
     
+    # Length of one term, shared by purchases, renewals and imports
+    DURATION_DAYS = {
+        'monthly': 30,
+        'quarterly': 90,
+        'semi_annual': 180,
+        'annual': 365,
+    }
+    # Billing months in one term, to spread its price into MRR
+    DURATION_MONTHS = {
+        'monthly': 1,
+        'quarterly': 3,
+        'semi_annual': 6,
+        'annual': 12,
+    }
+    
     name = models.CharField(max_length=100)
     description = models.TextField()
     duration = models.CharField(max_length=20, choices=DURATION_CHOICES)
@@ -73,6 +90,14 @@ class MembershipPlan(models.Model):
     def get_features_list(self):
         """Return features as a list"""
         return [f.strip() for f in self.features.split('\n') if f.strip()]
+    
+    @property
+    def duration_days(self):
+        return self.DURATION_DAYS.get(self.duration, 365)
+    
+    def term_end(self, start_date):
+        """End date of a term of this plan starting on start_date"""
+        return start_date + timedelta(days=self.duration_days)
 
 
 class ContactMessage(models.Model):
@@ -0,0 +1,188 @@
+"""
+Keyset (cursor) pagination for 2moreFitness admin lists
+Each page seeks past the last row it showed with a WHERE on the ordering
+columns instead of an OFFSET, so page 1000 costs the same as page 1.
+Cursors are signed so the front end can hand them back but not forge them
+"""
+import hashlib
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+
+from . import metrics
+
+CURSOR_SALT = 'core.pagination.cursor'
+MAX_PER_PAGE = 100
+
+
+class InvalidCursor(Exception):
+    """Cursor was tampered with or belongs to a different ordering"""
+
+
+def _key_value(obj, field):
+    """Read an ordering value, following user__first_name style paths"""
+    value = obj
+    for part in field.split('__'):
+        value = getattr(value, part)
+    return value
+
+
+def _serialize(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def encode_cursor(ordering, obj, direction):
+    values = [_serialize(_key_value(obj, field.lstrip('-'))) for field in ordering]
+    return signing.dumps({'o': ordering, 'k': values, 'd': direction}, salt=CURSOR_SALT, compress=True)
+
+
+def decode_cursor(token, ordering):
+    """Return (values, direction) or raise InvalidCursor"""
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise InvalidCursor('Invalid cursor.')
+    if payload.get('o') != list(ordering) or payload.get('d') not in ('next', 'prev'):
+        raise InvalidCursor('Cursor does not match this list.')
+    return payload['k'], payload['d']
+
+
+def _seek(ordering, values, forward):
+    """
+    Rows strictly after (forward) or before the key in the given ordering:
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    with > and < flipped for descending columns
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        descending = field.startswith('-')
+        lookup = 'lt' if descending == forward else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse(ordering):
+    return [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+
+
+class KeysetPage:
+    """One page of rows plus opaque cursors for its neighbours"""
+
+    def __init__(self, object_list, ordering, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor(ordering, object_list[-1], 'next') if has_next else None
+        self.previous_cursor = encode_cursor(ordering, object_list[0], 'prev') if has_previous else None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def keyset_page(queryset, ordering, cursor=None, per_page=20):
+    """
+    Fetch one page of `queryset` ordered by `ordering`, which must end in a
+    unique column (usually id) and contain no NULLable fields.
+    Costs one query of per_page + 1 rows regardless of depth
+    """
+    per_page = max(1, min(int(per_page), MAX_PER_PAGE))
+    ordering = list(ordering)
+
+    if cursor:
+        values, direction = decode_cursor(cursor, ordering)
+        forward = direction == 'next'
+        queryset = queryset.filter(_seek(ordering, values, forward))
+    else:
+        forward = True
+
+    rows = list(queryset.order_by(*(ordering if forward else _reverse(ordering)))[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if forward:
+        return KeysetPage(rows, ordering, has_next=has_more, has_previous=bool(cursor) and bool(rows))
+    rows.reverse()
+    return KeysetPage(rows, ordering, has_next=bool(rows), has_previous=has_more)
+
+
+def request_page(request, queryset, ordering, per_page=20):
+    """
+    Keyset page for an HTML list driven by ?cursor=<token>; a stale or
+    tampered cursor falls back to the first page like Paginator.get_page
+    """
+    try:
+        return keyset_page(queryset, ordering, cursor=request.GET.get('cursor'), per_page=per_page)
+    except InvalidCursor:
+        return keyset_page(queryset, ordering, per_page=per_page)
+
+
+def approximate_count(queryset):
+    """
+    Cheap total for a paginated list: the planner's row estimate for an
+    unfiltered PostgreSQL table, otherwise an exact COUNT cached briefly
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql' and not queryset.query.has_filters():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        if row and row[0] > 0:
+            return row[0]
+
+    try:
+        sql, params = queryset.order_by().query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'core:count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    metrics.cache_lookup('count', count is not None)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'PAGINATION_COUNT_CACHE_TTL', 60))
+    return count
+
+
+def page_payload(request, queryset, ordering, serialize, per_page=20):
+    """
+    Shared JSON body for the admin lists' action=page requests
+    ?cursor=<token>&per_page=<n>&count=approx|exact|none
+    """
+    try:
+        per_page = int(request.GET.get('per_page', per_page))
+    except ValueError:
+        pass
+    page = keyset_page(queryset, ordering, cursor=request.GET.get('cursor'), per_page=per_page)
+    count_mode = request.GET.get('count', 'approx')
+    if count_mode == 'exact':
+        total = queryset.count()
+    elif count_mode == 'none':
+        total = None
+    else:
+        total = approximate_count(queryset)
+
+    return {
+        'results': [serialize(obj) for obj in page],
+        'next_cursor': page.next_cursor,
+        'previous_cursor': page.previous_cursor,
+        'has_next': page.has_next,
+        'has_previous': page.has_previous,
+        'total': total,
+        'total_is_estimate': count_mode not in ('exact', 'none'),
+    }
@@ -0,0 +1,57 @@
+"""
+User provisioning for 2moreFitness
+The one place that creates a user's UserProfile (and Member row for member
+accounts). The post_save receiver only provisions on creation, so the many
+plain User saves (every login writes last_login) cost no extra queries, and
+suspended() turns it off entirely for bulk work that builds profiles itself
+"""
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from apps.members.models import Member
+from . import metrics
+from .models import UserProfile
+
+_state = threading.local()
+
+
+@contextmanager
+def suspended():
+    """Skip automatic profile creation for users saved inside the block"""
+    depth = getattr(_state, 'suspended', 0)
+    _state.suspended = depth + 1
+    try:
+        yield
+    finally:
+        _state.suspended = depth
+
+
+def is_suspended():
+    return getattr(_state, 'suspended', 0) > 0
+
+
+def provision_profile(user, role='member', **fields):
+    """Create the user's profile with every field in a single INSERT"""
+    profile = UserProfile.objects.create(user=user, role=role, **fields)
+    user.profile = profile
+    return profile
+
+
+def create_member_account(username, email, password, first_name='', last_name='',
+                          phone='', address='', is_active=True):
+    """User + UserProfile + Member in one transaction, three INSERTs"""
+    with transaction.atomic(), suspended():
+        user = User.objects.create_user(
+            username=username,
+            email=email,
+            password=password,
+            first_name=first_name or '',
+            last_name=last_name or '',
+        )
+        provision_profile(user, phone=phone or '', address=address or '')
+        member = Member.objects.create(user=user, is_active=is_active)
+        transaction.on_commit(lambda: metrics.inc('gym_registrations_total', source='account'))
+    return member
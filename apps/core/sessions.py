@@ -0,0 +1,50 @@
+"""
+Sliding session expiry for 2moreFitness
+Replaces SESSION_SAVE_EVERY_REQUEST: instead of rewriting the session on
+every request, the expiry is pushed forward only once the session has
+been idle-refreshed for longer than SESSION_REFRESH_FRACTION of
+SESSION_COOKIE_AGE. Works with any session engine (db, cached_db,
+signed_cookies) since it only marks the session as modified
+"""
+import time
+
+from django.conf import settings
+
+REFRESHED_KEY = '_refreshed_at'
+
+
+def _refresh_interval():
+    fraction = getattr(settings, 'SESSION_REFRESH_FRACTION', 0.5)
+    return settings.SESSION_COOKIE_AGE * fraction
+
+
+def needs_refresh(session, now=None):
+    now = now or time.time()
+    refreshed_at = session.get(REFRESHED_KEY)
+    return refreshed_at is None or now - refreshed_at >= _refresh_interval()
+
+
+class SessionRefreshMiddleware:
+    """
+    Goes right after SessionMiddleware. A session that is already being
+    saved just records the time; an untouched one is only saved (and its
+    cookie re-sent with a new max-age) when it is due for a refresh
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        session = getattr(request, 'session', None)
+        # No cookie and nothing stored: leave anonymous visitors session-less
+        if session is None or (session.session_key is None and not session.modified):
+            return response
+        if response.status_code >= 500 or session.is_empty():
+            return response
+
+        now = time.time()
+        if session.modified or needs_refresh(session, now):
+            session[REFRESHED_KEY] = int(now)
+        return response
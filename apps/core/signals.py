@@ -1,21 +1,27 @@
 """
 Signals for core app
 """
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import UserProfile
+from apps.members.models import Member, Membership
+from apps.attendance.models import Attendance
+from apps.classes.models import GymClass
+from . import provisioning
+from .dashboard import invalidate_dashboard_stats
 
 
 @receiver(post_save, sender=User)
-def create_user_profile(sender, instance, created, **kwargs):
-    """Create UserProfile when User is created"""
-    if created:
-        UserProfile.objects.get_or_create(user=instance)
+def provision_new_user(sender, instance, created, raw=False, **kwargs):
+    """Give each new user a profile; plain updates such as last_login do nothing"""
+    if created and not raw and not provisioning.is_suspended():
+        provisioning.provision_profile(instance)
 
 
-@receiver(post_save, sender=User)
-def save_user_profile(sender, instance, **kwargs):
-    """Save UserProfile when User is saved"""
-    if hasattr(instance, 'profile'):
-        instance.profile.save()
+@receiver([post_save, post_delete], sender=Member)
+@receiver([post_save, post_delete], sender=Membership)
+@receiver([post_save, post_delete], sender=Attendance)
+@receiver([post_save, post_delete], sender=GymClass)
+def invalidate_dashboard_cache(sender, **kwargs):
+    """Drop the cached admin dashboard snapshot when its source rows change"""
+    invalidate_dashboard_stats()
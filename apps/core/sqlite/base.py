@@ -0,0 +1,14 @@
+"""
+SQLite database backend for local development
+Django's backend opens transactions with a deferred BEGIN, so two requests
+that both read and then write deadlock on the lock upgrade and SQLite fails
+one at once with 'database is locked', ignoring the busy timeout. BEGIN
+IMMEDIATE takes the write lock up front instead, so concurrent writers queue
+for up to SQLITE_TIMEOUT seconds the way they queue on row locks in PostgreSQL
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
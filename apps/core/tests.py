@@ -0,0 +1,418 @@
+"""
+Tests for the core app
+"""
+import os
+import re
+import shutil
+import tempfile
+from datetime import date, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from apps.attendance.models import Attendance
+from apps.classes.models import GymClass
+from apps.members.models import Member, Membership
+from .dashboard import get_dashboard_stats
+from .models import MembershipPlan, UserProfile
+from .pagination import InvalidCursor, keyset_page
+from .provisioning import create_member_account
+from . import dashboard, instrumentation, loadtest, metrics, provisioning, sessions
+
+
+def admin_client(client):
+    """Log the test client in the way login_view does for the administrator"""
+    session = client.session
+    session['is_admin'] = True
+    session['is_member'] = False
+    session['user_type'] = 'admin'
+    session.save()
+    return client
+
+
+class AdminMemberListQueryTests(TestCase):
+    """The member list must cost the same number of queries at any size"""
+
+    # Session, the page and its memberships; the header counters are cached
+    QUERIES = 3
+
+    def setUp(self):
+        cache.clear()
+        self.plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        admin_client(self.client)
+        # The first request also refreshes the session's expiry and fills the count cache
+        self.client.get(reverse('admin_member_list'))
+
+    def add_members(self, count):
+        start = Member.objects.count()
+        for n in range(start, start + count):
+            member, _ = Member.objects.get_or_create(user=User.objects.create_user(f'member{n}'))
+            Membership.objects.create(
+                member=member, plan=self.plan, status='active', payment_status='paid',
+                start_date=date.today(), end_date=date.today() + timedelta(days=30),
+                payment_amount=self.plan.price,
+            )
+
+    def assert_list_queries(self):
+        with self.assertNumQueries(self.QUERIES) as queries:
+            response = self.client.get(reverse('admin_member_list'))
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries.captured_queries]
+
+    def test_queries_do_not_grow_with_members(self):
+        self.add_members(3)
+        response, _ = self.assert_list_queries()
+        self.assertEqual(len(response.context['members']), 3)
+
+        self.add_members(30)
+        response, queries = self.assert_list_queries()
+        page = response.context['members']
+        self.assertEqual(len(page), 10)
+
+        # Only the page's rows are read: the member query is LIMITed to the page
+        # plus one lookahead row that tells whether a next page exists, and the
+        # memberships lookup names only those eleven members
+        member_query = next(sql for sql in queries if sql.startswith('SELECT "members"."id"'))
+        self.assertRegex(member_query, r'LIMIT 11$')
+        membership_query = next(sql for sql in queries if 'FROM "memberships" INNER JOIN' in sql)
+        ids = re.search(r'"memberships"\."member_id" IN \(([^)]*)\)', membership_query).group(1)
+        ids = {int(i) for i in ids.split(',')}
+        self.assertEqual(len(ids), 11)
+        self.assertTrue({member.id for member in page} <= ids)
+
+    def test_deep_pages_seek_instead_of_counting(self):
+        self.add_members(45)
+        self.client.get(reverse('admin_member_list'))
+
+        seen, cursor, depth = [], None, 0
+        while True:
+            with self.assertNumQueries(self.QUERIES) as queries:
+                response = self.client.get(reverse('admin_member_list'), {'cursor': cursor} if cursor else {})
+            page = response.context['members']
+            seen += [member.id for member in page]
+            sql = ' '.join(query['sql'] for query in queries.captured_queries)
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+            if not page.has_next:
+                break
+            cursor, depth = page.next_cursor, depth + 1
+        self.assertEqual(depth, 4)
+        self.assertEqual(sorted(seen), sorted(Member.objects.values_list('id', flat=True)))
+
+        # A forged cursor falls back to the first page
+        response = self.client.get(reverse('admin_member_list'), {'cursor': 'forged'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['members'].has_previous)
+
+
+class DashboardInvalidationTests(TestCase):
+    """Writes to the dashboard's source tables drop the cached snapshot"""
+
+    def setUp(self):
+        cache.clear()
+        self.plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        self.member, _ = Member.objects.get_or_create(user=User.objects.create_user('ana'))
+
+    def assert_invalidated(self, write):
+        get_dashboard_stats()
+        with self.assertNumQueries(0):
+            get_dashboard_stats()
+        write()
+        self.assertIsNone(cache.get(dashboard._cache_key(date.today())))
+        return get_dashboard_stats()
+
+    def test_member_write(self):
+        stats = self.assert_invalidated(
+            lambda: Member.objects.get_or_create(user=User.objects.create_user('ben'))
+        )
+        self.assertEqual(stats['total_members'], 2)
+
+    def test_membership_write(self):
+        stats = self.assert_invalidated(lambda: Membership.objects.create(
+            member=self.member, plan=self.plan, status='active', payment_status='paid',
+            start_date=date.today(), end_date=date.today() + timedelta(days=3),
+            payment_amount=self.plan.price,
+        ))
+        self.assertEqual(stats['active_memberships'], 1)
+        self.assertEqual(stats['expiring_soon'], 1)
+
+    def test_attendance_write(self):
+        stats = self.assert_invalidated(
+            lambda: Attendance.objects.create(member=self.member, date=date.today(), check_in=time(6, 0))
+        )
+        self.assertEqual(stats['today_attendance'], 1)
+
+    def test_class_write(self):
+        def add_class():
+            GymClass.objects.create(
+                name='Spin', duration=45, max_capacity=5,
+                day_of_week=date.today().strftime('%A').lower(), time=time(6, 0),
+            )
+        stats = self.assert_invalidated(add_class)
+        self.assertEqual(stats['classes_today'], 1)
+
+    def test_delete(self):
+        stats = self.assert_invalidated(self.member.delete)
+        self.assertEqual(stats['total_members'], 0)
+
+
+class ProvisioningTests(TestCase):
+    """Profiles are provisioned once, on creation, and never rewritten by plain saves"""
+
+    def test_login_does_not_touch_the_profile(self):
+        user = User.objects.create_user('ana')
+        profile = UserProfile.objects.get(user=user)
+
+        # update_last_login is what the user_logged_in signal runs
+        with self.assertNumQueries(1) as queries:
+            update_last_login(None, user)
+        self.assertIn('UPDATE "auth_user"', queries.captured_queries[0]['sql'])
+
+        with self.assertNumQueries(1):
+            user.first_name = 'Ana'
+            user.save()
+        self.assertEqual(UserProfile.objects.filter(user=user).count(), 1)
+        self.assertEqual(UserProfile.objects.get(user=user).updated_at, profile.updated_at)
+
+    def test_member_account_provisioned_once(self):
+        member = create_member_account('ben', 'ben@example.com', 'pass', phone='0917')
+        self.assertEqual(UserProfile.objects.filter(user=member.user).count(), 1)
+        self.assertEqual(member.user.profile.phone, '0917')
+        self.assertEqual(Member.objects.filter(user=member.user).count(), 1)
+
+    def test_suspended_skips_provisioning(self):
+        with provisioning.suspended():
+            user = User.objects.create_user('cara')
+        self.assertFalse(UserProfile.objects.filter(user=user).exists())
+        User.objects.create_user('dan')
+        self.assertTrue(UserProfile.objects.filter(user__username='dan').exists())
+
+
+class SessionRefreshTests(TestCase):
+    """A session is written only when its expiry is due to be pushed forward"""
+
+    def session_writes(self, now):
+        with mock.patch.object(sessions.time, 'time', return_value=now), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in queries.captured_queries if 'django_session' in q['sql'] and 'SELECT' not in q['sql']]
+
+    def test_writes_only_when_due(self):
+        admin_client(self.client)
+        start = 1_000_000
+        half = settings.SESSION_COOKIE_AGE * settings.SESSION_REFRESH_FRACTION
+
+        self.assertEqual(len(self.session_writes(start)), 1)
+        refreshed_at = self.client.session[sessions.REFRESHED_KEY]
+        self.assertEqual(self.session_writes(start + 60), [])
+        self.assertEqual(self.session_writes(start + half - 1), [])
+        self.assertEqual(self.client.session[sessions.REFRESHED_KEY], refreshed_at)
+
+        self.assertEqual(len(self.session_writes(start + half)), 1)
+        self.assertEqual(self.client.session[sessions.REFRESHED_KEY], start + half)
+
+    def test_anonymous_visitor_gets_no_session(self):
+        self.assertEqual(self.session_writes(1_000_000), [])
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+
+
+class AdminMembershipExportTests(TestCase):
+    """Bad date filters on the membership export are a 400, not a 500"""
+
+    def setUp(self):
+        admin_client(self.client)
+
+    def test_invalid_dates_rejected(self):
+        for params in ({'date_from': '2026-13-01'}, {'date_to': '2026-02-30'}, {'date_from': 'yesterday'}):
+            response = self.client.get(reverse('admin_membership_export'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertEqual(response.json(), {'error': 'Dates must be in YYYY-MM-DD format.'})
+
+    def test_valid_range_streams_csv(self):
+        response = self.client.get(reverse('admin_membership_export'), {'date_from': '2026-01-01', 'date_to': '2026-01-31'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/csv', response['Content-Type'])
+
+
+@override_settings(METRICS_TOKEN='scrape-secret', METRICS_PUBLIC=False)
+class MetricsViewTests(TestCase):
+    """/metrics needs an admin session or the bearer token unless made public"""
+
+    def test_anonymous_rejected(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        with self.settings(METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+
+    def test_wrong_token_rejected(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer guess')
+        self.assertEqual(response.status_code, 401)
+
+    def test_token_admin_and_public_allowed(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE gym_http_requests_total counter', response.content.decode())
+        with self.settings(METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        admin_client(self.client)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class PercentileTests(SimpleTestCase):
+    """Nearest-rank percentiles of the request samples"""
+
+    def test_nearest_rank(self):
+        ordered = list(range(1, 101))
+        self.assertEqual(instrumentation._percentile(ordered, 50), 50)
+        self.assertEqual(instrumentation._percentile(ordered, 95), 95)
+        self.assertEqual(instrumentation._percentile(ordered, 99), 99)
+        self.assertEqual(instrumentation._percentile([7], 99), 7)
+        self.assertEqual(instrumentation._percentile([1, 2, 3, 4], 50), 2)
+
+    def test_empty(self):
+        self.assertEqual(instrumentation._percentile([], 95), 0)
+
+
+class MetricsStoreTests(SimpleTestCase):
+    """Per-worker mmap files survive reopening, grow, and sum across workers"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_values_persist_and_file_grows(self):
+        store = metrics._MmapStore(self.path('metrics_1.db'))
+        store.inc('a', 1)
+        store.inc('a', 2.5)
+        for n in range(3000):
+            store.inc(f'key-{n:04d}-' + 'x' * 20, n)
+        self.assertGreater(store.capacity, metrics._MmapStore.INITIAL_SIZE)
+
+        reopened = dict(metrics._MmapStore(self.path('metrics_1.db')).items())
+        self.assertEqual(reopened['a'], 3.5)
+        self.assertEqual(reopened['key-2999-' + 'x' * 20], 2999)
+        self.assertEqual(dict(metrics._read_file(self.path('metrics_1.db'))), reopened)
+
+    def test_collect_sums_worker_files(self):
+        key = metrics._key('gym_check_ins_total', {})
+        metrics._MmapStore(self.path('metrics_1.db')).inc(key, 2)
+        metrics._MmapStore(self.path('metrics_2.db')).inc(key, 3)
+        with self.settings(METRICS_MULTIPROCESS_DIR=self.directory), \
+                mock.patch.object(metrics, '_store', metrics._MmapStore(self.path('metrics_1.db'))), \
+                mock.patch.object(metrics, '_store_pid', os.getpid()):
+            self.assertEqual(metrics.collect()[('gym_check_ins_total', ())], 5)
+
+
+@override_settings(METRICS_MULTIPROCESS_DIR='', METRICS_ENABLED=True)
+class MetricsExpositionTests(TestCase):
+    """The text format Prometheus parses"""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(metrics, '_store', metrics._MemoryStore()),
+            mock.patch.object(metrics, '_store_pid', os.getpid()),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_histogram_and_labels(self):
+        metrics.observe('gym_http_request_duration_seconds', 0.02, view='class "list"')
+        metrics.inc('gym_http_requests_total', view='index', method='GET', status='200')
+        lines = metrics.render().splitlines()
+
+        self.assertIn('# TYPE gym_http_request_duration_seconds histogram', lines)
+        buckets = [line for line in lines if line.startswith('gym_http_request_duration_seconds_bucket')]
+        # Cumulative buckets from the first bound holding the observation, +Inf last
+        self.assertEqual(buckets[0], 'gym_http_request_duration_seconds_bucket{le="0.025",view="class \\"list\\""} 1')
+        self.assertEqual(buckets[-1], 'gym_http_request_duration_seconds_bucket{le="+Inf",view="class \\"list\\""} 1')
+        self.assertEqual(len(buckets), len([b for b in metrics.LATENCY_BUCKETS if b >= 0.02]) + 1)
+        self.assertIn('gym_http_request_duration_seconds_sum{view="class \\"list\\""} 0.02', lines)
+        self.assertIn('gym_http_requests_total{method="GET",status="200",view="index"} 1', lines)
+        self.assertIn('gym_occupancy_current 0', lines)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursors walk every row exactly once in both directions and cannot be forged"""
+
+    ORDERING = ['last_name', 'id']
+
+    def setUp(self):
+        for n in range(23):
+            User.objects.create_user(f'user{n}', last_name=f'Name{n % 5}')
+        self.expected = list(User.objects.order_by(*self.ORDERING).values_list('id', flat=True))
+
+    def test_forward_and_back(self):
+        pages, cursor = [], None
+        while True:
+            page = keyset_page(User.objects.all(), self.ORDERING, cursor=cursor, per_page=5)
+            pages.append([user.id for user in page])
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertEqual([len(ids) for ids in pages], [5, 5, 5, 5, 3])
+
+        previous = keyset_page(User.objects.all(), self.ORDERING, cursor=page.previous_cursor, per_page=5)
+        self.assertEqual([user.id for user in previous], pages[-2])
+        self.assertTrue(previous.has_previous)
+
+    def test_tampered_or_foreign_cursor_rejected(self):
+        page = keyset_page(User.objects.all(), self.ORDERING, per_page=5)
+        with self.assertRaises(InvalidCursor):
+            keyset_page(User.objects.all(), self.ORDERING, cursor=page.next_cursor[:-2] + 'xx')
+        with self.assertRaises(InvalidCursor):
+            keyset_page(User.objects.all(), ['-id'], cursor=page.next_cursor)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'SQLite backend only')
+class SqliteImmediateTransactionTests(TransactionTestCase):
+    """Transactions take the write lock up front so writers queue on the busy timeout"""
+
+    def test_transactions_begin_immediate(self):
+        with CaptureQueriesContext(connection) as queries, transaction.atomic():
+            MembershipPlan.objects.count()
+        self.assertEqual(queries.captured_queries[0]['sql'], 'BEGIN IMMEDIATE')
+
+
+class LoadTestReportTests(SimpleTestCase):
+    """Lock failures are reported apart from application errors"""
+
+    def test_locked_requests_not_counted_as_errors(self):
+        load_test = loadtest.LoadTest(loadtest.LoadTestOptions(base_url='http://127.0.0.1:8000'))
+        load_test.members, load_test.desk_members, load_test.classes = [], [], []
+        load_test.samples['enroll_class'] = [0.01] * 5
+        load_test.statuses['enroll_class'].update({302: 2, loadtest.LOCKED: 2, 500: 1})
+        clean = {'double_check_ins': 0, 'overbooked_classes': 0, 'live_counter_drift': 0}
+
+        row = load_test._report(1.0, clean, clean)['operations']['enroll_class']
+        self.assertEqual((row['lock_failures'], row['errors']), (2, 1))
+        self.assertEqual(row['statuses'], {'302': 2, '500': 1, 'locked': 2})
+
+    def test_lock_messages(self):
+        self.assertTrue(loadtest._is_lock_error(OperationalError('database is locked')))
+        self.assertTrue(loadtest._is_lock_error(OperationalError('deadlock detected')))
+        self.assertFalse(loadtest._is_lock_error(ValueError('no such member')))
+
+
+class GenerateLoadDataOptionTests(TestCase):
+    """Impossible dates on the command line are a CommandError, not a traceback"""
+
+    def test_impossible_date(self):
+        with self.assertRaisesMessage(CommandError, '--date must be a date in YYYY-MM-DD format.'):
+            call_command('generate_load_data', '--date', '2026-02-30')
@@ -48,7 +48,19 @@ urlpatterns = [
     path('admin-classes/', views.admin_class_list, name='admin_class_list'),
     path('admin-classes/<int:class_id>/', views.admin_class_detail, name='admin_class_detail'),
     path('admin-classes/trainers-list/', views.admin_trainers_list, name='admin_trainers_list'),
+    path('admin-classes/booking-report/', views.admin_booking_report, name='admin_booking_report'),
     
     # ===== ADMIN ATTENDANCE CRUD - SINGLE PAGE =====
     path('admin-attendance/', views.admin_attendance_report, name='admin_attendance_report'),
+    path('admin-memberships/export/', views.admin_membership_export, name='admin_membership_export'),
+    
+    # ===== ADMIN REVENUE REPORT =====
+    path('admin-revenue/', views.admin_revenue_report, name='admin_revenue_report'),
+    path('admin-revenue/data/', views.admin_revenue_data, name='admin_revenue_data'),
+    
+    # ===== ADMIN REQUEST STATS =====
+    path('admin-performance/', views.admin_request_stats, name='admin_request_stats'),
+    
+    # ===== PROMETHEUS SCRAPE ENDPOINT =====
+    path('metrics', views.metrics_view, name='metrics'),
 ]
\ No newline at end of file
@@ -9,36 +9,31 @@ from django.contrib import messages
 from django.conf import settings
 from django.utils import timezone
 from django.utils.timesince import timesince
+from django.utils.crypto import constant_time_compare
 from datetime import datetime, timedelta, date
-from django.db import models
-from django.http import JsonResponse
-from django.core.paginator import Paginator
+from django.db import models, IntegrityError
+from django.http import JsonResponse, HttpResponse
 from .models import UserProfile, MembershipPlan, ContactMessage
+from .dashboard import get_dashboard_stats
+from .provisioning import create_member_account
+from .pagination import page_payload, request_page, approximate_count, InvalidCursor
+from . import instrumentation, metrics
+from .exports import (
+    export_format, stream_export,
+    ATTENDANCE_COLUMNS, MEMBERSHIP_COLUMNS, MEMBER_COLUMNS,
+)
+from apps.classes.enrollment import promote_waitlist
 from apps.members.models import Member, Membership
+from apps.members.removal import delete_members
+from apps.members.importer import import_upload
+from apps.members.reconciliation import reconcile_upload
+from apps.members import revenue
 from apps.trainers.models import Trainer
-
-# ============= SAFE IMPORTS FOR CLASSES =============
-try:
-    from apps.classes.models import GymClass as Class
-    from apps.classes.models import ClassBooking
-    print("SUCCESS: Imported GymClass as Class")
-except ImportError:
-    try:
-        from apps.classes.models import Class
-        from apps.classes.models import ClassBooking
-        print("SUCCESS: Imported Class")
-    except ImportError:
-        try:
-            from apps.classes.models import classes as Class
-            from apps.classes.models import ClassBooking
-            print("SUCCESS: Imported classes as Class")
-        except ImportError:
-            Class = None
-            ClassBooking = None
-            print("WARNING: Could not import Class model from apps.classes.models")
-
-from apps.attendance.models import Attendance
-# ====================================================
+from apps.classes.models import GymClass as Class, ClassBooking
+from apps.classes.bookings import booking_report
+from apps.classes import schedule
+from apps.attendance.models import Attendance, AttendanceDailyRollup
+from apps.attendance import occupancy, live, checkins
 
 # ============================================
 # INDEX VIEW
@@ -52,7 +47,7 @@ def index(request):
     if Class is not None:
         upcoming_classes = Class.objects.filter(
             is_active=True,
-        )[:6]
+        ).select_related('trainer__user').with_enrollment()[:6]
     
     total_members = Member.objects.count()
     total_trainers = Trainer.objects.count()
@@ -178,36 +173,18 @@ def register_view(request):
             messages.error(request, 'Email already registered.')
             return redirect('register')
         
-        user = User.objects.create_user(
+        # User, profile and member in one transaction
+        create_member_account(
             username=username,
             email=email,
             password=password,
             first_name=first_name,
-            last_name=last_name
+            last_name=last_name,
+            phone=phone,
+            address=address,
+            is_active=False,
         )
         
-        # Create or update UserProfile
-        from apps.core.models import UserProfile
-        try:
-            profile = UserProfile.objects.get(user=user)
-            profile.phone = phone
-            profile.address = address
-            profile.save()
-        except UserProfile.DoesNotExist:
-            UserProfile.objects.create(
-                user=user,
-                phone=phone,
-                address=address,
-            )
-        
-        # Create Member
-        from apps.members.models import Member
-        if not Member.objects.filter(user=user).exists():
-            Member.objects.create(
-                user=user,
-                is_active=False,
-            )
-        
         messages.success(request, 'Registration successful! Please login.')
         return redirect('login')
     
@@ -319,83 +296,22 @@ def admin_dashboard(request):
         messages.error(request, 'Please login as administrator to access this page.')
         return redirect('login')
     
-    today = date.today()
-    first_day = today.replace(day=1)
-    
-    # MEMBER STATISTICS
-    total_members = Member.objects.count()
-    active_memberships = Membership.objects.filter(status='active').count()
-    total_trainers = Trainer.objects.count()
-    today_attendance = Attendance.objects.filter(date=today).count()
-    
-    # NEW MEMBERS THIS MONTH
-    new_members_this_month = Member.objects.filter(created_at__date__gte=first_day).count()
-    
-    # EXPIRING SOON
-    expiring_soon = Membership.objects.filter(
-        status='active',
-        end_date__lte=today + timedelta(days=7),
-        end_date__gte=today
-    ).count()
-    
-    # CLASSES TODAY
-    classes_today = 0
-    if Class is not None:
-        import datetime
-        today_day = today.strftime('%A').lower()
-        classes_today = Class.objects.filter(
-            is_active=True,
-            day_of_week=today_day
-        ).count()
-    
-    # RECENT MEMBERS
-    recent_members = Member.objects.order_by('-created_at')[:5]
-    
-    # PEAK HOUR
-    peak_hour = "5-7 PM"
-    
-    # RECENT ACTIVITIES
-    recent_activities = []
-    
-    for member in Member.objects.order_by('-created_at')[:3]:
-        time_ago = timesince(member.created_at).split(',')[0]
-        recent_activities.append({
-            'icon': 'user-plus',
-            'title': 'New member registered',
-            'description': f'{member.user.get_full_name() or member.user.username} joined',
-            'time': f'{time_ago} ago'
-        })
-    
-    for attendance in Attendance.objects.order_by('-date', '-check_in')[:3]:
-        if attendance.member:
-            time_ago = timesince(attendance.date).split(',')[0]
-            recent_activities.append({
-                'icon': 'clipboard-check',
-                'title': 'Member check-in',
-                'description': f'{attendance.member.user.get_full_name() or attendance.member.user.username} checked in',
-                'time': f'{time_ago} ago'
-            })
-    
-    for membership in Membership.objects.filter(status='active').order_by('-start_date')[:3]:
-        time_ago = timesince(membership.start_date).split(',')[0]
-        recent_activities.append({
-            'icon': 'crown',
-            'title': 'Membership purchased',
-            'description': f'{membership.member.user.get_full_name() or membership.member.user.username} bought {membership.plan.name}',
-            'time': f'{time_ago} ago'
-        })
+    stats = get_dashboard_stats()
     
     context = {
-        'total_members': total_members,
-        'active_memberships': active_memberships,
-        'total_trainers': total_trainers,
-        'today_attendance': today_attendance,
-        'recent_members': recent_members,
-        'new_members_this_month': new_members_this_month,
-        'expiring_soon': expiring_soon,
-        'classes_today': classes_today,
-        'peak_hour': peak_hour,
-        'recent_activities': recent_activities,
+        'total_members': stats['total_members'],
+        'active_memberships': stats['active_memberships'],
+        'total_trainers': stats['total_trainers'],
+        'today_attendance': stats['today_attendance'],
+        'recent_members': stats['recent_members'],
+        'new_members_this_month': stats['new_members_this_month'],
+        'expiring_soon': stats['expiring_soon'],
+        'classes_today': stats['classes_today'],
+        'peak_hour': stats['peak_hour'],
+        'peak_headcount': stats['peak_headcount'],
+        'occupancy_heatmap': stats['occupancy_heatmap'],
+        'live_occupancy': live.snapshot(),
+        'recent_activities': stats['recent_activities'],
         'user': request.user,
     }
     
@@ -415,9 +331,10 @@ def member_dashboard(request):
     try:
         member = Member.objects.get(user=request.user)
         
-        # FIX SESSION
-        request.session['is_member'] = True
-        request.session['member_id'] = member.id
+        # FIX SESSION - assigning marks the session dirty, so only write on change
+        if not request.session.get('is_member') or request.session.get('member_id') != member.id:
+            request.session['is_member'] = True
+            request.session['member_id'] = member.id
         
         # MEMBERSHIP DATA
         active_membership = Membership.objects.filter(
@@ -441,9 +358,14 @@ def member_dashboard(request):
         # CLASS DATA
         upcoming_classes = []
         if Class is not None:
-            upcoming_classes = member.enrolled_classes.filter(
-                is_active=True,
-            ).order_by('day_of_week', 'time')[:4]
+            # Next dated sessions of enrolled classes from the occurrence calendar
+            for occurrence in schedule.upcoming(
+                end=timezone.now() + timedelta(weeks=schedule.horizon_weeks()),
+                classes=member.enrolled_classes.all(),
+            )[:4]:
+                gym_class = occurrence.gym_class
+                gym_class.schedule = occurrence.starts_at
+                upcoming_classes.append(gym_class)
         
         # ATTENDANCE DATA
         recent_attendance = Attendance.objects.filter(
@@ -508,7 +430,7 @@ def member_profile(request):
         if Class is not None:
             enrolled_classes = member.enrolled_classes.filter(
                 is_active=True,
-            ).order_by('day_of_week', 'time')[:5]
+            ).select_related('trainer__user').with_enrollment().in_week_order()[:5]
         
         # Get checkins count
         checkins_count = Attendance.objects.filter(member=member).count()
@@ -637,7 +559,7 @@ def trainer_dashboard(request):
             assigned_classes = Class.objects.filter(
                 trainer=trainer, 
                 is_active=True
-            ).order_by('day_of_week', 'time')
+            ).with_enrollment().in_week_order()
         
         today = timezone.now().date()
         today_day = today.strftime('%A').lower()
@@ -647,18 +569,20 @@ def trainer_dashboard(request):
         
         upcoming_classes = []
         if Class is not None:
-            upcoming_classes = assigned_classes.order_by('day_of_week', 'time')[:10]
+            upcoming_classes = assigned_classes[:10]
         
         total_members_trained = 0
         if Class is not None:
             total_members_trained = Member.objects.filter(
-                enrolled_classes__in=assigned_classes
+                enrolled_classes__trainer=trainer,
+                enrolled_classes__is_active=True
             ).distinct().count()
         
         today_attendance = Attendance.objects.filter(
-            member__in=Member.objects.filter(enrolled_classes__in=assigned_classes),
+            member__enrolled_classes__trainer=trainer,
+            member__enrolled_classes__is_active=True,
             date=today
-        ).count()
+        ).values('id').distinct().count()
         
         context = {
             'trainer': trainer,
@@ -749,6 +673,31 @@ def careers(request):
 # ============================================
 # ADMIN MEMBER LIST - ALL CRUD IN ONE PAGE (FIXED - SINGLE VERSION)
 # ============================================
+# Keyset orderings per sort option; each ends in id so the key is unique
+MEMBER_KEYSET_ORDERINGS = {
+    'newest': ['-created_at', 'id'],
+    'oldest': ['created_at', 'id'],
+    'name_asc': ['user__first_name', 'user__last_name', 'id'],
+    'name_desc': ['-user__first_name', '-user__last_name', 'id'],
+}
+
+
+def _member_row(member):
+    user = member.user
+    profile = getattr(user, 'profile', None)
+    return {
+        'id': member.id,
+        'username': user.username,
+        'full_name': user.get_full_name() or user.username,
+        'email': user.email,
+        'phone': profile.phone if profile else '',
+        'is_active': member.is_active,
+        'membership_plan': member.current_plan_name,
+        'membership_end': member.current_membership_end.isoformat() if member.current_membership_end else None,
+        'created_at': member.created_at.isoformat(),
+    }
+
+
 def admin_member_list(request):
     """Admin member list view - ALL CRUD operations in ONE page using modals"""
     if not request.session.get('is_admin', False):
@@ -760,7 +709,6 @@ def admin_member_list(request):
     from apps.core.models import UserProfile
     from django.db import models
     from datetime import date, timedelta
-    from django.core.paginator import Paginator
     from django.contrib.auth.models import User
     
     # ===== AJAX: CREATE MEMBER =====
@@ -791,27 +739,18 @@ def admin_member_list(request):
         if User.objects.filter(email=email).exists():
             return JsonResponse({'error': 'Email already registered.'}, status=400)
         
-        # Create user
-        user = User.objects.create_user(
+        # User, profile and member in one transaction
+        member = create_member_account(
             username=username,
             email=email,
             password=password,
             first_name=first_name,
-            last_name=last_name
-        )
-        
-        # Create UserProfile
-        UserProfile.objects.create(
-            user=user,
+            last_name=last_name,
             phone=phone,
             address=address,
-        )
-        
-        # Create Member
-        member = Member.objects.create(
-            user=user,
             is_active=is_active,
         )
+        user = member.user
         
         return JsonResponse({
             'success': True,
@@ -865,42 +804,39 @@ def admin_member_list(request):
     # ===== AJAX: DELETE MEMBER =====
     if request.method == 'POST' and request.POST.get('action') == 'delete_member':
         member_id = request.POST.get('member_id')
-        try:
-            member = Member.objects.get(id=member_id)
-            user = member.user
-            # Delete profile
-            try:
-                profile = UserProfile.objects.get(user=user)
-                profile.delete()
-            except UserProfile.DoesNotExist:
-                pass
-            member.delete()
-            user.delete()
-            return JsonResponse({
-                'success': True,
-                'message': 'Member has been deleted successfully.'
-            })
-        except Member.DoesNotExist:
+        if not member_id or not Member.objects.filter(id=member_id).exists():
             return JsonResponse({'error': 'Member not found.'}, status=404)
+        delete_members([member_id])
+        return JsonResponse({
+            'success': True,
+            'message': 'Member has been deleted successfully.'
+        })
+    
+    # ===== AJAX: IMPORT MEMBERS FROM CSV/JSONL =====
+    if request.method == 'POST' and request.POST.get('action') == 'import_members':
+        upload = request.FILES.get('import_file')
+        if upload is None:
+            return JsonResponse({'error': 'Please choose a CSV or JSONL file to import.'}, status=400)
+        result = import_upload(upload)
+        return JsonResponse({
+            'success': True,
+            'message': f'{result.created} member(s) imported, {result.skipped} row(s) skipped.',
+            **result.as_dict(),
+        })
     
     # ===== AJAX: BULK DELETE MEMBERS =====
     if request.method == 'POST' and request.POST.get('action') == 'bulk_delete_members':
         member_ids = request.POST.getlist('member_ids[]')
         if member_ids:
-            members = Member.objects.filter(id__in=member_ids)
-            count = members.count()
-            for member in members:
-                user = member.user
-                try:
-                    profile = UserProfile.objects.get(user=user)
-                    profile.delete()
-                except UserProfile.DoesNotExist:
-                    pass
-                member.delete()
-                user.delete()
+            try:
+                deleted = delete_members(member_ids, chunk_size=settings.MEMBER_DELETE_CHUNK_SIZE or None)
+            except ValueError:
+                return JsonResponse({'error': 'Invalid member selection.'}, status=400)
+            count = deleted.get(Member._meta.db_table, 0)
             return JsonResponse({
                 'success': True,
-                'message': f'{count} member(s) have been deleted successfully.'
+                'message': f'{count} member(s) have been deleted successfully.',
+                'deleted': deleted,
             })
         return JsonResponse({'error': 'No members selected.'}, status=400)
     
@@ -952,8 +888,8 @@ def admin_member_list(request):
     sort = request.GET.get('sort', 'newest')
     search = request.GET.get('search')
     
-    # Base queryset
-    members = Member.objects.all().select_related('user')
+    # Base queryset - profile and active membership joined in so each page row needs no extra query
+    members = Member.objects.all().select_related('user', 'user__profile').with_current_membership()
     
     # Apply filters
     if status_filter == 'active':
@@ -961,6 +897,11 @@ def admin_member_list(request):
     elif status_filter == 'inactive':
         members = members.filter(is_active=False)
     
+    if membership_filter == 'active':
+        members = members.filter(annotated_membership_id__isnull=False)
+    elif membership_filter == 'none':
+        members = members.filter(annotated_membership_id__isnull=True)
+    
     if join_date_filter == 'today':
         members = members.filter(created_at__date=date.today())
     elif join_date_filter == 'week':
@@ -991,19 +932,31 @@ def admin_member_list(request):
     elif sort == 'name_desc':
         members = members.order_by('-user__first_name', '-user__last_name')
     
-    total_members = members.count()
-    active_members = members.filter(is_active=True).count()
-    inactive_members = total_members - active_members
+    # ===== EXPORT (streams the filtered rows) =====
+    export = export_format(request)
+    if export:
+        return stream_export(members, MEMBER_COLUMNS, 'members', export)
+    
+    # ===== AJAX: KEYSET PAGE =====
+    ordering = MEMBER_KEYSET_ORDERINGS.get(sort, MEMBER_KEYSET_ORDERINGS['newest'])
+    if request.GET.get('action') == 'page':
+        try:
+            payload = page_payload(request, members, ordering, _member_row)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(payload)
     
-    # Get UserProfile data for display
-    member_ids = [m.id for m in members]
-    profiles = UserProfile.objects.filter(user__member__id__in=member_ids).select_related('user')
-    profile_dict = {p.user.id: p for p in profiles}
+    # Header counters come from the estimate/short-lived cache, so paging
+    # deeper never re-counts the table
+    total_members = approximate_count(members)
+    active_members = approximate_count(members.filter(is_active=True))
+    inactive_members = max(total_members - active_members, 0)
     
-    # Pagination
-    paginator = Paginator(members, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination - seeks past the cursor instead of an OFFSET
+    page_obj = request_page(request, members, ordering, per_page=10)
+    
+    # Profiles for the current page only, already joined by select_related
+    profile_dict = {m.user_id: getattr(m.user, 'profile', None) for m in page_obj}
     
     context = {
         'members': page_obj,
@@ -1011,8 +964,8 @@ def admin_member_list(request):
         'total_members': total_members,
         'active_members': active_members,
         'inactive_members': inactive_members,
-        'active_memberships': Membership.objects.filter(status='active').count(),
-        'new_members_this_month': Member.objects.filter(created_at__date__gte=date.today().replace(day=1)).count(),
+        'active_memberships': approximate_count(Membership.objects.filter(status='active')),
+        'new_members_this_month': approximate_count(Member.objects.filter(created_at__date__gte=date.today().replace(day=1))),
         'user': request.user,
         'current_filters': {
             'status': status_filter,
@@ -1049,7 +1002,7 @@ def admin_member_detail(request, member_id):
         
         enrolled_classes = []
         if Class is not None:
-            enrolled_classes = member.enrolled_classes.filter(is_active=True)
+            enrolled_classes = member.enrolled_classes.filter(is_active=True).with_enrollment()
         
         # Get active membership
         active_membership = memberships.filter(status='active').first()
@@ -1084,6 +1037,25 @@ def admin_member_detail(request, member_id):
 # ============================================
 # ADMIN CLASS LIST - ALL CRUD IN ONE PAGE
 # ============================================
+# Week order as annotated by in_week_order(); id keeps the key unique
+CLASS_KEYSET_ORDERING = ['weekday_number', 'time', 'id']
+
+
+def _class_row(class_obj):
+    return {
+        'id': class_obj.id,
+        'name': class_obj.name,
+        'trainer_name': class_obj.trainer.user.get_full_name() if class_obj.trainer else '',
+        'day_of_week': class_obj.day_of_week,
+        'time': class_obj.time.strftime('%H:%M'),
+        'duration': class_obj.duration,
+        'difficulty': class_obj.difficulty,
+        'max_capacity': class_obj.max_capacity,
+        'enrolled_count': class_obj.enrolled_count,
+        'is_active': class_obj.is_active,
+    }
+
+
 def admin_class_list(request):
     """Admin class list view - ALL CRUD operations in ONE page using modals"""
     if not request.session.get('is_admin', False):
@@ -1185,6 +1157,9 @@ def admin_class_list(request):
         class_obj.is_active = request.POST.get('is_active') == 'on'
         class_obj.save()
         
+        # Raised capacity opens spots for waitlisted members
+        promote_waitlist(class_obj.id)
+        
         return JsonResponse({
             'success': True,
             'message': f'Class "{class_obj.name}" has been updated successfully.'
@@ -1296,18 +1271,29 @@ def admin_class_list(request):
         )
     
     # Order by day and time
-    classes = classes.order_by('day_of_week', 'time')
+    classes = classes.in_week_order()
     
-    total_classes = classes.count()
-    active_classes = classes.filter(is_active=True).count()
+    classes = classes.with_enrollment()
     
-    # Calculate total enrolled and avg capacity
-    total_enrolled = 0
-    total_capacity = 0
-    for class_obj in classes:
-        enrolled_count = class_obj.enrolled_members.count()
-        total_enrolled += enrolled_count
-        total_capacity += class_obj.max_capacity
+    # ===== AJAX: KEYSET PAGE =====
+    if request.GET.get('action') == 'page':
+        try:
+            payload = page_payload(request, classes, CLASS_KEYSET_ORDERING, _class_row, per_page=9)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(payload)
+    
+    # Totals, enrollment and capacity in one query
+    totals = classes.aggregate(
+        total_classes=models.Count('id'),
+        active_classes=models.Count('id', filter=models.Q(is_active=True)),
+        total_enrolled=models.Sum('annotated_enrolled_count'),
+        total_capacity=models.Sum('max_capacity'),
+    )
+    total_classes = totals['total_classes']
+    active_classes = totals['active_classes']
+    total_enrolled = totals['total_enrolled'] or 0
+    total_capacity = totals['total_capacity'] or 0
     
     avg_capacity = 0
     if total_capacity > 0:
@@ -1316,10 +1302,8 @@ def admin_class_list(request):
     # Get all trainers for filter dropdown
     trainers = Trainer.objects.filter(is_active=True).select_related('user')
     
-    # Pagination
-    paginator = Paginator(classes, 9)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination - seeks past the cursor instead of an OFFSET
+    page_obj = request_page(request, classes, CLASS_KEYSET_ORDERING, per_page=9)
     
     context = {
         'classes': page_obj,
@@ -1329,7 +1313,7 @@ def admin_class_list(request):
         'avg_capacity': avg_capacity,
         'trainers': trainers,
         'user': request.user,
-        'total_members': Member.objects.count(),
+        'total_members': approximate_count(Member.objects.all()),
         'current_filters': {
             'difficulty': difficulty,
             'trainer': trainer_id,
@@ -1356,13 +1340,13 @@ def admin_class_detail(request, class_id):
         return redirect('admin_class_list')
     
     try:
-        class_obj = Class.objects.get(id=class_id)
+        class_obj = Class.objects.select_related('trainer__user').with_enrollment().get(id=class_id)
         enrolled_members = class_obj.enrolled_members.all().select_related('user')
         
         context = {
             'class': class_obj,
             'enrolled_members': enrolled_members,
-            'total_enrolled': enrolled_members.count(),
+            'total_enrolled': class_obj.enrolled_count,
             'user': request.user,
             'total_members': Member.objects.count(),
             'total_classes': Class.objects.count(),
@@ -1393,9 +1377,196 @@ def admin_trainers_list(request):
     return JsonResponse(trainer_data, safe=False)
 
 
+# ============================================
+# ADMIN CLASS BOOKING REPORT - FOR AJAX
+# ============================================
+def admin_booking_report(request):
+    """Booked vs attended vs no-show per class as JSON"""
+    if not request.session.get('is_admin', False):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    today = date.today()
+    try:
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else today - timedelta(days=30)
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else today
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+    
+    gym_class = None
+    class_id = request.GET.get('class_id')
+    if class_id:
+        try:
+            gym_class = Class.objects.get(id=class_id)
+        except (Class.DoesNotExist, ValueError):
+            return JsonResponse({'error': 'Class not found.'}, status=404)
+    
+    return JsonResponse({
+        'date_from': date_from.isoformat(),
+        'date_to': date_to.isoformat(),
+        'classes': booking_report(date_from, date_to, gym_class=gym_class),
+    })
+
+
+# ============================================
+# ADMIN MEMBERSHIP EXPORT - STREAMED CSV/JSONL
+# ============================================
+def admin_membership_export(request):
+    """Stream memberships filtered by start date, member, status and payment"""
+    if not request.session.get('is_admin', False):
+        messages.error(request, 'Please login as administrator to access this page.')
+        return redirect('login')
+    
+    try:
+        date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else None
+        date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else None
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+    member_search = request.GET.get('member')
+    status = request.GET.get('status')
+    payment_status = request.GET.get('payment_status')
+    
+    memberships = Membership.objects.all()
+    if date_from:
+        memberships = memberships.filter(start_date__gte=date_from)
+    if date_to:
+        memberships = memberships.filter(start_date__lte=date_to)
+    if member_search:
+        memberships = memberships.filter(
+            models.Q(member__user__first_name__icontains=member_search) |
+            models.Q(member__user__last_name__icontains=member_search) |
+            models.Q(member__user__username__icontains=member_search)
+        )
+    if status:
+        memberships = memberships.filter(status=status)
+    if payment_status:
+        memberships = memberships.filter(payment_status=payment_status)
+    
+    memberships = memberships.order_by('-start_date', 'id')
+    return stream_export(memberships, MEMBERSHIP_COLUMNS, 'memberships', export_format(request) or 'csv')
+
+
+# ============================================
+# ADMIN REVENUE REPORT - READS MONTHLY ROLLUPS
+# ============================================
+def _revenue_range(request):
+    """Months to report on from ?date_from/?date_to, the last twelve months by default"""
+    default_from, default_to = revenue.default_range()
+    date_from = date.fromisoformat(request.GET['date_from']) if request.GET.get('date_from') else default_from
+    date_to = date.fromisoformat(request.GET['date_to']) if request.GET.get('date_to') else default_to
+    if date_from > date_to:
+        date_from, date_to = date_to, date_from
+    return date_from, date_to
+
+
+def admin_revenue_report(request):
+    """MRR, collected vs pending per month and plan mix"""
+    if not request.session.get('is_admin', False):
+        messages.error(request, 'Please login as administrator to access this page.')
+        return redirect('login')
+    
+    # ===== AJAX: RECONCILE BANK STATEMENT =====
+    if request.method == 'POST' and request.POST.get('action') == 'reconcile_payments':
+        upload = request.FILES.get('statement_file')
+        if upload is None:
+            return JsonResponse({'error': 'Please choose a bank statement CSV to reconcile.'}, status=400)
+        try:
+            result = reconcile_upload(upload)
+        except ValueError as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse({
+            'success': True,
+            'message': f'{result.matched} payment(s) matched, {len(result.unmatched)} line(s) unmatched.',
+            **result.as_dict(),
+        })
+    
+    try:
+        date_from, date_to = _revenue_range(request)
+    except ValueError:
+        messages.error(request, 'Dates must be in YYYY-MM-DD format.')
+        date_from, date_to = revenue.default_range()
+    
+    summary = revenue.revenue_summary(date_from, date_to)
+    busiest = max(summary['months'], key=lambda row: row['collected'] + row['pending'], default=None)
+    peak = (busiest['collected'] + busiest['pending']) if busiest else 0
+    for row in summary['months']:
+        row['collected_pct'] = round(float(row['collected'] / peak) * 100, 1) if peak else 0
+        row['pending_pct'] = round(float(row['pending'] / peak) * 100, 1) if peak else 0
+    
+    context = {
+        'summary': summary,
+        'months': list(reversed(summary['months'])),
+        'plans': summary['plans'],
+        'user': request.user,
+        'total_members': Member.objects.count(),
+        'current_filters': {
+            'date_from': date_from.isoformat(),
+            'date_to': date_to.isoformat(),
+        }
+    }
+    
+    return render(request, 'core/admin/admin_revenue_report.html', context)
+
+
+def admin_revenue_data(request):
+    """The revenue report as JSON"""
+    if not request.session.get('is_admin', False):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    try:
+        date_from, date_to = _revenue_range(request)
+    except ValueError:
+        return JsonResponse({'error': 'Dates must be in YYYY-MM-DD format.'}, status=400)
+    
+    return JsonResponse(revenue.revenue_summary(date_from, date_to))
+
+# ============================================
+# ADMIN REQUEST STATS - PER-VIEW LATENCY PERCENTILES
+# ============================================
+def admin_request_stats(request):
+    """p50/p95/p99 wall, DB and template time and query counts per view, this process only"""
+    if not (request.session.get('is_admin', False) or request.user.is_staff):
+        return JsonResponse({'error': 'Unauthorized'}, status=403)
+    
+    if request.method == 'POST' and request.POST.get('action') == 'reset':
+        instrumentation.reset()
+        return JsonResponse({'success': True, 'message': 'Request statistics have been reset.'})
+    
+    return JsonResponse(instrumentation.view_stats())
+
+# ============================================
+# PROMETHEUS METRICS
+# ============================================
+def metrics_view(request):
+    """Prometheus text exposition for admins and scrapers sending METRICS_TOKEN, unless METRICS_PUBLIC"""
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    allowed = (
+        getattr(settings, 'METRICS_PUBLIC', False)
+        or request.session.get('is_admin', False)
+        or (token and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'))
+    )
+    if not allowed:
+        return HttpResponse('Unauthorized\n', status=401, content_type='text/plain')
+    return HttpResponse(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 # ============================================
 # ADMIN ATTENDANCE REPORT - ALL CRUD IN ONE PAGE
 # ============================================
+ATTENDANCE_KEYSET_ORDERING = ['-date', '-check_in', 'id']
+
+
+def _attendance_row(attendance):
+    user = attendance.member.user
+    return {
+        'id': attendance.id,
+        'member_id': attendance.member_id,
+        'member_name': user.get_full_name() or user.username,
+        'date': attendance.date.isoformat(),
+        'check_in': attendance.check_in.strftime('%H:%M'),
+        'check_out': attendance.check_out.strftime('%H:%M') if attendance.check_out else '',
+        'notes': attendance.notes or '',
+    }
+
+
 def admin_attendance_report(request):
     """Admin attendance report view - ALL CRUD operations in ONE page using modals"""
     if not request.session.get('is_admin', False):
@@ -1405,13 +1576,13 @@ def admin_attendance_report(request):
     # ===== AJAX: CREATE ATTENDANCE =====
     if request.method == 'POST' and request.POST.get('action') == 'create_attendance':
         member_id = request.POST.get('member')
-        date = request.POST.get('date')
+        attendance_date = request.POST.get('date')
         check_in = request.POST.get('check_in')
         check_out = request.POST.get('check_out', None)
         notes = request.POST.get('notes', '')
         
         # Validation
-        if not member_id or not date or not check_in:
+        if not member_id or not attendance_date or not check_in:
             return JsonResponse({'error': 'Member, date and check-in time are required.'}, status=400)
         
         try:
@@ -1422,7 +1593,7 @@ def admin_attendance_report(request):
         # Check if already checked in
         existing = Attendance.objects.filter(
             member=member,
-            date=date,
+            date=attendance_date,
             check_out__isnull=True
         ).first()
         
@@ -1431,14 +1602,20 @@ def admin_attendance_report(request):
                 'warning': f'{member.user.get_full_name() or member.user.username} is already checked in on this date.'
             }, status=400)
         
-        # Create attendance
-        attendance = Attendance.objects.create(
-            member=member,
-            date=date,
-            check_in=check_in,
-            check_out=check_out if check_out else None,
-            notes=notes
-        )
+        # Create attendance (a concurrent check-in can still take the open slot)
+        try:
+            attendance = Attendance.objects.create(
+                member=member,
+                date=attendance_date,
+                check_in=check_in,
+                check_out=check_out if check_out else None,
+                notes=notes
+            )
+        except IntegrityError:
+            return JsonResponse({
+                'warning': f'{member.user.get_full_name() or member.user.username} already has an attendance record that conflicts with this one.'
+            }, status=400)
+        live.reconcile()
         
         return JsonResponse({
             'success': True,
@@ -1462,7 +1639,13 @@ def admin_attendance_report(request):
         attendance.check_out = check_out if check_out else None
         
         attendance.notes = request.POST.get('notes', attendance.notes)
-        attendance.save()
+        try:
+            attendance.save()
+        except IntegrityError:
+            return JsonResponse({
+                'warning': 'This member already has an open or identical attendance record on that date.'
+            }, status=400)
+        live.reconcile()
         
         return JsonResponse({
             'success': True,
@@ -1476,6 +1659,7 @@ def admin_attendance_report(request):
             attendance = Attendance.objects.get(id=attendance_id)
             member_name = attendance.member.user.get_full_name() or attendance.member.user.username
             attendance.delete()
+            live.reconcile()
             return JsonResponse({
                 'success': True,
                 'message': f'Attendance record for {member_name} has been deleted successfully.'
@@ -1490,6 +1674,7 @@ def admin_attendance_report(request):
             attendances = Attendance.objects.filter(id__in=attendance_ids)
             count = attendances.count()
             attendances.delete()
+            live.reconcile()
             return JsonResponse({
                 'success': True,
                 'message': f'{count} attendance record(s) have been deleted successfully.'
@@ -1500,10 +1685,8 @@ def admin_attendance_report(request):
     if request.method == 'POST' and request.POST.get('action') == 'check_out':
         attendance_id = request.POST.get('attendance_id')
         try:
-            attendance = Attendance.objects.get(id=attendance_id)
-            if not attendance.check_out:
-                attendance.check_out = timezone.now().time()
-                attendance.save()
+            outcome, attendance = checkins.check_out_attendance(attendance_id, timezone.now().time())
+            if outcome == checkins.CHECKED_OUT:
                 return JsonResponse({
                     'success': True,
                     'message': 'Member checked out successfully.',
@@ -1521,25 +1704,17 @@ def admin_attendance_report(request):
         try:
             member = Member.objects.get(id=member_id)
             
-            # Check if already checked in today
-            today = date.today()
-            existing = Attendance.objects.filter(
-                member=member,
-                date=today,
-                check_out__isnull=True
-            ).first()
+            outcome, attendance = checkins.check_in(
+                member,
+                timezone.now().time(),
+                notes='Quick check-in via admin'
+            )
             
-            if existing:
+            if outcome == checkins.ALREADY_CHECKED_IN:
                 return JsonResponse({
                     'warning': f'{member.user.get_full_name() or member.user.username} is already checked in.'
                 }, status=400)
             else:
-                attendance = Attendance.objects.create(
-                    member=member,
-                    date=today,
-                    check_in=timezone.now().time(),
-                    notes='Quick check-in via admin'
-                )
                 return JsonResponse({
                     'success': True,
                     'message': f'{member.user.get_full_name() or member.user.username} has been checked in successfully.',
@@ -1589,24 +1764,42 @@ def admin_attendance_report(request):
             models.Q(member__user__username__icontains=member_search)
         )
     
-    # Order by date and time
-    attendances = attendances.order_by('-date', '-check_in')
+    # Order by date and time (id keeps ties stable for keyset paging)
+    attendances = attendances.order_by(*ATTENDANCE_KEYSET_ORDERING)
     
-    # Statistics
-    today_attendance = Attendance.objects.filter(date=today).count()
+    # ===== EXPORT (streams the filtered rows) =====
+    export = export_format(request)
+    if export:
+        return stream_export(attendances, ATTENDANCE_COLUMNS, 'attendance', export)
     
-    # Week attendance
-    week_start = today - timedelta(days=today.weekday())
-    week_attendance = Attendance.objects.filter(date__gte=week_start).count()
+    # ===== AJAX: KEYSET PAGE =====
+    if request.GET.get('action') == 'page':
+        try:
+            payload = page_payload(request, attendances, ATTENDANCE_KEYSET_ORDERING, _attendance_row, per_page=15)
+        except InvalidCursor as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(payload)
     
-    # Month attendance
+    # Statistics - read from the daily rollups
+    week_start = today - timedelta(days=today.weekday())
     month_start = today.replace(day=1)
-    month_attendance = Attendance.objects.filter(date__gte=month_start).count()
-    
-    # Pagination
-    paginator = Paginator(attendances, 15)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    rollup_stats = AttendanceDailyRollup.objects.filter(
+        date__gte=min(week_start, month_start),
+        date__lte=today,
+    ).aggregate(
+        today=models.Sum('visits', filter=models.Q(date=today)),
+        week=models.Sum('visits', filter=models.Q(date__gte=week_start)),
+        month=models.Sum('visits', filter=models.Q(date__gte=month_start)),
+    )
+    today_attendance = rollup_stats['today'] or 0
+    week_attendance = rollup_stats['week'] or 0
+    month_attendance = rollup_stats['month'] or 0
+    
+    # Busiest hour this month
+    busiest = occupancy.peak_hour(month_start, today)
+    
+    # Pagination - seeks past the cursor instead of an OFFSET
+    page_obj = request_page(request, attendances, ATTENDANCE_KEYSET_ORDERING, per_page=15)
     
     # Calculate average daily attendance for this month
     days_passed = today.day
@@ -1627,13 +1820,13 @@ def admin_attendance_report(request):
         'month_attendance': month_attendance,
         'avg_daily': avg_daily,
         'today_date': today,
-        'total_records': attendances.count(),
+        'total_records': approximate_count(attendances),
         'members': members,
         'classes': classes,
         'user': request.user,
-        'total_members': Member.objects.count(),
-        'peak_hour': '5-7 PM',
-        'peak_count': 0,
+        'total_members': approximate_count(Member.objects.all()),
+        'peak_hour': busiest['label'] if busiest else None,
+        'peak_count': busiest['check_ins'] if busiest else 0,
         'current_filters': {
             'date_from': date_from,
             'date_to': date_to,
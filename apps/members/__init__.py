@@ -1,3 +1 @@
 # Members application for 2moreFitness
-# This file ensures signals are loaded when the app starts
-default_app_config = 'apps.members.apps.MembersConfig'
\ No newline at end of file
@@ -2,7 +2,7 @@
 Admin configuration for members app
 """
 from django.contrib import admin
-from .models import Member, Membership
+from .models import Member, Membership, RevenueMonthlyRollup
 
 
 @admin.register(Member)
@@ -12,6 +12,9 @@ class MemberAdmin(admin.ModelAdmin):
     search_fields = ['user__username', 'user__email', 'user__first_name', 'user__last_name']
     readonly_fields = ['created_at', 'updated_at']
     filter_horizontal = ['enrolled_classes']
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('user').with_current_membership()
 
 
 @admin.register(Membership)
@@ -21,3 +24,11 @@ class MembershipAdmin(admin.ModelAdmin):
     search_fields = ['member__user__username', 'member__user__email', 'plan__name', 'payment_reference']
     readonly_fields = ['created_at', 'updated_at']
     date_hierarchy = 'start_date'
+
+
+@admin.register(RevenueMonthlyRollup)
+class RevenueMonthlyRollupAdmin(admin.ModelAdmin):
+    list_display = ['month', 'plan', 'payment_status', 'memberships', 'amount', 'updated_at']
+    list_filter = ['payment_status', 'plan']
+    readonly_fields = ['month', 'plan', 'payment_status', 'memberships', 'amount', 'updated_at']
+    date_hierarchy = 'month'
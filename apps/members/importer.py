@@ -0,0 +1,349 @@
+"""
+Bulk member importer for 2moreFitness
+Streams a CSV or JSONL file, validates each row, hashes passwords and
+inserts User, UserProfile, Member and Membership rows with bulk_create one
+batch at a time, so memory stays flat however big the file is. Admin uploads
+hash in the request's own process; only the import_members command fans the
+hashing out over a process pool, never a web worker.
+bulk_create sends no post_save signals, so the per-user provisioning and
+cache invalidation receivers never run per row; derived data is refreshed
+once at the end instead
+
+Columns: username, email, password, first_name, last_name, phone, address,
+is_active, plan (id or name), start_date, end_date, status, payment_status,
+payment_amount, payment_reference. Membership columns are optional
+"""
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from apps.core import metrics
+from apps.core.dashboard import invalidate_dashboard_stats
+from apps.core.models import UserProfile, MembershipPlan
+from .models import Member, Membership
+from . import revenue
+
+MAX_REPORTED_ERRORS = 100
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'on', 'active'}
+
+
+class ImportResult:
+    """Counters and the first few row errors of an import run"""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.memberships = 0
+        self.skipped = 0
+        self.errors = []
+        self.elapsed = 0.0
+        self.first_start = None
+        self.last_start = None
+
+    def add_error(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def rows_per_second(self):
+        return round(self.rows / self.elapsed, 1) if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'memberships': self.memberships,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'elapsed': round(self.elapsed, 2),
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+def read_rows(stream, fmt):
+    """Yield (line_number, row_dict) from a text stream"""
+    if fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield line_number, row if isinstance(row, dict) else None
+    else:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson')) else 'csv'
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def _date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        # Well-formed but impossible, e.g. 2026-02-30
+        return None
+
+
+def _flag(row, key, default=True):
+    value = _text(row, key).lower()
+    return default if not value else value in TRUE_VALUES
+
+
+class _RowParser:
+    """Turns raw rows into validated dicts, tracking duplicates within the file"""
+
+    def __init__(self):
+        self.plans = {}
+        for plan in MembershipPlan.objects.all():
+            self.plans[str(plan.id)] = plan
+            self.plans.setdefault(plan.name.lower(), plan)
+        self.usernames = set()
+        self.emails = set()
+
+    def parse(self, row):
+        """Return (parsed, error)"""
+        if row is None:
+            return None, 'Row is not a valid record.'
+
+        username = _text(row, 'username')
+        email = _text(row, 'email')
+        password = _text(row, 'password')
+        if not username or not email or not password:
+            return None, 'Username, email and password are required.'
+        if len(password) < 8:
+            return None, 'Password must be at least 8 characters.'
+        if username in self.usernames:
+            return None, f'Duplicate username {username} in file.'
+        if email in self.emails:
+            return None, f'Duplicate email {email} in file.'
+
+        parsed = {
+            'username': username,
+            'email': email,
+            'password': password,
+            'first_name': _text(row, 'first_name')[:150],
+            'last_name': _text(row, 'last_name')[:150],
+            'phone': _text(row, 'phone')[:15],
+            'address': _text(row, 'address'),
+            'is_active': _flag(row, 'is_active'),
+            'membership': None,
+        }
+
+        plan_key = _text(row, 'plan')
+        if plan_key:
+            membership, error = self._membership(row, plan_key)
+            if error:
+                return None, error
+            parsed['membership'] = membership
+
+        self.usernames.add(username)
+        self.emails.add(email)
+        return parsed, None
+
+    def _membership(self, row, plan_key):
+        plan = self.plans.get(plan_key) or self.plans.get(plan_key.lower())
+        if plan is None:
+            return None, f'Unknown plan {plan_key}.'
+
+        start_date = _date(_text(row, 'start_date')) if _text(row, 'start_date') else date.today()
+        if start_date is None:
+            return None, 'start_date must be YYYY-MM-DD.'
+        if _text(row, 'end_date'):
+            end_date = _date(_text(row, 'end_date'))
+            if end_date is None:
+                return None, 'end_date must be YYYY-MM-DD.'
+        else:
+            end_date = plan.term_end(start_date)
+
+        try:
+            amount = Decimal(_text(row, 'payment_amount')) if _text(row, 'payment_amount') else plan.price
+        except InvalidOperation:
+            return None, 'payment_amount must be a number.'
+        if not amount.is_finite():
+            return None, 'payment_amount must be a number.'
+
+        status = _text(row, 'status') or 'active'
+        payment_status = _text(row, 'payment_status') or 'paid'
+        if status not in dict(Membership.STATUS_CHOICES):
+            return None, f'Unknown membership status {status}.'
+        if payment_status not in dict(Membership.PAYMENT_STATUS_CHOICES):
+            return None, f'Unknown payment status {payment_status}.'
+
+        return {
+            'plan': plan,
+            'start_date': start_date,
+            'end_date': end_date,
+            'status': status,
+            'payment_status': payment_status,
+            'payment_amount': amount,
+            'payment_date': start_date if payment_status == 'paid' else None,
+            'payment_reference': _text(row, 'payment_reference')[:100],
+        }, None
+
+
+def _init_worker():
+    # Spawned (non-forked) workers need the app registry and settings
+    django.setup()
+
+
+def _hasher(pool, workers):
+    """Password hashing function for a batch: inline, or fanned out over the pool"""
+    def hash_all(passwords):
+        if pool is None:
+            return [make_password(password) for password in passwords]
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    return hash_all
+
+
+def _insert_batch(batch, hash_all, result):
+    """Create one batch; rows whose username or email already exist are skipped"""
+    taken_usernames = set(User.objects.filter(
+        username__in=[parsed['username'] for _, parsed in batch]
+    ).values_list('username', flat=True))
+    taken_emails = set(User.objects.filter(
+        email__in=[parsed['email'] for _, parsed in batch]
+    ).values_list('email', flat=True))
+
+    fresh = []
+    for line, parsed in batch:
+        if parsed['username'] in taken_usernames:
+            result.add_error(line, f"Username {parsed['username']} already exists.")
+        elif parsed['email'] in taken_emails:
+            result.add_error(line, f"Email {parsed['email']} already registered.")
+        else:
+            fresh.append(parsed)
+    if not fresh:
+        return
+
+    hashes = hash_all([parsed['password'] for parsed in fresh])
+    users = [
+        User(
+            username=parsed['username'],
+            email=parsed['email'],
+            password=password_hash,
+            first_name=parsed['first_name'],
+            last_name=parsed['last_name'],
+        )
+        for parsed, password_hash in zip(fresh, hashes)
+    ]
+
+    with transaction.atomic():
+        User.objects.bulk_create(users)
+        if any(user.pk is None for user in users):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(User.objects.filter(
+                username__in=[user.username for user in users]
+            ).values_list('username', 'id'))
+            for user in users:
+                user.pk = ids[user.username]
+
+        UserProfile.objects.bulk_create([
+            UserProfile(user=user, role='member', phone=parsed['phone'], address=parsed['address'])
+            for user, parsed in zip(users, fresh)
+        ])
+        members = Member.objects.bulk_create([
+            Member(user=user, is_active=parsed['is_active'])
+            for user, parsed in zip(users, fresh)
+        ])
+        if any(member.pk is None for member in members):
+            ids = dict(Member.objects.filter(
+                user_id__in=[user.pk for user in users]
+            ).values_list('user_id', 'id'))
+            for member in members:
+                member.pk = ids[member.user_id]
+
+        memberships = Membership.objects.bulk_create([
+            Membership(member=member, **parsed['membership'])
+            for member, parsed in zip(members, fresh)
+            if parsed['membership']
+        ])
+
+    result.created += len(users)
+    result.memberships += len(memberships)
+    for membership in memberships:
+        if result.first_start is None or membership.start_date < result.first_start:
+            result.first_start = membership.start_date
+        if result.last_start is None or membership.start_date > result.last_start:
+            result.last_start = membership.start_date
+
+
+def command_workers(workers=None):
+    """Hashing processes for the import_members command (0 or None = settings, then one per CPU)"""
+    return workers or getattr(settings, 'MEMBER_IMPORT_WORKERS', 0) or os.cpu_count() or 1
+
+
+def import_members(stream, fmt='csv', batch_size=None, workers=1):
+    """
+    Import members from a text stream; each batch is its own transaction so
+    a re-run after a failure skips the rows that already made it in.
+    workers > 1 hashes passwords in a process pool (management command only)
+    """
+    batch_size = batch_size or getattr(settings, 'MEMBER_IMPORT_BATCH_SIZE', 1000)
+
+    result = ImportResult()
+    parser = _RowParser()
+    started = time.perf_counter()
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) if workers > 1 else None
+    hash_all = _hasher(pool, workers)
+    try:
+        batch = []
+        for line, row in read_rows(stream, fmt):
+            result.rows += 1
+            parsed, error = parser.parse(row)
+            if error:
+                result.add_error(line, error)
+                continue
+            batch.append((line, parsed))
+            if len(batch) >= batch_size:
+                _insert_batch(batch, hash_all, result)
+                batch = []
+        if batch:
+            _insert_batch(batch, hash_all, result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if result.memberships:
+        revenue.refresh_months(result.first_start, result.last_start)
+    if result.created:
+        metrics.inc('gym_registrations_total', result.created, source='import')
+        invalidate_dashboard_stats()
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def import_upload(upload, batch_size=None):
+    """
+    Import an uploaded file (Django UploadedFile) without reading it into
+    memory, in-process: a web worker never forks a hashing pool
+    """
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        return import_members(stream, detect_format(upload.name), batch_size=batch_size, workers=1)
+    finally:
+        stream.detach()
@@ -0,0 +1,61 @@
+"""
+Membership status transitions for 2moreFitness
+Keeps Membership.status true to the calendar so readers can filter on
+status alone (backed by the (status, end_date) index):
+  pending + paid, start_date reached  -> active
+  active, end_date passed             -> expired
+Each transition is a set-based UPDATE per batch of ids; the WHERE clause
+only matches rows that still need the change, so runs are idempotent and a
+killed run simply resumes from whatever is left
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.dashboard import invalidate_dashboard_stats
+from .models import Membership
+
+
+def starting(today):
+    """Paid memberships whose term has begun but are still pending"""
+    return Membership.objects.filter(
+        status='pending',
+        payment_status='paid',
+        start_date__lte=today,
+        end_date__gte=today,
+    )
+
+
+def ending(today):
+    """Active memberships whose end date has passed"""
+    return Membership.objects.filter(status='active', end_date__lt=today)
+
+
+def _transition(queryset, status, batch_size):
+    moved = 0
+    while True:
+        ids = list(queryset.order_by('id').values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        with transaction.atomic():
+            # Re-apply the filter so a row changed by someone else is left alone
+            moved += queryset.filter(id__in=ids).update(status=status, updated_at=timezone.now())
+
+
+def run_transitions(today=None, batch_size=None, dry_run=False):
+    """Apply all due status changes, returns {'activated': n, 'expired': n}"""
+    today = today or date.today()
+    batch_size = batch_size or getattr(settings, 'MEMBERSHIP_STATUS_BATCH_SIZE', 5000)
+
+    if dry_run:
+        return {'activated': starting(today).count(), 'expired': ending(today).count()}
+
+    result = {
+        'activated': _transition(starting(today), 'active', batch_size),
+        'expired': _transition(ending(today), 'expired', batch_size),
+    }
+    if any(result.values()):
+        invalidate_dashboard_stats()
+    return result
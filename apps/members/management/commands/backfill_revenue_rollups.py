@@ -0,0 +1,38 @@
+"""
+Rebuild RevenueMonthlyRollup rows from the memberships table
+Usage: python manage.py backfill_revenue_rollups [--start YYYY-MM-DD] [--end YYYY-MM-DD]
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.members import revenue
+
+
+class Command(BaseCommand):
+    help = 'Backfill monthly revenue rollups per plan and payment status'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First month to rebuild (any date in it, YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last month to rebuild (any date in it, YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start_date = self._parse(options['start'], '--start')
+        end_date = self._parse(options['end'], '--end')
+        if start_date and end_date and start_date > end_date:
+            raise CommandError('--start must not be after --end.')
+
+        written = revenue.backfill(start_date, end_date, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {written} monthly revenue rollup(s).'))
+
+    def _parse(self, value, flag):
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            # Well-formed but impossible, e.g. 2026-02-30
+            parsed = None
+        if parsed is None:
+            raise CommandError(f'{flag} must be a date in YYYY-MM-DD format.')
+        return parsed
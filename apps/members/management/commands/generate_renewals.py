@@ -0,0 +1,41 @@
+"""
+Create pending renewal memberships for active memberships ending soon
+Usage: python manage.py generate_renewals [--days 7] [--date YYYY-MM-DD] [--batch-size 1000] [--dry-run]
+Schedule daily (e.g. cron at 00:10, after update_membership_statuses); safe to re-run
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.members.renewals import generate_renewals
+
+
+class Command(BaseCommand):
+    help = 'Generate pending renewals for memberships ending within the renewal window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, help='Renew memberships ending within this many days')
+        parser.add_argument('--date', help='Treat this date as today (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, help='Renewals per INSERT batch')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be renewed')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                # Well-formed but impossible, e.g. 2026-02-30
+                today = None
+            if today is None:
+                raise CommandError('--date must be a date in YYYY-MM-DD format.')
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must not be negative.')
+
+        count = generate_renewals(
+            today,
+            days=options['days'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        prefix = 'Would create' if options['dry_run'] else 'Created'
+        self.stdout.write(self.style.SUCCESS(f'{prefix} {count} renewal(s).'))
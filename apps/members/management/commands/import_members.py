@@ -0,0 +1,52 @@
+"""
+Bulk import members (and optionally memberships) from a CSV or JSONL file
+Usage: python manage.py import_members members.csv [--format csv|jsonl] [--batch-size 1000] [--workers 4]
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.members.importer import import_members, detect_format, command_workers
+
+
+class Command(BaseCommand):
+    help = 'Stream members from a CSV/JSONL file into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSONL file ("-" for stdin)')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, help='Rows per insert batch')
+        parser.add_argument('--workers', type=int, help='Password hashing processes (1 = no pool, default MEMBER_IMPORT_WORKERS or one per CPU)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        if path == '-':
+            result = self._run(sys.stdin, fmt, options)
+        else:
+            try:
+                stream = open(path, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot open {path}: {e}')
+            with stream:
+                result = self._run(stream, fmt, options)
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        if result.skipped > len(result.errors):
+            self.stderr.write(f'... and {result.skipped - len(result.errors)} more skipped row(s).')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {result.created} member(s) and {result.memberships} membership(s) '
+            f'from {result.rows} row(s), skipped {result.skipped}, '
+            f'in {result.elapsed:.1f}s ({result.rows_per_second} rows/s).'
+        ))
+
+    def _run(self, stream, fmt, options):
+        return import_members(
+            stream,
+            fmt,
+            batch_size=options['batch_size'],
+            workers=command_workers(options['workers']),
+        )
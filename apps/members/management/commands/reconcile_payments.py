@@ -0,0 +1,73 @@
+"""
+Match a bank statement CSV against pending membership payments
+Usage: python manage.py reconcile_payments statement.csv [--report unmatched.csv] [--batch-size 5000] [--date YYYY-MM-DD] [--dry-run]
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.members.reconciliation import reconcile_statement
+
+
+class Command(BaseCommand):
+    help = 'Mark pending memberships paid from a bank statement, report lines that match nothing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Statement CSV ("-" for stdin)')
+        parser.add_argument('--report', help='Write every unmatched line to this CSV ("-" for stdout)')
+        parser.add_argument('--batch-size', type=int, help='Statement lines per lookup and UPDATE')
+        parser.add_argument('--date', help='Treat this date as today (YYYY-MM-DD)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would match')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                # Well-formed but impossible, e.g. 2026-02-30
+                today = None
+            if today is None:
+                raise CommandError('--date must be a date in YYYY-MM-DD format.')
+
+        path = options['path']
+        if path == '-':
+            result = self._run(sys.stdin, today, options)
+        else:
+            try:
+                stream = open(path, encoding='utf-8-sig', newline='')
+            except OSError as e:
+                raise CommandError(f'Cannot open {path}: {e}')
+            with stream:
+                result = self._run(stream, today, options)
+
+        report = options['report']
+        if report == '-':
+            result.write_unmatched(self.stdout)
+        elif report:
+            with open(report, 'w', encoding='utf-8', newline='') as stream:
+                result.write_unmatched(stream)
+        else:
+            for row in result.unmatched[:20]:
+                self.stderr.write(f"Line {row['line']}: {row['reason']}")
+            if len(result.unmatched) > 20:
+                self.stderr.write(f'... and {len(result.unmatched) - 20} more unmatched line(s), use --report.')
+
+        prefix = 'Would match' if options['dry_run'] else 'Matched'
+        self.stdout.write(self.style.SUCCESS(
+            f'{prefix} {result.matched} payment(s) totalling {result.amount} '
+            f'({result.activated} membership(s) activated), {len(result.unmatched)} unmatched, '
+            f'{result.lines} line(s) in {result.elapsed:.1f}s ({result.lines_per_second} lines/s).'
+        ))
+
+    def _run(self, stream, today, options):
+        try:
+            return reconcile_statement(
+                stream,
+                batch_size=options['batch_size'],
+                today=today,
+                dry_run=options['dry_run'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
@@ -0,0 +1,36 @@
+"""
+Move memberships between pending, active and expired as their dates pass
+Usage: python manage.py update_membership_statuses [--date YYYY-MM-DD] [--batch-size 5000] [--dry-run]
+Schedule daily (e.g. cron at 00:05); safe to re-run or resume after an interruption
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from apps.members.lifecycle import run_transitions
+
+
+class Command(BaseCommand):
+    help = 'Activate started and expire ended memberships with set-based updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Treat this date as today (YYYY-MM-DD)')
+        parser.add_argument('--batch-size', type=int, help='Rows per UPDATE')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would change')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            try:
+                today = parse_date(options['date'])
+            except ValueError:
+                # Well-formed but impossible, e.g. 2026-02-30
+                today = None
+            if today is None:
+                raise CommandError('--date must be a date in YYYY-MM-DD format.')
+
+        result = run_transitions(today, batch_size=options['batch_size'], dry_run=options['dry_run'])
+        prefix = 'Would move' if options['dry_run'] else 'Moved'
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {result['activated']} membership(s) to active "
+            f"and {result['expired']} to expired."
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_auto_20260208_1316'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['-created_at', 'id'], name='member_created_keyset_idx'),
+        ),
+    ]
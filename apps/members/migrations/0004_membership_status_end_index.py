@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_member_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['status', 'end_date'], name='membership_status_end_idx'),
+        ),
+    ]
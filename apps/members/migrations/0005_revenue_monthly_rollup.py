@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_auto_20260208_1316'),
+        ('members', '0004_membership_status_end_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RevenueMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month the membership starts in')),
+                ('payment_status', models.CharField(choices=[('paid', 'Paid'), ('pending', 'Pending'), ('failed', 'Failed')], max_length=10)),
+                ('memberships', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'revenue_monthly_rollups',
+                'ordering': ['-month', 'plan'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['start_date'], name='membership_start_idx'),
+        ),
+        migrations.AddField(
+            model_name='revenuemonthlyrollup',
+            name='plan',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='core.membershipplan'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='revenuemonthlyrollup',
+            unique_together={('month', 'plan', 'payment_status')},
+        ),
+    ]
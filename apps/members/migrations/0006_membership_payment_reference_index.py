@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_revenue_monthly_rollup'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='membership',
+            index=models.Index(fields=['payment_reference', 'payment_status'], name='membership_payment_ref_idx'),
+        ),
+    ]
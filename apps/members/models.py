@@ -6,6 +6,33 @@ from django.contrib.auth.models import User
 from apps.core.models import MembershipPlan
 
 
+class MemberQuerySet(models.QuerySet):
+    """Query helpers for members"""
+    
+    def with_current_membership(self):
+        """
+        Annotate the active membership's id, plan name and end date with
+        correlated subqueries, and prefetch the active membership itself,
+        so has_active_membership/current_membership cost no query per row
+        """
+        active = Membership.objects.filter(
+            member=models.OuterRef('pk'),
+            status='active',
+        ).order_by('-start_date', '-id')
+        return self.annotate(
+            annotated_membership_id=models.Subquery(active.values('id')[:1]),
+            annotated_membership_plan=models.Subquery(active.values('plan__name')[:1]),
+            annotated_membership_end=models.Subquery(active.values('end_date')[:1]),
+        ).prefetch_related(
+            models.Prefetch(
+                'memberships',
+                queryset=Membership.objects.filter(status='active')
+                .select_related('plan').order_by('-start_date', '-id'),
+                to_attr='prefetched_active_memberships',
+            )
+        )
+
+
 class Member(models.Model):
     """Member profile with gym-specific information"""
     GENDER_CHOICES = [
@@ -25,30 +52,45 @@ class Member(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MemberQuerySet.as_manager()
+    
     class Meta:
         db_table = 'members'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='member_created_keyset_idx'),
+        ]
     
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.user.username})"
     
     @property
     def has_active_membership(self):
-        """Check if member has an active membership"""
-        from datetime import datetime
-        return self.memberships.filter(
-            status='active',
-            end_date__gte=datetime.now()
-        ).exists()
+        """Check if member has an active membership (status is kept current by update_membership_statuses)"""
+        if hasattr(self, 'annotated_membership_id'):
+            return self.annotated_membership_id is not None
+        return self.memberships.filter(status='active').exists()
     
     @property
     def current_membership(self):
         """Get the current active membership"""
-        from datetime import datetime
-        return self.memberships.filter(
-            status='active',
-            end_date__gte=datetime.now()
-        ).first()
+        if hasattr(self, 'prefetched_active_memberships'):
+            return self.prefetched_active_memberships[0] if self.prefetched_active_memberships else None
+        return self.memberships.filter(status='active').order_by('-start_date', '-id').first()
+    
+    @property
+    def current_plan_name(self):
+        if hasattr(self, 'annotated_membership_plan'):
+            return self.annotated_membership_plan
+        membership = self.current_membership
+        return membership.plan.name if membership else None
+    
+    @property
+    def current_membership_end(self):
+        if hasattr(self, 'annotated_membership_end'):
+            return self.annotated_membership_end
+        membership = self.current_membership
+        return membership.end_date if membership else None
 
 
 class Membership(models.Model):
@@ -82,6 +124,11 @@ class Membership(models.Model):
     class Meta:
         db_table = 'memberships'
         ordering = ['-start_date']
+        indexes = [
+            models.Index(fields=['status', 'end_date'], name='membership_status_end_idx'),
+            models.Index(fields=['start_date'], name='membership_start_idx'),
+            models.Index(fields=['payment_reference', 'payment_status'], name='membership_payment_ref_idx'),
+        ]
     
     def __str__(self):
         return f"{self.member} - {self.plan.name} ({self.status})"
@@ -102,4 +149,21 @@ class Membership(models.Model):
         if self.is_active:
             delta = self.end_date - datetime.now().date()
             return delta.days
-        return 0
\ No newline at end of file
+        return 0
+
+class RevenueMonthlyRollup(models.Model):
+    """Membership count and amount for one billing month, plan and payment status"""
+    month = models.DateField(help_text="First day of the month the membership starts in")
+    plan = models.ForeignKey(MembershipPlan, on_delete=models.CASCADE, related_name='revenue_rollups')
+    payment_status = models.CharField(max_length=10, choices=Membership.PAYMENT_STATUS_CHOICES)
+    memberships = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'revenue_monthly_rollups'
+        ordering = ['-month', 'plan']
+        unique_together = ['month', 'plan', 'payment_status']
+    
+    def __str__(self):
+        return f"{self.month:%Y-%m} {self.plan.name} ({self.payment_status}): {self.amount}"
@@ -0,0 +1,258 @@
+"""
+Bank statement reconciliation for 2moreFitness
+Reads a bank statement CSV in batches, matches each credit to a pending
+Membership by payment_reference and amount through a dict built with one
+query per batch, and marks every match paid (and active once its term has
+started) with a single UPDATE per batch. Lines that match nothing end up in
+the unmatched report with the reason
+
+Columns: reference, amount and optionally date (YYYY-MM-DD, defaults to the
+day of the run). Common bank header names such as "Ref", "Credit" or
+"Value Date" are accepted too
+"""
+import csv
+import io
+import time
+from collections import defaultdict, deque
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.core.dashboard import invalidate_dashboard_stats
+from .models import Membership
+from . import revenue
+
+MAX_REPORTED_UNMATCHED = 100
+CENTS = Decimal('0.01')
+
+HEADER_ALIASES = {
+    'reference': ('reference', 'payment_reference', 'ref', 'reference_no', 'reference_number', 'transaction_reference'),
+    'amount': ('amount', 'credit', 'credit_amount', 'payment_amount'),
+    'date': ('date', 'value_date', 'posting_date', 'transaction_date', 'payment_date'),
+}
+
+UNMATCHED_COLUMNS = ['line', 'reference', 'amount', 'date', 'reason']
+
+
+class ReconciliationResult:
+    """Counters and unmatched lines of a reconciliation run"""
+
+    def __init__(self):
+        self.lines = 0
+        self.matched = 0
+        self.activated = 0
+        self.amount = Decimal('0.00')
+        self.unmatched = []
+        self.elapsed = 0.0
+        self.first_start = None
+        self.last_start = None
+
+    def add_unmatched(self, line, reference, amount, paid_on, reason):
+        self.unmatched.append({
+            'line': line,
+            'reference': reference,
+            'amount': amount,
+            'date': paid_on,
+            'reason': reason,
+        })
+
+    @property
+    def lines_per_second(self):
+        return round(self.lines / self.elapsed, 1) if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            'lines': self.lines,
+            'matched': self.matched,
+            'activated': self.activated,
+            'amount': self.amount,
+            'unmatched_count': len(self.unmatched),
+            'unmatched': self.unmatched[:MAX_REPORTED_UNMATCHED],
+            'elapsed': round(self.elapsed, 2),
+            'lines_per_second': self.lines_per_second,
+        }
+
+    def write_unmatched(self, stream):
+        """Write the full unmatched report as CSV"""
+        writer = csv.DictWriter(stream, fieldnames=UNMATCHED_COLUMNS)
+        writer.writeheader()
+        writer.writerows(self.unmatched)
+
+
+def _columns(fieldnames):
+    """Map reference/amount/date to the statement's own header names"""
+    normalized = {
+        name.strip().lower().replace(' ', '_').replace('-', '_'): name
+        for name in fieldnames or [] if name
+    }
+    columns = {}
+    for key, aliases in HEADER_ALIASES.items():
+        columns[key] = next((normalized[alias] for alias in aliases if alias in normalized), None)
+    if not columns['reference'] or not columns['amount']:
+        raise ValueError('Statement needs a reference and an amount column.')
+    return columns
+
+
+def _amount(value):
+    cleaned = (value or '').strip().replace(',', '').lstrip('₱$').strip()
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        return None
+    # NaN and Infinity parse but cannot be compared or matched
+    return amount.quantize(CENTS) if amount.is_finite() else None
+
+
+def _date(value):
+    try:
+        return parse_date(value)
+    except ValueError:
+        # Well-formed but impossible, e.g. 2026-02-30
+        return None
+
+
+def read_statement(stream, today=None):
+    """Yield (line, reference, amount, paid_on, error) for every statement line"""
+    today = today or date.today()
+    reader = csv.DictReader(stream)
+    columns = _columns(reader.fieldnames)
+    for row in reader:
+        reference = (row.get(columns['reference']) or '').strip()
+        raw_amount = (row.get(columns['amount']) or '').strip()
+        raw_date = (row.get(columns['date']) or '').strip() if columns['date'] else ''
+        amount = _amount(raw_amount)
+        paid_on = _date(raw_date) if raw_date else today
+
+        error = None
+        if not reference:
+            error = 'Missing reference.'
+        elif amount is None:
+            error = 'Amount is not a number.'
+        elif amount <= 0:
+            error = 'Not a credit.'
+        elif paid_on is None:
+            error = 'Date must be YYYY-MM-DD.'
+        yield reader.line_num, reference, amount if amount is not None else raw_amount, paid_on or raw_date, error
+
+
+def _pending_index(references):
+    """
+    {reference: {amount: deque([(id, start_date), ...] oldest first)}} for pending
+    memberships carrying one of the references, built with a single query
+    """
+    index = defaultdict(lambda: defaultdict(deque))
+    rows = (
+        Membership.objects.filter(payment_reference__in=references, payment_status='pending')
+        .order_by('start_date', 'id')
+        .values_list('id', 'payment_reference', 'payment_amount', 'start_date')
+    )
+    for membership_id, reference, amount, start_date in rows:
+        index[reference][amount.quantize(CENTS)].append((membership_id, start_date))
+    return index
+
+
+def _apply(matches, today):
+    """Mark matched memberships paid with one UPDATE, return how many became active"""
+    by_date = defaultdict(list)
+    for membership_id, paid_on in matches:
+        by_date[paid_on].append(membership_id)
+    ids = [membership_id for membership_id, _ in matches]
+
+    with transaction.atomic():
+        memberships = Membership.objects.filter(id__in=ids, payment_status='pending')
+        activating = memberships.filter(status='pending', start_date__lte=today, end_date__gte=today).count()
+        updated = memberships.update(
+            payment_status='paid',
+            payment_date=Case(
+                *[When(id__in=day_ids, then=Value(paid_on)) for paid_on, day_ids in by_date.items()],
+                default=F('payment_date'),
+            ),
+            # Same rule as lifecycle.starting(): paid and within its term
+            status=Case(
+                When(status='pending', start_date__lte=today, end_date__gte=today, then=Value('active')),
+                default=F('status'),
+            ),
+            updated_at=timezone.now(),
+        )
+    return updated, activating
+
+
+def _reconcile_batch(batch, result, today, dry_run):
+    index = _pending_index({reference for _, reference, _, _ in batch})
+    matches = []
+    for line, reference, amount, paid_on in batch:
+        amounts = index.get(reference)
+        if not amounts:
+            result.add_unmatched(line, reference, amount, paid_on, 'No pending membership with this reference.')
+            continue
+        candidates = amounts.get(amount)
+        if not candidates:
+            expected = ', '.join(str(value) for value, ids in amounts.items() if ids)
+            reason = f'Amount does not match (expected {expected}).' if expected else 'Already matched by an earlier line.'
+            result.add_unmatched(line, reference, amount, paid_on, reason)
+            continue
+        membership_id, start_date = candidates.popleft()
+        matches.append((membership_id, paid_on))
+        result.amount += amount
+        if result.first_start is None or start_date < result.first_start:
+            result.first_start = start_date
+        if result.last_start is None or start_date > result.last_start:
+            result.last_start = start_date
+
+    if not matches:
+        return
+    if dry_run:
+        result.matched += len(matches)
+        return
+    updated, activated = _apply(matches, today)
+    result.matched += updated
+    result.activated += activated
+
+
+def reconcile_statement(stream, batch_size=None, today=None, dry_run=False):
+    """
+    Reconcile a bank statement CSV from a text stream. Each batch is its own
+    transaction and only pending memberships match, so re-running a statement
+    after a failure picks up where it stopped
+    """
+    batch_size = batch_size or getattr(settings, 'PAYMENT_RECONCILE_BATCH_SIZE', 5000)
+    today = today or date.today()
+    result = ReconciliationResult()
+    started = time.perf_counter()
+
+    try:
+        batch = []
+        for line, reference, amount, paid_on, error in read_statement(stream, today):
+            result.lines += 1
+            if error:
+                result.add_unmatched(line, reference, amount, paid_on, error)
+                continue
+            batch.append((line, reference, amount, paid_on))
+            if len(batch) >= batch_size:
+                _reconcile_batch(batch, result, today, dry_run)
+                batch = []
+        if batch:
+            _reconcile_batch(batch, result, today, dry_run)
+    finally:
+        if result.matched and not dry_run:
+            # Committed batches stay committed even if a later one fails, and
+            # the bulk UPDATE sends no signals: refresh the revenue months they touched
+            revenue.refresh_months(result.first_start, result.last_start)
+            invalidate_dashboard_stats()
+    result.unmatched.sort(key=lambda row: row['line'])
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def reconcile_upload(upload, **kwargs):
+    """Reconcile an uploaded statement (Django UploadedFile) without reading it into memory"""
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+    try:
+        return reconcile_statement(stream, **kwargs)
+    finally:
+        stream.detach()
@@ -0,0 +1,99 @@
+"""
+Bulk member removal for 2moreFitness
+Deletes members with one DELETE per table instead of loading every row
+into Django's deletion collector and firing per-row signals. The derived
+data those signals would have maintained (attendance rollups, occupancy,
+live counter, revenue rollups, dashboard cache, class waitlists) is refreshed
+at the end, for the days and months the removed members actually touched
+"""
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+
+from apps.attendance import live, occupancy, rollups
+from apps.attendance.models import Attendance
+from apps.classes.enrollment import promote_waitlist
+from apps.classes.models import ClassBooking, ClassWaitlist
+from apps.core.dashboard import invalidate_dashboard_stats
+from apps.core.models import UserProfile
+from apps.trainers.models import Trainer
+from .models import Member, Membership
+from . import revenue
+
+Enrollment = Member.enrolled_classes.through
+
+
+def _delete_where(model, field, values):
+    """Single DELETE statement: no collector, no cascades, no signals"""
+    values = list(values)
+    if not values:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    column = connection.ops.quote_name(model._meta.get_field(field).column)
+    placeholders = ', '.join(['%s'] * len(values))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', values)
+        return cursor.rowcount
+
+
+def _delete_chunk(member_ids, counts):
+    users = list(Member.objects.filter(id__in=member_ids).values_list('user_id', flat=True))
+    # Accounts that are also trainers keep their login and profile
+    user_ids = set(users) - set(Trainer.objects.filter(user_id__in=users).values_list('user_id', flat=True))
+
+    # Children first so no foreign key is ever left dangling
+    steps = [
+        (Attendance, 'member', member_ids),
+        (Membership, 'member', member_ids),
+        (ClassWaitlist, 'member', member_ids),
+        (ClassBooking, 'member', member_ids),
+        (Enrollment, 'member', member_ids),
+        (Member, 'id', member_ids),
+        (UserProfile, 'user', user_ids),
+        (User.groups.through, 'user', user_ids),
+        (User.user_permissions.through, 'user', user_ids),
+        (LogEntry, 'user', user_ids),
+        (User, 'id', user_ids),
+    ]
+    for model, field, values in steps:
+        table = model._meta.db_table
+        counts[table] = counts.get(table, 0) + _delete_where(model, field, values)
+
+
+def delete_members(member_ids, chunk_size=None):
+    """
+    Remove members together with their user accounts, profiles, memberships,
+    attendance, bookings, waitlist entries and class enrollments.
+    Runs in one transaction, or one transaction per chunk_size members for
+    very large selections. Returns {table_name: rows_deleted}
+    """
+    member_ids = sorted({int(member_id) for member_id in member_ids})
+    counts = {}
+    if not member_ids:
+        return counts
+
+    # Only these days and months lose rows, so only they are refreshed afterwards
+    days = list(Attendance.objects.filter(member_id__in=member_ids).dates('date', 'day'))
+    months = list(Membership.objects.filter(member_id__in=member_ids).dates('start_date', 'month'))
+    class_ids = list(
+        Enrollment.objects.filter(member_id__in=member_ids)
+        .values_list('gymclass_id', flat=True).distinct()
+    )
+
+    chunk_size = chunk_size or len(member_ids)
+    for start in range(0, len(member_ids), chunk_size):
+        with transaction.atomic():
+            _delete_chunk(member_ids[start:start + chunk_size], counts)
+
+    # Derived data the skipped signals would have kept up to date
+    for day in days:
+        rollups.refresh_day(day)
+        occupancy.refresh_day(day)
+    if days:
+        live.reconcile()
+    for month in months:
+        revenue.refresh_month(month)
+    for class_id in class_ids:
+        promote_waitlist(class_id)
+    invalidate_dashboard_stats()
+    return counts
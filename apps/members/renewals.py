@@ -0,0 +1,90 @@
+"""
+Membership renewals for 2moreFitness
+Finds active memberships ending within the renewal window (read through the
+(status, end_date) index) and creates the next term as a pending Membership
+at the plan's current price, one bulk_create per batch. A membership counts
+as renewed once its member has any non-cancelled membership starting after
+it ends, so runs are idempotent and a killed run simply resumes
+"""
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from apps.core.dashboard import invalidate_dashboard_stats
+from .models import Membership
+from . import revenue
+
+
+def renewal_reference(membership_id):
+    """Payment reference of the renewal of a membership, for bank reconciliation"""
+    return f'RENEW-{membership_id}'
+
+
+def due(today, days):
+    """Active memberships ending within `days` that have no follow-up term yet"""
+    follow_up = Membership.objects.filter(
+        member=OuterRef('member'),
+        start_date__gt=OuterRef('end_date'),
+    ).exclude(status='cancelled')
+    return Membership.objects.filter(
+        status='active',
+        end_date__gte=today,
+        end_date__lte=today + timedelta(days=days),
+        member__is_active=True,
+        plan__is_active=True,
+    ).exclude(Exists(follow_up))
+
+
+def _renew_batch(memberships):
+    renewals = []
+    for membership in memberships:
+        start_date = membership.end_date + timedelta(days=1)
+        renewals.append(Membership(
+            member_id=membership.member_id,
+            plan=membership.plan,
+            start_date=start_date,
+            end_date=membership.plan.term_end(start_date),
+            status='pending',
+            payment_status='pending',
+            payment_amount=membership.plan.price,
+            payment_reference=renewal_reference(membership.id),
+            notes=f'Renewal of membership #{membership.id}',
+        ))
+    Membership.objects.bulk_create(renewals)
+    return renewals
+
+
+def generate_renewals(today=None, days=None, batch_size=None, dry_run=False):
+    """Create pending renewals for memberships ending soon, returns how many"""
+    today = today or date.today()
+    days = getattr(settings, 'MEMBERSHIP_RENEWAL_DAYS', 7) if days is None else days
+    batch_size = batch_size or getattr(settings, 'MEMBERSHIP_RENEWAL_BATCH_SIZE', 1000)
+
+    if dry_run:
+        return due(today, days).count()
+
+    created = 0
+    first_start = last_start = None
+    while True:
+        with transaction.atomic():
+            # Lock the batch so two concurrent runs cannot renew the same membership
+            ids = list(
+                due(today, days).select_for_update(skip_locked=True, of=('self',))
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            memberships = Membership.objects.filter(id__in=ids).select_related('plan').order_by('id')
+            renewals = _renew_batch(memberships)
+        created += len(renewals)
+        starts = sorted(renewal.start_date for renewal in renewals)
+        first_start = min(first_start or starts[0], starts[0])
+        last_start = max(last_start or starts[-1], starts[-1])
+
+    if created:
+        # bulk_create sends no signals: refresh the revenue months it touched
+        revenue.refresh_months(first_start, last_start)
+        invalidate_dashboard_stats()
+    return created
@@ -0,0 +1,239 @@
+"""
+Revenue analytics for 2moreFitness
+Keeps one RevenueMonthlyRollup row per (month, plan, payment status) so the
+revenue report reads O(months x plans) rows instead of summing every
+membership ever sold. A membership is booked in the month its term starts.
+Membership saves and deletes adjust their rollup rows by signed deltas under
+those rows' locks, so concurrent purchases queue on the row instead of
+overwriting each other's recount. Bulk writes that skip the signals refresh
+the months they touched under the same locks; backfill rebuilds a whole range
+with one grouped Sum/TruncMonth query for repairs and deploys
+"""
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from apps.core.models import MembershipPlan
+from .models import Membership, RevenueMonthlyRollup
+
+ZERO = Decimal('0.00')
+
+
+def month_start(day):
+    if isinstance(day, str):
+        day = parse_date(day)
+    return day.replace(day=1)
+
+
+def next_month(month):
+    return month.replace(year=month.year + 1, month=1) if month.month == 12 else month.replace(month=month.month + 1)
+
+
+def months_between(start, end):
+    """First day of every month from start's month to end's month, inclusive"""
+    month, last = month_start(start), month_start(end)
+    months = []
+    while month <= last:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+def _grouped(memberships):
+    """(month, plan_id, payment_status) -> count and amount, summed by the database"""
+    return (
+        memberships.order_by()
+        .annotate(month=TruncMonth('start_date'))
+        .values('month', 'plan_id', 'payment_status')
+        .annotate(memberships=Count('id'), amount=Sum('payment_amount'))
+    )
+
+
+def _rows(grouped):
+    return [
+        RevenueMonthlyRollup(
+            month=month_start(row['month']),
+            plan_id=row['plan_id'],
+            payment_status=row['payment_status'],
+            memberships=row['memberships'],
+            amount=row['amount'] or ZERO,
+        )
+        for row in grouped
+    ]
+
+
+def _lock_rollup(month, plan_id, payment_status):
+    """One rollup row, created if missing and locked until the transaction ends"""
+    key = {'month': month, 'plan_id': plan_id, 'payment_status': payment_status}
+    RevenueMonthlyRollup.objects.bulk_create([RevenueMonthlyRollup(**key)], ignore_conflicts=True)
+    return RevenueMonthlyRollup.objects.select_for_update().get(**key)
+
+
+def record_change(previous, current):
+    """
+    Move one membership's contribution from `previous` to `current`, each a
+    (start_date, plan_id, payment_status, payment_amount) tuple or None
+    (created / deleted). Call inside a transaction: the rows stay locked
+    until it commits
+    """
+    deltas = {}
+    for sign, values in ((-1, previous), (1, current)):
+        if values:
+            start_date, plan_id, payment_status, amount = values
+            key = (month_start(start_date), plan_id, payment_status)
+            count, total = deltas.get(key, (0, ZERO))
+            deltas[key] = (count + sign, total + sign * Decimal(amount or 0))
+
+    # Lock in key order so two transactions touching the same rows cannot deadlock
+    for key in sorted(k for k, (count, total) in deltas.items() if count or total):
+        count, total = deltas[key]
+        rollup = _lock_rollup(*key)
+        rollup.memberships += count
+        rollup.amount += total
+        if rollup.memberships <= 0:
+            rollup.delete()
+        else:
+            rollup.save(update_fields=['memberships', 'amount', 'updated_at'])
+
+
+def refresh_month(day):
+    """Recompute the rollup rows of the month containing `day` (repairs drift; signals use record_change)"""
+    month = month_start(day)
+    with transaction.atomic():
+        # Counting after the month's rows are locked sees every change committed before it
+        existing = list(RevenueMonthlyRollup.objects.select_for_update().filter(month=month).order_by('id'))
+        memberships = Membership.objects.filter(start_date__gte=month, start_date__lt=next_month(month))
+        rows = _rows(_grouped(memberships))
+        keys = {(row.plan_id, row.payment_status) for row in rows}
+        stale = [rollup.id for rollup in existing if (rollup.plan_id, rollup.payment_status) not in keys]
+        RevenueMonthlyRollup.objects.filter(id__in=stale).delete()
+        RevenueMonthlyRollup.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['month', 'plan', 'payment_status'],
+            update_fields=['memberships', 'amount', 'updated_at'],
+        )
+    return len(rows)
+
+
+def refresh_months(start_date, end_date):
+    """refresh_month for every month from start_date's to end_date's, return rows written"""
+    return sum(refresh_month(month) for month in months_between(start_date, end_date))
+
+
+def backfill(start_date=None, end_date=None, batch_size=1000):
+    """Rebuild rollups for the months touching a date range, return rows written"""
+    memberships = Membership.objects.all()
+    stale = RevenueMonthlyRollup.objects.all()
+    if start_date:
+        memberships = memberships.filter(start_date__gte=month_start(start_date))
+        stale = stale.filter(month__gte=month_start(start_date))
+    if end_date:
+        memberships = memberships.filter(start_date__lt=next_month(month_start(end_date)))
+        stale = stale.filter(month__lte=month_start(end_date))
+    rows = _rows(_grouped(memberships))
+
+    with transaction.atomic():
+        # Groups that no longer have memberships lose their rollup row
+        stale.delete()
+        RevenueMonthlyRollup.objects.bulk_create(rows, batch_size=batch_size)
+    return len(rows)
+
+
+def monthly_series(start, end):
+    """Collected, pending and failed amounts per month, zero-filled"""
+    totals = {
+        row['month']: row for row in
+        RevenueMonthlyRollup.objects.filter(month__gte=month_start(start), month__lte=month_start(end))
+        .order_by().values('month')
+        .annotate(
+            memberships=Sum('memberships'),
+            collected=Sum('amount', filter=Q(payment_status='paid')),
+            pending=Sum('amount', filter=Q(payment_status='pending')),
+            failed=Sum('amount', filter=Q(payment_status='failed')),
+        )
+    }
+    series = []
+    for month in months_between(start, end):
+        row = totals.get(month, {})
+        series.append({
+            'month': month,
+            'memberships': row.get('memberships') or 0,
+            'collected': row.get('collected') or ZERO,
+            'pending': row.get('pending') or ZERO,
+            'failed': row.get('failed') or ZERO,
+        })
+    return series
+
+
+def plan_mix(start, end):
+    """Memberships sold and amount collected per plan, biggest earner first"""
+    rows = (
+        RevenueMonthlyRollup.objects.filter(month__gte=month_start(start), month__lte=month_start(end))
+        .order_by().values('plan_id', 'plan__name')
+        .annotate(
+            memberships=Sum('memberships'),
+            collected=Sum('amount', filter=Q(payment_status='paid')),
+            pending=Sum('amount', filter=Q(payment_status='pending')),
+        )
+    )
+    mix = [
+        {
+            'plan_id': row['plan_id'],
+            'plan': row['plan__name'],
+            'memberships': row['memberships'] or 0,
+            'collected': row['collected'] or ZERO,
+            'pending': row['pending'] or ZERO,
+        }
+        for row in rows
+    ]
+    collected = sum((row['collected'] for row in mix), ZERO)
+    for row in mix:
+        row['share'] = round(float(row['collected'] / collected) * 100, 1) if collected else 0.0
+    mix.sort(key=lambda row: row['collected'], reverse=True)
+    return mix
+
+
+def monthly_recurring_revenue():
+    """
+    Paid active memberships spread over their term, summed per plan duration.
+    Reads status='active' rows through the (status, end_date) index
+    """
+    rows = (
+        Membership.objects.filter(status='active', payment_status='paid')
+        .order_by().values('plan__duration')
+        .annotate(amount=Sum('payment_amount'), memberships=Count('id'))
+    )
+    mrr = ZERO
+    subscribers = 0
+    for row in rows:
+        mrr += (row['amount'] or ZERO) / MembershipPlan.DURATION_MONTHS.get(row['plan__duration'], 12)
+        subscribers += row['memberships']
+    return {'mrr': mrr.quantize(Decimal('0.01')), 'subscribers': subscribers}
+
+
+def revenue_summary(start, end):
+    """Everything the revenue report shows for the months from start to end"""
+    series = monthly_series(start, end)
+    return {
+        'date_from': month_start(start),
+        'date_to': month_start(end),
+        'recurring': monthly_recurring_revenue(),
+        'collected': sum((row['collected'] for row in series), ZERO),
+        'pending': sum((row['pending'] for row in series), ZERO),
+        'failed': sum((row['failed'] for row in series), ZERO),
+        'months': series,
+        'plans': plan_mix(start, end),
+    }
+
+
+def default_range(today=None):
+    """The last twelve months, including the current one"""
+    today = today or date.today()
+    end = month_start(today)
+    start = end.replace(year=end.year - 1)
+    return next_month(start), end
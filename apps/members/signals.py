@@ -1,26 +1,42 @@
 """
 Signals for members app
 """
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.contrib.auth.models import User
-from apps.core.models import UserProfile
-from .models import Member
-
-
-@receiver(post_save, sender=User)
-def create_user_profiles(sender, instance, created, **kwargs):
-    """Create UserProfile and Member when User is created"""
-    if created:
-        try:
-            # Create UserProfile if it doesn't exist
-            profile, profile_created = UserProfile.objects.get_or_create(
-                user=instance,
-                defaults={'role': 'member'}
-            )
-            
-            # Create Member if it doesn't exist
-            Member.objects.get_or_create(user=instance)
-            
-        except Exception as e:
-            print(f"Error creating profiles: {e}")
\ No newline at end of file
+from .models import Membership
+from . import revenue
+
+REVENUE_FIELDS = ('start_date', 'plan_id', 'payment_status', 'payment_amount')
+
+
+def _booking(instance):
+    return tuple(getattr(instance, field) for field in REVENUE_FIELDS)
+
+
+@receiver(pre_save, sender=Membership)
+def remember_membership_booking(sender, instance, **kwargs):
+    """Remember the stored booking so the rollup can move its contribution"""
+    instance._previous_booking = None
+    if instance.pk:
+        instance._previous_booking = (
+            Membership.objects.filter(pk=instance.pk)
+            .values_list(*REVENUE_FIELDS)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Membership)
+def update_revenue_on_save(sender, instance, raw=False, **kwargs):
+    """Keep the monthly revenue rollup in step with saved memberships"""
+    if raw:
+        return
+    with transaction.atomic():
+        revenue.record_change(getattr(instance, '_previous_booking', None), _booking(instance))
+
+
+@receiver(post_delete, sender=Membership)
+def update_revenue_on_delete(sender, instance, **kwargs):
+    """Keep the monthly revenue rollup in step with deleted memberships"""
+    with transaction.atomic():
+        revenue.record_change(_booking(instance), None)
@@ -0,0 +1,405 @@
+"""
+Tests for the members app
+"""
+import io
+import threading
+from datetime import date, time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from apps.attendance.models import Attendance, AttendanceDailyRollup, AttendanceHourlyOccupancy
+from apps.core.models import MembershipPlan
+from .importer import import_upload
+from .models import Member, Membership, RevenueMonthlyRollup
+from .removal import delete_members
+from . import lifecycle, reconciliation, renewals, revenue, views
+
+
+class SessionBookingDateTests(TestCase):
+    """Booking and cancelling reject impossible dates instead of raising"""
+
+    def setUp(self):
+        user = User.objects.create_user('booker')
+        Member.objects.get_or_create(user=user)
+        self.client.force_login(user)
+
+    def assert_rejected(self, url_name):
+        response = self.client.post(reverse(url_name, args=[1]), {'date': '2026-02-30'})
+        self.assertRedirects(response, reverse('member_classes'), fetch_redirect_response=False)
+        self.assertEqual(
+            [str(m) for m in get_messages(response.wsgi_request)],
+            ['Please choose a session date.'],
+        )
+
+    def test_book_impossible_date(self):
+        self.assert_rejected('book_class_session')
+
+    def test_cancel_impossible_date(self):
+        self.assert_rejected('cancel_class_booking')
+
+
+class CurrentMembershipQueryTests(TestCase):
+    """with_current_membership reads every member's status in a fixed number of queries"""
+
+    def setUp(self):
+        self.plans = [
+            MembershipPlan.objects.create(
+                name=name, description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+            )
+            for name in ('Monthly', 'Premium')
+        ]
+
+    def add_members(self, count):
+        start = Member.objects.count()
+        for n in range(start, start + count):
+            member, _ = Member.objects.get_or_create(user=User.objects.create_user(f'member{n}'))
+            if n % 3 == 0:
+                continue
+            # An old expired term, then the current one on a plan that varies per member
+            for status, start_date, end_date, plan in (
+                ('expired', date(2026, 1, 1), date(2026, 1, 31), self.plans[0]),
+                ('active', date(2026, 7, 1), date(2026, 7, 31), self.plans[n % 2]),
+            ):
+                Membership.objects.create(
+                    member=member, plan=plan, status=status, payment_status='paid',
+                    start_date=start_date, end_date=end_date, payment_amount=plan.price,
+                )
+
+    def read_rows(self):
+        # The queryset itself plus the active-membership prefetch
+        with self.assertNumQueries(2):
+            return [
+                (m.id, m.has_active_membership, m.current_membership and m.current_membership.plan.name,
+                 m.current_plan_name, m.current_membership_end)
+                for m in Member.objects.with_current_membership().order_by('id')
+            ]
+
+    def expected_rows(self):
+        rows = []
+        for m in Member.objects.order_by('id'):
+            current = m.current_membership
+            rows.append((
+                m.id, m.has_active_membership, current and current.plan.name,
+                current and current.plan.name, current and current.end_date,
+            ))
+        return rows
+
+    def test_same_queries_for_3_and_30_members(self):
+        self.add_members(3)
+        self.assertEqual(self.read_rows(), self.expected_rows())
+
+        self.add_members(27)
+        rows = self.read_rows()
+        self.assertEqual(len(rows), 30)
+        self.assertEqual(rows, self.expected_rows())
+        self.assertEqual(sum(1 for row in rows if row[1]), 20)
+
+
+class MemberRemovalTests(TestCase):
+    """Deleting members refreshes exactly the rollups their rows fed"""
+
+    def setUp(self):
+        self.plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        self.leaving = self.make_member('leaving')
+        self.staying = self.make_member('staying')
+
+    def make_member(self, username):
+        member, _ = Member.objects.get_or_create(user=User.objects.create_user(username))
+        Membership.objects.create(
+            member=member, plan=self.plan, status='active', payment_status='paid',
+            start_date=date(2026, 3, 5), end_date=date(2026, 4, 4), payment_amount=self.plan.price,
+        )
+        return member
+
+    def test_delete_members_refreshes_affected_days_and_months(self):
+        shared, alone = date(2026, 3, 10), date(2026, 3, 11)
+        for member, day in [(self.leaving, shared), (self.staying, shared), (self.leaving, alone)]:
+            Attendance.objects.create(member=member, date=day, check_in=time(7, 0), check_out=time(8, 0))
+
+        counts = delete_members([self.leaving.id])
+
+        self.assertEqual(counts['attendance'], 2)
+        self.assertFalse(User.objects.filter(username='leaving').exists())
+        self.assertEqual(AttendanceDailyRollup.objects.get(date=shared).visits, 1)
+        self.assertFalse(AttendanceDailyRollup.objects.filter(date=alone).exists())
+        self.assertFalse(AttendanceHourlyOccupancy.objects.filter(date=alone).exists())
+        rollup = RevenueMonthlyRollup.objects.get(month=date(2026, 3, 1))
+        self.assertEqual((rollup.memberships, rollup.amount), (1, self.plan.price))
+
+
+class ImportUploadTests(TestCase):
+    """Admin uploads import in the web process, without a hashing pool"""
+
+    def test_upload_imports_without_process_pool(self):
+        upload = SimpleUploadedFile('members.csv', (
+            b'username,email,password\n'
+            b'ana,ana@example.com,secret-pass-1\n'
+            b'ben,ben@example.com,short\n'
+        ))
+        with mock.patch('apps.members.importer.ProcessPoolExecutor') as pool:
+            result = import_upload(upload)
+
+        pool.assert_not_called()
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertTrue(User.objects.get(username='ana').check_password('secret-pass-1'))
+        self.assertTrue(Member.objects.filter(user__username='ana').exists())
+
+    def test_impossible_dates_skip_the_row(self):
+        MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        upload = SimpleUploadedFile('members.csv', (
+            b'username,email,password,plan,start_date,end_date,payment_amount\n'
+            b'cara,cara@example.com,secret-pass-1,Monthly,2026-02-30,,\n'
+            b'dan,dan@example.com,secret-pass-2,Monthly,2026-02-01,2026-02-30,\n'
+            b'eve,eve@example.com,secret-pass-3,Monthly,2026-02-01,,NaN\n'
+            b'fay,fay@example.com,secret-pass-4,Monthly,2026-02-01,,\n'
+        ))
+        result = import_upload(upload)
+
+        self.assertEqual((result.created, result.memberships, result.skipped), (1, 1, 3))
+        self.assertEqual(result.errors, [
+            {'line': 2, 'error': 'start_date must be YYYY-MM-DD.'},
+            {'line': 3, 'error': 'end_date must be YYYY-MM-DD.'},
+            {'line': 4, 'error': 'payment_amount must be a number.'},
+        ])
+        self.assertTrue(Membership.objects.filter(member__user__username='fay').exists())
+
+
+class RevenueRollupTests(TestCase):
+    """Signal deltas keep the monthly rollup equal to a full recount"""
+
+    def setUp(self):
+        self.plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        self.member, _ = Member.objects.get_or_create(user=User.objects.create_user('payer'))
+
+    def snapshot(self):
+        return sorted(RevenueMonthlyRollup.objects.values_list('month', 'plan_id', 'payment_status', 'memberships', 'amount'))
+
+    def assert_matches_recount(self, *months):
+        incremental = self.snapshot()
+        for month in months:
+            revenue.refresh_month(month)
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_deltas_match_recount(self):
+        march, april = date(2026, 3, 1), date(2026, 4, 1)
+        memberships = [
+            Membership.objects.create(
+                member=self.member, plan=self.plan, start_date=date(2026, 3, day), end_date=date(2026, 4, day),
+                payment_status='pending', payment_amount=self.plan.price,
+            )
+            for day in (3, 9, 20)
+        ]
+        self.assert_matches_recount(march)
+
+        memberships[0].payment_status = 'paid'
+        memberships[0].save()
+        memberships[1].start_date = date(2026, 4, 2)
+        memberships[1].payment_amount = Decimal('500.00')
+        memberships[1].save()
+        self.assert_matches_recount(march, april)
+        self.assertEqual(
+            self.snapshot(),
+            [
+                (march, self.plan.id, 'paid', 1, Decimal('999.00')),
+                (march, self.plan.id, 'pending', 1, Decimal('999.00')),
+                (april, self.plan.id, 'pending', 1, Decimal('500.00')),
+            ],
+        )
+
+        for membership in memberships:
+            membership.delete()
+        self.assertEqual(self.snapshot(), [])
+
+
+class ConcurrentPurchaseTests(TransactionTestCase):
+    """Purchases landing in the same month at once must all be counted"""
+
+    def test_concurrent_purchases_all_counted(self):
+        plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        workers = 8
+        members = [
+            Member.objects.get_or_create(user=User.objects.create_user(f'buyer{n}'))[0]
+            for n in range(workers)
+        ]
+        barrier = threading.Barrier(workers)
+        errors = []
+
+        def buy(member):
+            try:
+                barrier.wait()
+                views._create_membership(
+                    member=member, plan=plan, start_date=date(2026, 5, 1), end_date=date(2026, 5, 31),
+                    payment_status='paid', payment_amount=plan.price,
+                )
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=buy, args=(member,)) for member in members]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        rollup = RevenueMonthlyRollup.objects.get(month=date(2026, 5, 1), plan=plan, payment_status='paid')
+        self.assertEqual((rollup.memberships, rollup.amount), (workers, plan.price * workers))
+
+
+class StatementParsingTests(SimpleTestCase):
+    """Bank statement headers, amounts and dates"""
+
+    def test_columns_accept_bank_aliases(self):
+        self.assertEqual(
+            reconciliation._columns(['Ref', 'Credit Amount', 'Value Date']),
+            {'reference': 'Ref', 'amount': 'Credit Amount', 'date': 'Value Date'},
+        )
+        self.assertEqual(reconciliation._columns(['reference', 'amount'])['date'], None)
+        with self.assertRaises(ValueError):
+            reconciliation._columns(['reference', 'date'])
+
+    def test_amount_strips_currency_and_separators(self):
+        self.assertEqual(reconciliation._amount('₱1,299.5'), Decimal('1299.50'))
+        self.assertEqual(reconciliation._amount(' $999 '), Decimal('999.00'))
+        self.assertIsNone(reconciliation._amount('n/a'))
+        self.assertIsNone(reconciliation._amount('NaN'))
+        self.assertIsNone(reconciliation._amount('-Infinity'))
+        self.assertIsNone(reconciliation._amount(''))
+
+    def test_impossible_date_is_unmatched_not_raised(self):
+        stream = io.StringIO('reference,amount,date\nREF-1,999,2026-02-30\nREF-2,999,2026-02-28\nREF-3,NaN,2026-02-28\n')
+        lines = list(reconciliation.read_statement(stream))
+        self.assertEqual(lines[0][4], 'Date must be YYYY-MM-DD.')
+        self.assertEqual(lines[1][3:], (date(2026, 2, 28), None))
+        self.assertEqual(lines[2][4], 'Amount is not a number.')
+
+
+class ReconcileStatementTests(TestCase):
+    """Batches committed before a failure still reach the revenue rollup"""
+
+    def test_revenue_refreshed_when_a_later_batch_fails(self):
+        plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        member, _ = Member.objects.get_or_create(user=User.objects.create_user('statement'))
+        for reference in ('REF-1', 'REF-2'):
+            Membership.objects.create(
+                member=member, plan=plan, start_date=date(2026, 6, 1), end_date=date(2026, 6, 30),
+                payment_status='pending', payment_amount=plan.price, payment_reference=reference,
+            )
+        stream = io.StringIO('reference,amount\nREF-1,999\nREF-2,999\n')
+        apply = reconciliation._apply
+        calls = []
+
+        def apply_once(matches, today):
+            calls.append(matches)
+            if len(calls) > 1:
+                raise RuntimeError('connection dropped')
+            return apply(matches, today)
+
+        with mock.patch.object(reconciliation, '_apply', apply_once):
+            with self.assertRaises(RuntimeError):
+                reconciliation.reconcile_statement(stream, batch_size=1)
+
+        paid = RevenueMonthlyRollup.objects.get(month=date(2026, 6, 1), payment_status='paid')
+        pending = RevenueMonthlyRollup.objects.get(month=date(2026, 6, 1), payment_status='pending')
+        self.assertEqual((paid.memberships, pending.memberships), (1, 1))
+
+
+class RenewalTests(TestCase):
+    """Renewals are created once per ending membership and reach the revenue rollup"""
+
+    def test_second_run_renews_nothing(self):
+        today = date(2026, 7, 28)
+        plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        member, _ = Member.objects.get_or_create(user=User.objects.create_user('renewer'))
+        ending = Membership.objects.create(
+            member=member, plan=plan, start_date=date(2026, 7, 1), end_date=date(2026, 7, 31),
+            status='active', payment_status='paid', payment_amount=plan.price,
+        )
+
+        self.assertEqual(renewals.generate_renewals(today=today, days=7), 1)
+        self.assertEqual(renewals.generate_renewals(today=today, days=7), 0)
+
+        renewal = Membership.objects.get(payment_reference=renewals.renewal_reference(ending.id))
+        self.assertEqual((renewal.start_date, renewal.status), (date(2026, 8, 1), 'pending'))
+        rollup = RevenueMonthlyRollup.objects.get(month=date(2026, 8, 1), payment_status='pending')
+        self.assertEqual((rollup.memberships, rollup.amount), (1, plan.price))
+
+
+class LifecycleTransitionTests(TestCase):
+    """A second status run over the same day changes nothing"""
+
+    def test_second_run_is_a_no_op(self):
+        today = date(2026, 7, 15)
+        plan = MembershipPlan.objects.create(
+            name='Monthly', description='', duration='monthly', price=Decimal('999.00'), features='Gym',
+        )
+        member, _ = Member.objects.get_or_create(user=User.objects.create_user('cycler'))
+        terms = {
+            'starting': ('pending', 'paid', date(2026, 7, 15), date(2026, 8, 14)),
+            'unpaid': ('pending', 'pending', date(2026, 7, 1), date(2026, 7, 31)),
+            'ended': ('active', 'paid', date(2026, 6, 1), date(2026, 7, 14)),
+            'ending_today': ('active', 'paid', date(2026, 6, 16), date(2026, 7, 15)),
+            'future': ('pending', 'paid', date(2026, 8, 1), date(2026, 8, 31)),
+        }
+        ids = {}
+        for name, (status, payment_status, start, end) in terms.items():
+            ids[name] = Membership.objects.create(
+                member=member, plan=plan, status=status, payment_status=payment_status,
+                start_date=start, end_date=end, payment_amount=plan.price,
+            ).id
+
+        # A batch of one walks the rows the way a resumed run would
+        self.assertEqual(lifecycle.run_transitions(today=today, batch_size=1), {'activated': 1, 'expired': 1})
+        after_first = {m.id: (m.status, m.updated_at) for m in Membership.objects.all()}
+        statuses = {name: after_first[pk][0] for name, pk in ids.items()}
+        self.assertEqual(statuses, {
+            'starting': 'active', 'unpaid': 'pending', 'ended': 'expired',
+            'ending_today': 'active', 'future': 'pending',
+        })
+
+        # Only the two id lookups run; nothing is left to UPDATE
+        with self.assertNumQueries(2):
+            self.assertEqual(lifecycle.run_transitions(today=today, batch_size=1), {'activated': 0, 'expired': 0})
+        self.assertEqual({m.id: (m.status, m.updated_at) for m in Membership.objects.all()}, after_first)
+
+
+class CommandDateOptionTests(TestCase):
+    """Impossible dates on the command line are a CommandError, not a traceback"""
+
+    def assert_rejected(self, *args, message):
+        with self.assertRaisesMessage(CommandError, message):
+            call_command(*args)
+
+    def test_update_membership_statuses(self):
+        self.assert_rejected('update_membership_statuses', '--date', '2026-02-30', message='--date must be a date in YYYY-MM-DD format.')
+
+    def test_backfill_revenue_rollups(self):
+        self.assert_rejected('backfill_revenue_rollups', '--start', '2026-02-30', message='--start must be a date in YYYY-MM-DD format.')
+        self.assert_rejected('backfill_revenue_rollups', '--end', '2026-13-01', message='--end must be a date in YYYY-MM-DD format.')
+
+    def test_reconcile_payments(self):
+        self.assert_rejected('reconcile_payments', '-', '--date', '2026-02-30', message='--date must be a date in YYYY-MM-DD format.')
+
+    def test_generate_renewals(self):
+        self.assert_rejected('generate_renewals', '--date', '2026-02-30', message='--date must be a date in YYYY-MM-DD format.')
@@ -13,4 +13,6 @@ urlpatterns = [
     path('purchase-membership/<int:plan_id>/', views.purchase_membership, name='purchase_membership'),
     path('enroll-class/<int:class_id>/', views.enroll_class, name='enroll_class'),
     path('unenroll-class/<int:class_id>/', views.unenroll_class, name='unenroll_class'),
+    path('book-class/<int:class_id>/', views.book_class_session, name='book_class_session'),
+    path('cancel-booking/<int:class_id>/', views.cancel_class_booking, name='cancel_class_booking'),
 ]
\ No newline at end of file
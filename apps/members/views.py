@@ -6,9 +6,11 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth.models import User
+from django.db import transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
 
+from apps.core.locking import retry_when_locked
 # Import from core models
 from apps.core.models import UserProfile, MembershipPlan, ContactMessage
 # Import from members models
@@ -105,6 +107,13 @@ def update_profile(request):
     return redirect('member_profile')
 
 
+@retry_when_locked
+def _create_membership(**fields):
+    """Membership and its revenue rollup delta in one transaction"""
+    with transaction.atomic():
+        return Membership.objects.create(**fields)
+
+
 @login_required
 def purchase_membership(request, plan_id):
     """Purchase a membership plan"""
@@ -115,17 +124,10 @@ def purchase_membership(request, plan_id):
         if request.method == 'POST':
             # Calculate end date based on duration
             start_date = timezone.now().date()
-            if plan.duration == 'monthly':
-                end_date = start_date + timedelta(days=30)
-            elif plan.duration == 'quarterly':
-                end_date = start_date + timedelta(days=90)
-            elif plan.duration == 'semi_annual':
-                end_date = start_date + timedelta(days=180)
-            else:  # annual
-                end_date = start_date + timedelta(days=365)
+            end_date = plan.term_end(start_date)
             
             # Create membership
-            membership = Membership.objects.create(
+            membership = _create_membership(
                 member=member,
                 plan=plan,
                 start_date=start_date,
@@ -157,19 +159,25 @@ def purchase_membership(request, plan_id):
 
 @login_required
 def enroll_class(request, class_id):
-    """Enroll in a gym class"""
-    from apps.classes.models import GymClass  # Pwede rin Class or Classes - check mo actual name
+    """Enroll in a gym class (waitlisted when the class is full)"""
+    from apps.classes.models import GymClass
+    from apps.classes import enrollment
     
     try:
         member = Member.objects.get(user=request.user)
-        gym_class = GymClass.objects.get(id=class_id, is_active=True)
+        outcome, gym_class = enrollment.enroll(member, class_id)
         
-        # Check if already enrolled
-        if member.enrolled_classes.filter(id=class_id).exists():
+        if outcome == enrollment.ENROLLED:
+            messages.success(request, f'Successfully enrolled in {gym_class.name}!')
+        elif outcome == enrollment.ALREADY_ENROLLED:
             messages.info(request, 'You are already enrolled in this class.')
+        elif outcome == enrollment.WAITLISTED:
+            position = enrollment.waitlist_position(member, gym_class)
+            messages.info(request, f'{gym_class.name} is full. You are #{position} on the waitlist.')
+        elif outcome == enrollment.ALREADY_WAITLISTED:
+            messages.info(request, 'You are already on the waitlist for this class.')
         else:
-            member.enrolled_classes.add(gym_class)
-            messages.success(request, f'Successfully enrolled in {gym_class.name}!')
+            messages.error(request, f'{gym_class.name} is full.')
         
         return redirect('member_classes')
         
@@ -183,16 +191,18 @@ def enroll_class(request, class_id):
 
 @login_required
 def unenroll_class(request, class_id):
-    """Unenroll from a gym class"""
-    from apps.classes.models import GymClass  # Pwede rin Class or Classes - check mo actual name
+    """Unenroll from a gym class (or leave its waitlist)"""
+    from apps.classes.models import GymClass
+    from apps.classes import enrollment
     
     try:
         member = Member.objects.get(user=request.user)
-        gym_class = GymClass.objects.get(id=class_id)
+        outcome, gym_class, promoted = enrollment.unenroll(member, class_id)
         
-        if member.enrolled_classes.filter(id=class_id).exists():
-            member.enrolled_classes.remove(gym_class)
+        if outcome == enrollment.UNENROLLED:
             messages.success(request, f'Unenrolled from {gym_class.name}.')
+        elif outcome == enrollment.LEFT_WAITLIST:
+            messages.success(request, f'Removed from the {gym_class.name} waitlist.')
         else:
             messages.info(request, 'You are not enrolled in this class.')
         
@@ -203,4 +213,85 @@ def unenroll_class(request, class_id):
         return redirect('index')
     except GymClass.DoesNotExist:
         messages.error(request, 'Class not found.')
-        return redirect('member_classes')
\ No newline at end of file
+        return redirect('member_classes')
+
+
+def _session_date(request):
+    """The posted session date, None when missing or not a real date"""
+    from django.utils.dateparse import parse_date
+    
+    try:
+        return parse_date(request.POST.get('date', ''))
+    except ValueError:
+        # Well-formed but impossible, e.g. 2026-02-30
+        return None
+
+
+@login_required
+def book_class_session(request, class_id):
+    """Book a spot in one dated session of a class"""
+    from apps.classes.models import GymClass
+    from apps.classes import enrollment
+    
+    if request.method != 'POST':
+        return redirect('member_classes')
+    
+    session_date = _session_date(request)
+    if session_date is None:
+        messages.error(request, 'Please choose a session date.')
+        return redirect('member_classes')
+    
+    try:
+        member = Member.objects.get(user=request.user)
+        outcome, gym_class, booking = enrollment.book_session(member, class_id, session_date)
+        
+        if outcome == enrollment.BOOKED:
+            messages.success(request, f'Booked {gym_class.name} on {session_date:%b %d}.')
+        elif outcome == enrollment.ALREADY_BOOKED:
+            messages.info(request, 'You already have a spot in this session.')
+        elif outcome == enrollment.SESSION_FULL:
+            messages.error(request, f'{gym_class.name} on {session_date:%b %d} is full.')
+        else:
+            messages.error(request, f'{gym_class.name} does not run on {session_date:%b %d}.')
+        
+        return redirect('member_classes')
+        
+    except Member.DoesNotExist:
+        messages.error(request, 'Member profile not found.')
+        return redirect('index')
+    except GymClass.DoesNotExist:
+        messages.error(request, 'Class not found.')
+        return redirect('class_list')
+
+
+@login_required
+def cancel_class_booking(request, class_id):
+    """Cancel a booked session of a class"""
+    from apps.classes.models import GymClass
+    from apps.classes import enrollment
+    
+    if request.method != 'POST':
+        return redirect('member_classes')
+    
+    session_date = _session_date(request)
+    if session_date is None:
+        messages.error(request, 'Please choose a session date.')
+        return redirect('member_classes')
+    
+    try:
+        member = Member.objects.get(user=request.user)
+        outcome, gym_class = enrollment.cancel_session(member, class_id, session_date)
+        
+        if outcome == enrollment.CANCELLED:
+            messages.success(request, f'Cancelled your {gym_class.name} booking on {session_date:%b %d}.')
+        else:
+            messages.info(request, 'You have no booking for that session.')
+        
+        return redirect('member_classes')
+        
+    except Member.DoesNotExist:
+        messages.error(request, 'Member profile not found.')
+        return redirect('index')
+    except GymClass.DoesNotExist:
+        messages.error(request, 'Class not found.')
+        return redirect('member_classes')
@@ -18,7 +18,7 @@ def trainer_list(request):
 def trainer_detail(request, trainer_id):
     """View trainer details (public)"""
     trainer = get_object_or_404(Trainer, id=trainer_id, is_active=True)
-    classes = GymClass.objects.filter(trainer=trainer, is_active=True)
+    classes = GymClass.objects.filter(trainer=trainer, is_active=True).with_enrollment()
     context = {
         'trainer': trainer,
         'classes': classes,
@@ -70,7 +70,7 @@ def trainer_classes(request):
     """View classes taught by trainer"""
     try:
         trainer = Trainer.objects.get(user=request.user)
-        classes = GymClass.objects.filter(trainer=trainer)
+        classes = GymClass.objects.filter(trainer=trainer).with_enrollment()
         context = {
             'trainer': trainer,
             'classes': classes,
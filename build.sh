@@ -12,4 +12,19 @@ python manage.py collectstatic --no-input
 # Run database migrations
 python manage.py migrate --no-input
 
+# Rebuild precomputed attendance rollups
+python manage.py backfill_attendance_rollups
+
+# Rebuild precomputed revenue rollups
+python manage.py backfill_revenue_rollups
+
+# Materialize upcoming class occurrences
+python manage.py generate_class_occurrences
+
+# Catch membership statuses up with the calendar
+python manage.py update_membership_statuses
+
+# Queue renewals for memberships about to end
+python manage.py generate_renewals
+
 echo "Build completed successfully!"
@@ -35,7 +35,9 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Add WhiteNoise
+    'apps.core.instrumentation.RequestInstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'apps.core.sessions.SessionRefreshMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -47,7 +49,8 @@ ROOT_URLCONF = 'gym_project.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also reports render time to the request instrumentation
+        'BACKEND': 'apps.core.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -74,13 +77,84 @@ if config('DATABASE_URL', default=None):
         )
     }
 else:
+    # Seconds a SQLite write waits for another writer's lock before 'database is locked'
+    SQLITE_TIMEOUT = config('SQLITE_TIMEOUT', default=20, cast=int)
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            'ENGINE': 'apps.core.sqlite',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {'timeout': SQLITE_TIMEOUT},
         }
     }
 
+# Cache
+# Per-process memory cache; point BACKEND at Redis/Memcached to share it between workers
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': '2morefitness',
+    }
+}
+
+# Seconds the admin dashboard statistics snapshot is cached for
+DASHBOARD_CACHE_TTL = config('DASHBOARD_CACHE_TTL', default=30, cast=int)
+
+# Hourly occupancy: assumed length of a session with no check-out, and the
+# window the dashboard peak hour / heatmap is computed over
+OCCUPANCY_OPEN_SESSION_MINUTES = config('OCCUPANCY_OPEN_SESSION_MINUTES', default=90, cast=int)
+OCCUPANCY_LOOKBACK_DAYS = config('OCCUPANCY_LOOKBACK_DAYS', default=28, cast=int)
+
+# Floor capacity used for the live occupancy percentage
+GYM_CAPACITY = config('GYM_CAPACITY', default=100, cast=int)
+
+# Attempts at a transaction that SQLite rejects with 'database is locked' (enrollment, check-in)
+DB_LOCK_RETRIES = config('DB_LOCK_RETRIES', default=20, cast=int)
+
+# Full classes put new enrollments on a waitlist instead of rejecting them
+CLASS_WAITLIST_ENABLED = config('CLASS_WAITLIST_ENABLED', default=True, cast=bool)
+
+# Weeks of dated class occurrences kept materialized ahead of today
+CLASS_CALENDAR_WEEKS = config('CLASS_CALENDAR_WEEKS', default=4, cast=int)
+
+# Seconds an approximate admin list total is cached for
+PAGINATION_COUNT_CACHE_TTL = config('PAGINATION_COUNT_CACHE_TTL', default=60, cast=int)
+
+# Members removed per transaction by bulk delete (0 = all in one transaction)
+MEMBER_DELETE_CHUNK_SIZE = config('MEMBER_DELETE_CHUNK_SIZE', default=0, cast=int)
+
+# Bulk member import: rows per insert batch, and password hashing processes for the
+# import_members command (0 = one per CPU; admin uploads always hash in-process)
+MEMBER_IMPORT_BATCH_SIZE = config('MEMBER_IMPORT_BATCH_SIZE', default=1000, cast=int)
+MEMBER_IMPORT_WORKERS = config('MEMBER_IMPORT_WORKERS', default=0, cast=int)
+
+# Rows fetched per database round trip by the streaming exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
+# Rows per UPDATE in the update_membership_statuses batch job
+MEMBERSHIP_STATUS_BATCH_SIZE = config('MEMBERSHIP_STATUS_BATCH_SIZE', default=5000, cast=int)
+
+# Per-request instrumentation: log requests slower than REQUEST_SLOW_MS or with more
+# than REQUEST_MAX_QUERIES queries; keep the last REQUEST_STATS_SAMPLE_SIZE samples per view
+REQUEST_INSTRUMENTATION = config('REQUEST_INSTRUMENTATION', default=True, cast=bool)
+REQUEST_SLOW_MS = config('REQUEST_SLOW_MS', default=500, cast=int)
+REQUEST_MAX_QUERIES = config('REQUEST_MAX_QUERIES', default=50, cast=int)
+REQUEST_STATS_SAMPLE_SIZE = config('REQUEST_STATS_SAMPLE_SIZE', default=1000, cast=int)
+
+# Prometheus /metrics: scrapers send METRICS_TOKEN as a bearer token (admin sessions
+# need none; METRICS_PUBLIC opens it to anyone), and a directory for per-worker
+# metric files when gunicorn runs more than one worker (empty = this process only)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_PUBLIC = config('METRICS_PUBLIC', default=False, cast=bool)
+METRICS_MULTIPROCESS_DIR = config('METRICS_MULTIPROCESS_DIR', default='')
+
+# generate_renewals: create the next term this many days before a membership ends
+MEMBERSHIP_RENEWAL_DAYS = config('MEMBERSHIP_RENEWAL_DAYS', default=7, cast=int)
+MEMBERSHIP_RENEWAL_BATCH_SIZE = config('MEMBERSHIP_RENEWAL_BATCH_SIZE', default=1000, cast=int)
+
+# Bank statement lines matched per lookup query and UPDATE in reconcile_payments
+PAYMENT_RECONCILE_BATCH_SIZE = config('PAYMENT_RECONCILE_BATCH_SIZE', default=5000, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -128,7 +202,15 @@ LOGOUT_REDIRECT_URL = '/'
 
 # Session settings
 SESSION_COOKIE_AGE = 86400  # 24 hours
-SESSION_SAVE_EVERY_REQUEST = True
+# Expiry slides via SessionRefreshMiddleware instead of a write on every request
+SESSION_SAVE_EVERY_REQUEST = False
+# Push the expiry forward once this fraction of SESSION_COOKIE_AGE has passed since the last refresh
+SESSION_REFRESH_FRACTION = config('SESSION_REFRESH_FRACTION', default=0.5, cast=float)
+# db (default), cached_db (needs a cache shared by all workers) or signed_cookies (no server-side storage)
+SESSION_ENGINE = 'django.contrib.sessions.backends.' + config(
+    'SESSION_BACKEND', default='db',
+    cast=lambda value: value if value in ('db', 'cached_db', 'signed_cookies') else 'db',
+)
 
 # Security settings for production
 SECURE_BROWSER_XSS_FILTER = True